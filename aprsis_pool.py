@@ -0,0 +1,259 @@
+"""Connections to a pool of APRS-IS servers.
+
+:class:`ServerPool` resolves the configured servers once and caches their
+addresses for :data:`DNS_TTL` seconds.  :meth:`ServerPool.connect` races
+connection attempts in the style of RFC 8305 ("happy eyeballs"): the
+address with the lowest measured round trip is tried first and another
+attempt starts every :data:`STAGGER` seconds, or as soon as one fails,
+until one succeeds or the pool's timeout expires.
+
+The round trip is measured up to the server's greeting line, which
+APRS-IS servers send as soon as a client connects, so a node that accepts
+TCP connections but does not answer loses the race.
+"""
+import queue
+import socket
+import threading
+import time
+from pathlib import Path
+
+from utils import log_error
+
+LOG_SOURCE = (
+    f"{__package__}.{Path(__file__).stem}" if __package__ else Path(__file__).stem
+)
+
+# Seconds resolved addresses are reused before asking DNS again.
+DNS_TTL = 300.0
+
+# Seconds between starting connection attempts to successive addresses.
+STAGGER = 0.25
+
+# Seconds an address that failed is tried only after all others.
+DOWN_TIME = 60.0
+
+# Weight of a new round trip sample in the moving average.
+RTT_WEIGHT = 0.3
+
+
+class Connection:
+    """A connected socket and what was learned while connecting.
+
+    ``greeting`` holds the bytes read up to and including the server's
+    first line; the session may ignore it.
+    """
+
+    __slots__ = ("sock", "server", "address", "rtt", "greeting")
+
+    def __init__(self, sock, server, address, rtt, greeting):
+        self.sock = sock
+        self.server = server
+        self.address = address
+        self.rtt = rtt
+        self.greeting = greeting
+
+
+def _interleave(infos):
+    """Alternate address families as RFC 8305 recommends."""
+    by_family = {}
+    for family, _, _, _, sockaddr in infos:
+        by_family.setdefault(family, []).append(sockaddr[:2])
+    lists = list(by_family.values())
+    result = []
+    for i in range(max(map(len, lists), default=0)):
+        result.extend(addrs[i] for addrs in lists if i < len(addrs))
+    return result
+
+
+def _read_greeting(sock, limit=512):
+    data = b""
+    while b"\n" not in data:
+        chunk = sock.recv(limit)
+        if not chunk:
+            raise ConnectionError("server closed the connection")
+        data += chunk
+        if len(data) >= limit:
+            break
+    return data
+
+
+class ServerPool:
+    """Address cache and connection racer for a list of servers.
+
+    Parameters
+    ----------
+    servers : sequence of (str, int)
+        Host names or addresses with their ports, in order of preference.
+    timeout : float
+        Upper bound in seconds for one :meth:`connect`.
+    """
+
+    def __init__(self, servers, timeout=10.0, clock=time.monotonic):
+        self.servers = tuple(servers)
+        self.timeout = timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._dns = {}
+        self._rtt = {}
+        self._down = {}
+
+    def resolve(self, host, port):
+        """Return the cached addresses of ``host``, resolving when stale.
+
+        A failed lookup falls back to the last known addresses.
+        """
+        now = self._clock()
+        with self._lock:
+            cached = self._dns.get((host, port))
+        if cached and cached[0] > now:
+            return cached[1]
+        try:
+            infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError as exc:
+            if cached:
+                return cached[1]
+            log_error("Cannot resolve APRS-IS server %s: %s", host, exc, source=LOG_SOURCE)
+            return []
+        addresses = _interleave(infos)
+        with self._lock:
+            self._dns[(host, port)] = (now + DNS_TTL, addresses)
+        return addresses
+
+    def candidates(self):
+        """Return ``(server, address)`` pairs in the order they are tried.
+
+        Addresses are ordered by measured round trip, unmeasured ones keep
+        the configured order, and addresses that recently failed come last.
+        """
+        now = self._clock()
+        pairs = []
+        for server in self.servers:
+            for address in self.resolve(*server):
+                pairs.append((server, address))
+        with self._lock:
+            def key(item):
+                index, (_, address) = item
+                down = self._down.get(address, 0) > now
+                return (down, self._rtt.get(address, float("inf")), index)
+
+            return [pair for _, pair in sorted(enumerate(pairs), key=key)]
+
+    def rtt(self, address):
+        """Return the average round trip to ``address``, or ``None``."""
+        with self._lock:
+            return self._rtt.get(address)
+
+    def record(self, address, rtt):
+        with self._lock:
+            old = self._rtt.get(address)
+            self._rtt[address] = rtt if old is None else old + RTT_WEIGHT * (rtt - old)
+            self._down.pop(address, None)
+
+    def mark_failed(self, address):
+        """Try ``address`` last for the next :data:`DOWN_TIME` seconds."""
+        with self._lock:
+            self._down[address] = self._clock() + DOWN_TIME
+
+    def _attempt(self, server, address, deadline, results, done):
+        start = time.perf_counter()
+        sock = None
+        try:
+            sock = socket.create_connection(
+                address, timeout=max(0.01, deadline - time.monotonic())
+            )
+            greeting = _read_greeting(sock)
+        except OSError as exc:
+            if sock is not None:
+                sock.close()
+            self.mark_failed(address)
+            results.put((address, exc))
+            return
+        rtt = time.perf_counter() - start
+        self.record(address, rtt)
+        with self._lock:
+            lost = done.is_set()
+            if not lost:
+                results.put((address, Connection(sock, server, address, rtt, greeting)))
+        if lost:
+            sock.close()
+
+    def connect(self):
+        """Return a :class:`Connection` to the first server that answers.
+
+        Raises
+        ------
+        OSError
+            If no address answered within the pool's timeout.
+        """
+        candidates = self.candidates()
+        if not candidates:
+            raise OSError("no APRS-IS server address could be resolved")
+        deadline = time.monotonic() + self.timeout
+        results = queue.Queue()
+        done = threading.Event()
+        started = running = 0
+        next_start = time.monotonic()
+        errors = []
+        winner = None
+        try:
+            while started < len(candidates) or running:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                if started < len(candidates) and (now >= next_start or not running):
+                    server, address = candidates[started]
+                    threading.Thread(
+                        target=self._attempt,
+                        args=(server, address, deadline, results, done),
+                        name="aprsis-connect",
+                        daemon=True,
+                    ).start()
+                    started += 1
+                    running += 1
+                    next_start = now + STAGGER
+                wait = deadline - now
+                if started < len(candidates):
+                    wait = min(wait, max(0.0, next_start - now))
+                try:
+                    address, outcome = results.get(timeout=wait)
+                except queue.Empty:
+                    continue
+                running -= 1
+                if isinstance(outcome, Connection):
+                    winner = outcome
+                    return winner
+                errors.append(f"{address[0]}:{address[1]}: {outcome}")
+                # a failed attempt starts the next one right away
+                next_start = time.monotonic()
+        finally:
+            with self._lock:
+                done.set()
+            # attempts still running close their sockets when they finish;
+            # close those that finished but were not picked
+            while True:
+                try:
+                    _, outcome = results.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(outcome, Connection) and outcome is not winner:
+                    outcome.sock.close()
+        detail = "; ".join(errors) or "timed out"
+        raise OSError(f"no APRS-IS server answered within {self.timeout:.1f}s ({detail})")
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_for(servers, timeout):
+    """Return the process-wide :class:`ServerPool` for ``servers``.
+
+    Sharing the pool keeps resolved addresses and round trips between
+    connections.
+    """
+    key = (tuple(servers), timeout)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ServerPool(servers, timeout)
+        return pool
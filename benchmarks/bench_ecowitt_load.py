@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Load test for the Ecowitt ingest server.
+
+Starts the listener on a local port with transmission stubbed out, then
+runs many concurrent uploaders over keep-alive connections while a few
+stalled clients hold connections open.  Prints throughput and latency
+percentiles.
+"""
+import argparse
+import http.client
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from daemons import ecowitt_listener  # noqa: E402
+
+BODY = (
+    "PASSKEY=X&stationtype=EasyWeatherV1.6.4&dateutc=2024-05-01+12:00:00"
+    "&tempf=70.2&humidity=40&winddir=180&windspeedmph=3.1&windgustmph=5.0"
+    "&hourlyrainin=0.00&dailyrainin=0.10&baromrelin=29.92"
+)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    k = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[k]
+
+
+def uploader(port, count, latencies, errors):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    for _ in range(count):
+        start = time.perf_counter()
+        try:
+            conn.request("POST", ecowitt_listener.PATH, body=BODY, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+                continue
+        except Exception as exc:
+            errors.append(exc)
+            conn.close()
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=12)
+    parser.add_argument("--requests", type=int, default=200, help="per client")
+    parser.add_argument("--stalled", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    ecowitt_listener.log_params = lambda client, params: None
+    max_conn = args.clients + args.stalled + 1
+    ecowitt_listener.start_pipeline()
+    server = ecowitt_listener.IngestServer(
+        ("127.0.0.1", 0), ecowitt_listener.Handler, max_conn
+    )
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    stalled = []
+    for _ in range(args.stalled):
+        sock = socket.create_connection(("127.0.0.1", port))
+        sock.sendall(b"POST " + ecowitt_listener.PATH.encode() + b" HTTP/1.1\r\n")
+        stalled.append(sock)
+
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(target=uploader, args=(port, args.requests, latencies, errors))
+        for _ in range(args.clients)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    server.shutdown()
+    ecowitt_listener.stop_pipeline()
+    for sock in stalled:
+        sock.close()
+
+    total = len(latencies)
+    print(f"clients={args.clients} stalled={args.stalled} requests={total} errors={len(errors)}")
+    print(f"throughput {total / elapsed:8.1f} req/s")
+    for pct in (50, 90, 99, 100):
+        print(f"p{pct:<3d} {percentile(latencies, pct) * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""Compare the KISS codec with the per-byte escaping loop it replaced."""
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import kiss  # noqa: E402
+
+
+def legacy_escape(ax25_frame):
+    escaped = bytearray()
+    for b in ax25_frame:
+        if b == 0xC0:
+            escaped += b"\xDB\xDC"
+        elif b == 0xDB:
+            escaped += b"\xDB\xDD"
+        else:
+            escaped.append(b)
+    return b"\xC0\x00" + bytes(escaped) + b"\xC0"
+
+
+def best_of(fn, number, repeat=5):
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number
+
+
+def main():
+    # a typical weather report plus one with bytes that need escaping
+    frames = {
+        "weather": bytes(range(14)) * 2 + b"@171200z3730.00N/12215.00W_000/000g000t070",
+        "escapes": b"\xC0\xDB" * 40,
+    }
+    for name, frame in frames.items():
+        old = best_of(lambda: legacy_escape(frame), 20000)
+        new = best_of(lambda: kiss.encode(frame), 20000)
+        print(f"encode {name:8s} legacy {old * 1e6:7.2f} us  codec {new * 1e6:7.2f} us  "
+              f"speedup {old / new:5.1f}x")
+
+    stream = b"".join(kiss.encode(f) for f in frames.values()) * 100
+    chunks = [stream[i:i + 1460] for i in range(0, len(stream), 1460)]
+
+    def decode():
+        decoder = kiss.Decoder()
+        for chunk in chunks:
+            decoder.feed(chunk)
+
+    per_frame = best_of(decode, 50) / 200
+    print(f"decode per frame {per_frame * 1e6:7.2f} us")
+
+
+if __name__ == "__main__":
+    main()
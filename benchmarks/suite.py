@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""Benchmark suite for the packet generation and I/O hot paths.
+
+Every benchmark is timed over several repeats after a discarded warm-up
+run.  The per-call median and the interquartile range are reported, since
+both hold up against the occasional scheduling hiccup better than the mean.
+Results can be written as JSON and compared against a run from another
+commit::
+
+    python benchmarks/suite.py --json before.json
+    # ... change something ...
+    python benchmarks/suite.py --json after.json --compare before.json
+
+``--profile pi`` cuts the iteration counts and log sizes so a run finishes
+in reasonable time on a Raspberry Pi.
+"""
+import argparse
+import contextlib
+import gc
+import json
+import logging
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import kiss  # noqa: E402
+import utils  # noqa: E402
+
+# iteration scale, repeats and Direwolf log sizes for each profile
+PROFILES = {
+    "full": {"scale": 1.0, "repeat": 7, "log_sizes": "1M,10M,100M,1G", "uploads": 500},
+    "pi": {"scale": 0.1, "repeat": 5, "log_sizes": "1M,10M", "uploads": 100},
+}
+
+# A change smaller than this fraction of the median is reported as noise.
+NOISE = 0.05
+
+UPLOAD = {
+    "PASSKEY": "X",
+    "stationtype": "EasyWeatherV1.6.4",
+    "dateutc": "2024-05-01 12:00:00",
+    "tempf": "70.2",
+    "humidity": "40",
+    "winddir": "180",
+    "windspeedmph": "3.1",
+    "windgustmph": "5.0",
+    "hourlyrainin": "0.00",
+    "dailyrainin": "0.10",
+    "baromrelin": "29.92",
+}
+
+PATH = ["WIDE1-1", "WIDE2-1"]
+INFO = "@011200z3730.00N/12215.00W_180/003g005t070r000p000P010h40b10132"
+
+_BENCHMARKS = []
+
+# resources of the running benchmark, released once it is timed
+_resources = contextlib.ExitStack()
+
+
+def benchmark(name, number):
+    """Register a setup function returning the callable to time.
+
+    ``number`` is the call count per repeat in the full profile.
+    """
+
+    def register(setup):
+        _BENCHMARKS.append((name, number, setup))
+        return setup
+
+    return register
+
+
+def _scratch_dir():
+    """Return a temporary directory removed after the current benchmark."""
+    return Path(_resources.enter_context(tempfile.TemporaryDirectory()))
+
+
+def _ecowitt():
+    from daemons import ecowitt_listener
+
+    return ecowitt_listener
+
+
+@benchmark("ecowitt_to_aprs", 20000)
+def _bench_ecowitt_to_aprs():
+    listener = _ecowitt()
+    return lambda: listener.ecowitt_to_aprs(UPLOAD)
+
+
+@benchmark("update_rain_24h", 100000)
+def _bench_update_rain():
+    listener = _ecowitt()
+    posts = [
+        {"dateutc": f"2024-05-{1 + h // 24:02d} {h % 24:02d}:30:00", "hourlyrainin": "0.12"}
+        for h in range(72)
+    ]
+    state = {"i": 0}
+
+    def run():
+        i = state["i"] = (state["i"] + 1) % len(posts)
+        if not i:
+            listener.RAIN_CACHE.clear()
+        listener.update_rain_24h(posts[i])
+
+    return run
+
+
+@benchmark("build_ax25_frame", 100000)
+def _bench_build_ax25_frame():
+    return lambda: utils.build_ax25_frame("APZ001", "N0CALL-13", PATH, INFO)
+
+
+@benchmark("ax25_encoder.encode", 200000)
+def _bench_ax25_encoder():
+    encoder = utils.ax25_encoder("APZ001", "N0CALL-13", PATH)
+    return lambda: encoder.encode(INFO)
+
+
+@benchmark("kiss.encode", 200000)
+def _bench_kiss_encode():
+    frame = utils.ax25_encoder("APZ001", "N0CALL-13", PATH).encode(INFO)
+    return lambda: kiss.encode(frame)
+
+
+@benchmark("kiss.Decoder.feed", 20000)
+def _bench_kiss_decode():
+    frame = utils.ax25_encoder("APZ001", "N0CALL-13", PATH).encode(INFO)
+    stream = kiss.encode(frame) * 16
+    decoder = kiss.Decoder()
+    return lambda: decoder.feed(stream)
+
+
+@benchmark("build_aprs_telemetry", 100000)
+def _bench_build_aprs_telemetry():
+    analog = [45.2, 12.0, 340, 1021, 97]
+    digital = [False, True]
+    return lambda: utils.build_aprs_telemetry(
+        123, analog=analog, digital=digital, comment="ver=1.0"
+    )
+
+
+@benchmark("direwolf.parse_metrics", 100000)
+def _bench_parse_metrics():
+    from telemetry import direwolf_telemetry
+
+    line = _metrics_line(7)
+    return lambda: direwolf_telemetry.parse_metrics(line)
+
+
+@benchmark("spool.append", 20000)
+def _bench_spool_append():
+    import spool
+
+    frame = utils.ax25_encoder("APZ001", "N0CALL-13", PATH).encode(INFO)
+    sp = spool.Spool(_scratch_dir() / "bench.spool")
+    _resources.callback(sp.close)
+    return lambda: sp.append([frame])
+
+
+@benchmark("spool.replay", 2000)
+def _bench_spool_replay():
+    import spool
+
+    # one full cycle: spool a batch, read it back and commit it
+    frames = [utils.ax25_encoder("APZ001", "N0CALL-13", PATH).encode(INFO)] * 64
+    sp = spool.Spool(_scratch_dir() / "bench.spool")
+    _resources.callback(sp.close)
+
+    def cycle():
+        sp.append(frames)
+        batch, token = sp.peek()
+        sp.commit(token, len(batch))
+
+    return cycle
+
+
+@benchmark("journal.record", 200000)
+def _bench_journal_record():
+    import journal
+
+    # the cost seen by the send path; the writer thread does the I/O
+    frame = utils.ax25_encoder("APZ001", "N0CALL-13", PATH).encode(INFO)
+    jl = journal.Journal(_scratch_dir())
+    _resources.callback(jl.close)
+    pending = jl._pending
+
+    def record():
+        jl.record("kiss", frame, "bench")
+        # stay below MAX_PENDING so the drop path is not what gets timed
+        if len(pending) > 4096:
+            pending.clear()
+
+    return record
+
+
+@benchmark("metrics.Counter.inc", 500000)
+def _bench_counter_inc():
+    import metrics
+
+    return metrics.Counter("bench_total").inc
+
+
+@benchmark("metrics.Histogram.observe", 500000)
+def _bench_histogram_observe():
+    import metrics
+
+    histogram = metrics.Histogram("bench_seconds")
+    return lambda: histogram.observe(0.003)
+
+
+@benchmark("tracing.trace", 100000)
+def _bench_trace():
+    import tracing
+
+    # everything a traced report costs: seven marks and the histograms
+    stages = ("parse", "ingest_queue", "log", "convert", "route", "kiss_queue")
+
+    def trace():
+        t = tracing.begin()
+        for stage in stages:
+            t.mark(stage)
+        tracing.finish(t, "write")
+
+    return trace
+
+
+def _metrics_line(i):
+    return f"[0L] 2024-05-01 12:00:{i % 60:02d} busy={i % 100}.5 rcvq={i % 7} sendq={i % 3}\n"
+
+
+_LOG_BLOCK = "".join(
+    f"[0.{i % 3}] N0CALL-{i % 16}>APRS,WIDE1-1,WIDE2-1:!3730.00N/12215.00W-Test {i:05d}\n"
+    if i % 50
+    else _metrics_line(i)
+    for i in range(2000)
+)
+
+
+def _parse_size(text):
+    text = text.strip().upper()
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def synthetic_log(directory, size):
+    """Return a Direwolf-style log of about ``size`` bytes, reusing old ones.
+
+    One line in fifty carries metrics, so the newest metrics sit close to
+    the end of the file like in a live log.
+    """
+    path = Path(directory) / f"direwolf-{size}.log"
+    if path.exists() and path.stat().st_size >= size:
+        return path
+    block = _LOG_BLOCK.encode()
+    with path.open("wb") as f:
+        written = 0
+        while written < size:
+            f.write(block)
+            written += len(block)
+    return path
+
+
+def _log_benchmarks(sizes, workdir):
+    from telemetry import direwolf_telemetry
+
+    for text in sizes:
+        size = _parse_size(text)
+        # reads after the first only touch the tail, but the first call
+        # writes the cursor; keep a fixed budget of bytes per repeat
+        number = max(1, (64 << 20) // size)
+
+        def setup(size=size):
+            path = synthetic_log(workdir, size)
+            return lambda: direwolf_telemetry.read_metrics(path)
+
+        yield f"direwolf.read_metrics[{text.strip()}]", number, setup
+
+
+def summarize(samples):
+    """Return order statistics for per-call times in seconds."""
+    ordered = sorted(samples)
+    quartiles = statistics.quantiles(ordered, n=4) if len(ordered) > 1 else ordered * 3
+    return {
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "mean": statistics.fmean(ordered),
+        "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "iqr": quartiles[2] - quartiles[0],
+        "p90": ordered[min(len(ordered) - 1, int(0.9 * len(ordered)))],
+        "samples": ordered,
+    }
+
+
+def time_calls(fn, number, repeat):
+    """Time ``repeat`` batches of ``number`` calls after one warm-up batch."""
+    timer = timeit.Timer(fn)
+    timer.timeit(number)
+    return [t / number for t in timer.repeat(repeat=repeat, number=number)]
+
+
+class FakeTNC:
+    """Local KISS TCP server recording when each frame arrives."""
+
+    def __init__(self):
+        self._sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self._sock.getsockname()[1]
+        self.arrivals = []
+        self.frame = threading.Event()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        conn, _ = self._sock.accept()
+        decoder = kiss.Decoder()
+        with conn:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    return
+                for _ in decoder.feed(data):
+                    self.arrivals.append(time.perf_counter())
+                    self.frame.set()
+
+    def close(self):
+        self._sock.close()
+
+
+def upload_latency(count):
+    """Seconds from posting an Ecowitt upload to its frame reaching a TNC.
+
+    The upload goes through the real HTTP server, ingest pipeline and
+    ``kiss_client`` daemon; only APRS-IS is turned off.
+    """
+    import http.client
+    from urllib.parse import urlencode
+
+    from daemons import kiss_client
+
+    listener = _ecowitt()
+    tnc = FakeTNC()
+    kiss_client.ENABLED = True
+    kiss_client.HOST, kiss_client.PORT = "127.0.0.1", tnc.port
+    listener.MIN_INTERVAL = 0
+    listener.APRS_IS_CFG = {"enabled": False}
+    client_server, _ = kiss_client.start()
+    listener.start_pipeline()
+    server = listener.IngestServer(("127.0.0.1", 0), listener.Handler, 4)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=10)
+    body = urlencode(UPLOAD)
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    samples = []
+    try:
+        for _ in range(count):
+            tnc.frame.clear()
+            start = time.perf_counter()
+            conn.request("POST", listener.PATH, body=body, headers=headers)
+            conn.getresponse().read()
+            if not tnc.frame.wait(5):
+                raise RuntimeError("frame did not reach the fake TNC")
+            samples.append(tnc.arrivals[-1] - start)
+    finally:
+        conn.close()
+        server.shutdown()
+        server.server_close()
+        listener.stop_pipeline()
+        client_server.shutdown()
+        tnc.close()
+    return samples[1:]  # the first one includes connection setup
+
+
+def metadata(profile):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "profile": profile,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def _format_time(seconds):
+    for unit, factor in (("s", 1), ("ms", 1e3), ("us", 1e6), ("ns", 1e9)):
+        if seconds * factor >= 1 or unit == "ns":
+            return f"{seconds * factor:8.2f} {unit:2s}"
+
+
+def compare(base, results):
+    """Print the median change of every benchmark present in ``base``."""
+    print(f"\ncompared with {base['meta'].get('commit')} ({base['meta'].get('profile')})")
+    for name, new in results.items():
+        old = base["results"].get(name)
+        if not old:
+            continue
+        ratio = new["median"] / old["median"]
+        # only call it a change if it beats both the noise floor and the
+        # spread of either run
+        spread = max(new["iqr"] / new["median"], old["iqr"] / old["median"], NOISE)
+        if ratio > 1 + spread:
+            verdict = "slower"
+        elif ratio < 1 - spread:
+            verdict = "faster"
+        else:
+            verdict = "same"
+        print(f"{name:32s} {ratio:6.2f}x  {verdict}")
+
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(description="wx-helios benchmark suite")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="full")
+    parser.add_argument("--repeat", type=int, help="timed repeats per benchmark")
+    parser.add_argument("--scale", type=float, help="multiply iteration counts")
+    parser.add_argument(
+        "--log-sizes", help="comma separated Direwolf log sizes, e.g. 1M,100M,1G"
+    )
+    parser.add_argument("--workdir", help="where synthetic logs are kept")
+    parser.add_argument("--uploads", type=int, help="uploads for the latency test")
+    parser.add_argument("-k", "--filter", help="only run benchmarks containing this")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="compare with an earlier JSON result")
+    args = parser.parse_args(argv)
+
+    profile = PROFILES[args.profile]
+    repeat = args.repeat or profile["repeat"]
+    scale = args.scale or profile["scale"]
+    sizes = (args.log_sizes or profile["log_sizes"]).split(",")
+    workdir = Path(args.workdir or Path(tempfile.gettempdir()) / "wx-helios-bench")
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    # per-upload log lines would dominate the timings and flood the output
+    logging.disable(logging.INFO)
+    try:
+        results = {}
+        for name, number, setup in [*_BENCHMARKS, *_log_benchmarks(sizes, workdir)]:
+            if args.filter and args.filter not in name:
+                continue
+            try:
+                fn = setup()
+                stats = summarize(time_calls(fn, max(1, int(number * scale)), repeat))
+            finally:
+                _resources.close()
+            results[name] = stats
+            print(f"{name:32s} {_format_time(stats['median'])} "
+                  f"±{_format_time(stats['iqr'] / 2)} (min {_format_time(stats['min'])})")
+
+        if not args.filter or args.filter in "upload_to_tnc":
+            gc.collect()
+            samples = upload_latency(args.uploads or profile["uploads"])
+            stats = summarize(samples)
+            results["upload_to_tnc"] = stats
+            print(f"{'upload_to_tnc':32s} {_format_time(stats['median'])} "
+                  f"p90 {_format_time(stats['p90'])} (min {_format_time(stats['min'])})")
+    finally:
+        logging.disable(logging.NOTSET)
+
+    report = {"meta": metadata(args.profile), "results": results}
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+    if args.compare:
+        compare(json.loads(Path(args.compare).read_text()), results)
+    return report
+
+
+if __name__ == "__main__":
+    run()
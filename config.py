@@ -1,21 +1,210 @@
+"""Configuration loaded from ``wx-helios.conf``.
+
+The file is parsed and validated once into a frozen :class:`Config`
+snapshot.  Values are converted to their final types at that point, so a
+bad value is reported when the configuration is loaded rather than when some
+module first uses it.  The ``load_*`` helpers are thin accessors returning
+the same dictionaries and tuples as before.
+
+Child interpreters started by the launcher receive the snapshot through the
+:data:`ENV_VAR` environment variable (see :func:`export`) instead of parsing
+the file again.
+
+:func:`reload` replaces the snapshot after the file was edited and calls the
+callbacks registered with :func:`subscribe`, which let running daemons apply
+the new values without a restart.  A callback that could not apply them yet
+is called again by the next :func:`reload` or :func:`check_reload`.
+"""
 import configparser
+import dataclasses
+import os
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
 
+from utils import log_error, log_exception, log_info
+
+LOG_SOURCE = Path(__file__).stem
+
 CONFIG_PATH = Path(__file__).resolve().parent / "wx-helios.conf"
 
+# Environment variable carrying a serialized snapshot to child processes.
+ENV_VAR = "WX_HELIOS_CONFIG"
+
 # Default TCP port for rigctld. This value must match the port used in
 # ``direwolf.conf.template`` on the ``PTT RIG`` line.
 RIGCTLD_PORT = 4534
 
+# Seconds a telemetry module may run before it is killed or abandoned.
+DEFAULT_TELEMETRY_DEADLINE = 120.0
+
+# Number of telemetry modules that may run at the same time.
+DEFAULT_TELEMETRY_WORKERS = 2
+
+_DEADLINE_SUFFIX = ".deadline"
+
+# Seconds between checks of the configuration file's modification time.
+WATCH_INTERVAL = 5.0
+
+_DEFAULT_DAEMONS = (
+    "daemons.ecowitt_listener",
+    "daemons.kiss_client",
+    "daemons.aprsis_client",
+)
+_DEFAULT_TELEMETRY = ("telemetry.hub_telemetry",)
+
 _config = None
+_subscribers = []
+_pending = []           # subscribers that returned False on the last change
+_reload_lock = threading.Lock()
+
+
+class ConfigError(ValueError):
+    """Raised when ``wx-helios.conf`` cannot be parsed or holds a bad value."""
+
+
+@dataclass(frozen=True, slots=True)
+class AprsConfig:
+    callsign: str
+    latitude: float
+    longitude: float
+    symbol_table: str
+    symbol: str
+    path: tuple
+    destination: str
+    version: str
+
+    def as_tuple(self):
+        return (
+            self.callsign,
+            self.latitude,
+            self.longitude,
+            self.symbol_table,
+            self.symbol,
+            list(self.path),
+            self.destination,
+            self.version,
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class EcowittConfig:
+    enabled: bool = True
+    port: int = 8080
+    path: str = "/data/report"
+    max_connections: int = 16
+    timeout: float = 10.0
+    max_body: int = 16384
+    queue_size: int = 64
+
+
+@dataclass(frozen=True, slots=True)
+class DirewolfConfig:
+    enabled: bool = True
+    output_log: str | None = None
+    output_max_bytes: int = 1 << 20
+    output_backups: int = 3
+    ring_size: int = 512
+
+
+@dataclass(frozen=True, slots=True)
+class SamplerConfig:
+    interval: float = 10.0
+    size: int = 60
+
+
+@dataclass(frozen=True, slots=True)
+class SpoolConfig:
+    enabled: bool = False
+    directory: str = "spool"
+    max_bytes: int = 10 << 20
+    max_age: float | None = 6 * 3600.0
+
+
+@dataclass(frozen=True, slots=True)
+class JournalConfig:
+    enabled: bool = False
+    directory: str = "journal"
+    segment_bytes: int = 4 << 20
+    max_bytes: int | None = 256 << 20
+
+
+@dataclass(frozen=True, slots=True)
+class MetricsConfig:
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    port: int = 9108
+
+
+@dataclass(frozen=True, slots=True)
+class TracingConfig:
+    enabled: bool = True
+    slow_threshold: float | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class KissClientConfig:
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    port: int = 8001
+
+
+@dataclass(frozen=True, slots=True)
+class AprsIsConfig:
+    enabled: bool = False
+    callsign: str | None = None
+    passcode: str = ""
+    servers: tuple = (("noam.aprs2.net", 14580),)
+    port: int = 14580
+    timeout: float = 10.0
+
+
+@dataclass(frozen=True, slots=True)
+class RigConfig:
+    enabled: bool = True
+    rig_id: int | None = None
+    usb_num: int | None = None
+    baud: int | None = None
+    port: int = RIGCTLD_PORT
+
+
+@dataclass(frozen=True, slots=True)
+class TelemetryConfig:
+    modules: tuple = _DEFAULT_TELEMETRY
+    isolated: tuple = ()
+    workers: int = DEFAULT_TELEMETRY_WORKERS
+    schedules: dict = field(default_factory=dict)
+    deadlines: dict = field(default_factory=dict)
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Validated contents of one configuration file.
+
+    ``aprs`` is ``None`` without an ``[APRS]`` section; ``aprs_sections``
+    maps every other section name to the APRS settings with that section's
+    overrides applied.  ``aprs_is`` and ``rig`` are ``None`` when their
+    sections are absent.
+    """
+
+    path: str
+    mtime: float | None
+    aprs: AprsConfig | None
+    aprs_sections: dict
+    ecowitt: EcowittConfig
+    kiss_client: KissClientConfig
+    aprs_is: AprsIsConfig | None
+    rig: RigConfig | None
+    telemetry: TelemetryConfig
+    daemons: tuple
+    direwolf: DirewolfConfig = DirewolfConfig()
+    spool: SpoolConfig = SpoolConfig()
+    journal: JournalConfig = JournalConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    tracing: TracingConfig = TracingConfig()
+    hubtelemetry_enabled: bool = True
+    hub_sampler: SamplerConfig = SamplerConfig()
 
-def _get_config():
-    global _config
-    if _config is None:
-        parser = configparser.ConfigParser()
-        parser.read(CONFIG_PATH)
-        _config = parser
-    return _config
 
 _UNICODE_MINUS_TRANSLATION = str.maketrans({
     "\u2212": "-",  # minus sign
@@ -33,6 +222,426 @@ def _parse_float(value: str) -> float:
     return float(value)
 
 
+def _port(value) -> int:
+    port = int(value)
+    if not 0 <= port <= 65535:
+        raise ValueError("port out of range")
+    return port
+
+
+def _get(sec, key, convert, default):
+    """Return option ``key`` of ``sec`` converted by ``convert``."""
+    if key not in sec:
+        return default
+    raw = sec.get(key)
+    try:
+        return convert(raw)
+    except ValueError as exc:
+        raise ConfigError(f"[{sec.name}] {key} = {raw!r}: {exc}") from None
+
+
+def _get_bool(sec, key, default):
+    try:
+        return sec.getboolean(key, default)
+    except ValueError:
+        raise ConfigError(f"[{sec.name}] {key} = {sec.get(key)!r}: not a boolean") from None
+
+
+def _split(text) -> tuple:
+    return tuple(p.strip() for p in text.split(",") if p.strip())
+
+
+def _symbol_table(raw: str) -> str:
+    return "/" if raw.strip().lower() == "primary" else "\\"
+
+
+def _parse_aprs(parser):
+    """Return the base APRS settings and the per-section overrides."""
+    if "APRS" not in parser:
+        return None, {}
+    aprs = parser["APRS"]
+    for key in ("callsign", "latitude", "longitude"):
+        if key not in aprs:
+            raise ConfigError(f"[APRS] {key} is required")
+    table_raw = aprs.get("symbol_table", "primary")
+    base = AprsConfig(
+        callsign=aprs["callsign"],
+        latitude=_get(aprs, "latitude", _parse_float, None),
+        longitude=_get(aprs, "longitude", _parse_float, None),
+        symbol_table=_symbol_table(table_raw),
+        symbol=aprs.get("symbol", "_"),
+        path=_split(aprs.get("path", "")),
+        destination=aprs.get("destination", "APZ001"),
+        version=aprs.get("version", "v5"),
+    )
+    sections = {}
+    for name in parser.sections():
+        if name == "APRS":
+            continue
+        sec = parser[name]
+        # support either digipeater_path or aprs_path for clarity
+        path_key = "digipeater_path" if "digipeater_path" in sec else "aprs_path"
+        sections[name] = AprsConfig(
+            callsign=base.callsign,
+            latitude=base.latitude,
+            longitude=base.longitude,
+            symbol_table=_symbol_table(sec.get("symbol_table", table_raw)),
+            symbol=sec.get("symbol", base.symbol),
+            path=_split(sec.get(path_key)) if path_key in sec else base.path,
+            destination=base.destination,
+            version=base.version,
+        )
+    return base, sections
+
+
+def _module_list(parser, section, default):
+    if section not in parser:
+        return default
+    sec = parser[section]
+    if not _get_bool(sec, "enabled", True):
+        return ()
+    return _split(sec.get("modules", ",".join(default)))
+
+
+def _parse_telemetry(parser):
+    modules = _module_list(parser, "TELEMETRY", _DEFAULT_TELEMETRY)
+    isolated = ()
+    workers = DEFAULT_TELEMETRY_WORKERS
+    if "TELEMETRY" in parser:
+        sec = parser["TELEMETRY"]
+        isolated = _split(sec.get("isolated", ""))
+        workers = max(1, _get(sec, "workers", int, DEFAULT_TELEMETRY_WORKERS))
+    schedules, deadlines = {}, {}
+    if "TELEMETRY_SCHEDULES" in parser:
+        sec = parser["TELEMETRY_SCHEDULES"]
+        for name, value in sec.items():
+            if name.endswith(_DEADLINE_SUFFIX):
+                deadlines[name[: -len(_DEADLINE_SUFFIX)]] = _get(sec, name, float, None)
+            else:
+                # deferred: processes inheriting a snapshot never parse one
+                import cron
+
+                _get(sec, name, cron.compile, None)
+                schedules[name] = value
+    return TelemetryConfig(modules, isolated, workers, schedules, deadlines)
+
+
+def _server(entry, port):
+    host, sep, entry_port = entry.rpartition(":")
+    # a bare IPv6 address has several colons; one with a port is bracketed
+    if sep and (":" not in host or host.endswith("]")):
+        return host.strip("[]"), _port(entry_port)
+    return entry.strip("[]"), port
+
+
+def _servers(sec):
+    """Return ``(host, port)`` pairs from the ``server`` list of ``sec``.
+
+    Entries are comma separated and may carry their own ``:port``.
+    """
+    port = _get(sec, "port", _port, 14580)
+    servers = _get(
+        sec,
+        "server",
+        lambda raw: tuple(_server(entry, port) for entry in _split(raw)),
+        (("noam.aprs2.net", port),),
+    )
+    if not servers:
+        raise ConfigError(f"[{sec.name}] server: no server given")
+    return servers
+
+
+def _parse_direwolf(parser):
+    if "DIREWOLF" not in parser:
+        return DirewolfConfig()
+    sec = parser["DIREWOLF"]
+    return DirewolfConfig(
+        enabled=_get_bool(sec, "enabled", True),
+        output_log=sec.get("output_log") or None,
+        output_max_bytes=_get(sec, "output_max_bytes", int, 1 << 20),
+        output_backups=_get(sec, "output_backups", int, 3),
+        ring_size=max(1, _get(sec, "ring_size", int, 512)),
+    )
+
+
+def _parse_sampler(parser):
+    if "HUBTELEMETRY" not in parser:
+        return SamplerConfig()
+    sec = parser["HUBTELEMETRY"]
+    return SamplerConfig(
+        interval=max(0.0, _get(sec, "sample_interval", float, 10.0)),
+        size=max(1, _get(sec, "samples", int, 60)),
+    )
+
+
+def _parse_spool(parser):
+    if "SPOOL" not in parser:
+        return SpoolConfig()
+    sec = parser["SPOOL"]
+    max_age = _get(sec, "max_age", float, 6 * 3600.0)
+    return SpoolConfig(
+        enabled=_get_bool(sec, "enabled", False),
+        directory=sec.get("directory", "spool"),
+        max_bytes=_get(sec, "max_bytes", int, 10 << 20),
+        max_age=max_age if max_age > 0 else None,
+    )
+
+
+def _parse_journal(parser):
+    if "JOURNAL" not in parser:
+        return JournalConfig()
+    sec = parser["JOURNAL"]
+    max_bytes = _get(sec, "max_bytes", int, 256 << 20)
+    return JournalConfig(
+        enabled=_get_bool(sec, "enabled", False),
+        directory=sec.get("directory", "journal"),
+        segment_bytes=_get(sec, "segment_bytes", int, 4 << 20),
+        max_bytes=max_bytes if max_bytes > 0 else None,
+    )
+
+
+def _parse_metrics(parser):
+    if "METRICS" not in parser:
+        return MetricsConfig()
+    sec = parser["METRICS"]
+    return MetricsConfig(
+        enabled=_get_bool(sec, "enabled", False),
+        host=sec.get("host", "127.0.0.1"),
+        port=_get(sec, "port", _port, 9108),
+    )
+
+
+def _parse_tracing(parser):
+    if "TRACING" not in parser:
+        return TracingConfig()
+    sec = parser["TRACING"]
+    slow = _get(sec, "slow_threshold", float, 0.0)
+    return TracingConfig(
+        enabled=_get_bool(sec, "enabled", True),
+        slow_threshold=slow if slow > 0 else None,
+    )
+
+
+def parse(path) -> Config:
+    """Read and validate the configuration file at ``path``.
+
+    A missing file yields the defaults, like an empty one.
+
+    Raises
+    ------
+    ConfigError
+        If the file is malformed or a value cannot be converted.
+    """
+    parser = configparser.ConfigParser()
+    try:
+        parser.read(path)
+    except configparser.Error as exc:
+        raise ConfigError(str(exc)) from None
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        mtime = None
+
+    aprs, aprs_sections = _parse_aprs(parser)
+
+    ecowitt = EcowittConfig()
+    if "ECOWITT" in parser:
+        eco = parser["ECOWITT"]
+        ecowitt = EcowittConfig(
+            enabled=_get_bool(eco, "enabled", True),
+            port=_get(eco, "port", _port, 8080),
+            path=eco.get("path", "/data/report"),
+            max_connections=_get(eco, "max_connections", int, 16),
+            timeout=_get(eco, "timeout", float, 10.0),
+            max_body=_get(eco, "max_body", int, 16384),
+            queue_size=_get(eco, "queue_size", int, 64),
+        )
+
+    kiss_client = KissClientConfig()
+    if "KISS_CLIENT" in parser:
+        kc = parser["KISS_CLIENT"]
+        kiss_client = KissClientConfig(
+            enabled=_get_bool(kc, "enabled", True),
+            host=kc.get("host", "127.0.0.1"),
+            port=_get(kc, "port", _port, 8001),
+        )
+
+    aprs_is = None
+    if "APRS_IS" in parser:
+        sec = parser["APRS_IS"]
+        aprs_is = AprsIsConfig(
+            enabled=_get_bool(sec, "enabled", False),
+            callsign=sec.get("callsign", aprs.callsign if aprs else None),
+            passcode=sec.get("passcode", ""),
+            servers=_servers(sec),
+            port=_get(sec, "port", _port, 14580),
+            timeout=_get(sec, "timeout", float, 10.0),
+        )
+
+    rig = None
+    if "RIG" in parser:
+        sec = parser["RIG"]
+        rig = RigConfig(
+            enabled=_get_bool(sec, "enabled", True),
+            rig_id=_get(sec, "rig_id", int, None),
+            usb_num=_get(sec, "usb_num", int, None),
+            baud=_get(sec, "baud", int, None),
+            port=_get(sec, "port", _port, RIGCTLD_PORT),
+        )
+
+    return Config(
+        path=str(path),
+        mtime=mtime,
+        aprs=aprs,
+        aprs_sections=aprs_sections,
+        ecowitt=ecowitt,
+        kiss_client=kiss_client,
+        aprs_is=aprs_is,
+        rig=rig,
+        telemetry=_parse_telemetry(parser),
+        daemons=_module_list(parser, "DAEMONS", _DEFAULT_DAEMONS),
+        hubtelemetry_enabled=(
+            _get_bool(parser["HUBTELEMETRY"], "enabled", True)
+            if "HUBTELEMETRY" in parser
+            else True
+        ),
+        hub_sampler=_parse_sampler(parser),
+        direwolf=_parse_direwolf(parser),
+        spool=_parse_spool(parser),
+        journal=_parse_journal(parser),
+        metrics=_parse_metrics(parser),
+        tracing=_parse_tracing(parser),
+    )
+
+
+def export() -> str:
+    """Return the current snapshot serialized for :data:`ENV_VAR`."""
+    import base64
+    import pickle
+
+    return base64.b64encode(pickle.dumps(snapshot())).decode("ascii")
+
+
+def _inherited():
+    """Return the snapshot passed in by the parent process, if any.
+
+    It is only used if it was loaded from the file this process would read.
+    """
+    blob = os.environ.get(ENV_VAR)
+    if not blob:
+        return None
+    import base64
+    import pickle
+
+    try:
+        cfg = pickle.loads(base64.b64decode(blob))
+    except Exception:
+        return None
+    if not isinstance(cfg, Config) or cfg.path != str(CONFIG_PATH):
+        return None
+    return cfg
+
+
+def snapshot() -> Config:
+    """Return the configuration snapshot, loading it on first use."""
+    global _config
+    if _config is None:
+        _config = _inherited() or parse(CONFIG_PATH)
+    return _config
+
+
+def subscribe(callback):
+    """Call ``callback(old, new)`` whenever :func:`reload` changes the snapshot.
+
+    Callbacks run on the thread calling :func:`reload` and should return
+    quickly.  :func:`snapshot` already returns ``new`` while they run.
+
+    A callback returning ``False`` could not apply the change, for instance
+    because a port was busy.  It is called again, with the current snapshot
+    as both ``old`` and ``new``, by every later :func:`reload` or
+    :func:`check_reload` until it returns anything else, even if the file
+    did not change.
+    """
+    _subscribers.append(callback)
+    return callback
+
+
+def unsubscribe(callback):
+    for callbacks in (_subscribers, _pending):
+        try:
+            callbacks.remove(callback)
+        except ValueError:
+            pass
+
+
+def _notify(callbacks, old, new):
+    """Call ``callbacks`` and remember those asking to be retried."""
+    for callback in callbacks:
+        try:
+            applied = callback(old, new)
+        except Exception as exc:
+            log_exception(
+                "Applying new configuration failed: %s", exc, source=LOG_SOURCE
+            )
+            continue
+        if applied is False and callback not in _pending:
+            _pending.append(callback)
+
+
+def _retry_pending():
+    """Call the subscribers still waiting to apply the snapshot again."""
+    callbacks = list(_pending)
+    _pending.clear()
+    snap = snapshot()
+    _notify(callbacks, snap, snap)
+
+
+def reload() -> bool:
+    """Re-read the configuration file and notify subscribers of changes.
+
+    A file that fails validation is reported and the current snapshot is
+    kept, so a typo cannot take down running daemons.
+
+    Returns
+    -------
+    bool
+        ``True`` if the configuration changed.
+    """
+    global _config
+    with _reload_lock:
+        old = snapshot()
+        try:
+            new = parse(CONFIG_PATH)
+        except ConfigError as exc:
+            log_error("Keeping current configuration: %s", exc, source=LOG_SOURCE)
+            return False
+        _config = new
+        if dataclasses.replace(new, mtime=old.mtime) == old:
+            _retry_pending()
+            return False
+        log_info("Configuration reloaded from %s", CONFIG_PATH, source=LOG_SOURCE)
+        _pending.clear()
+        _notify(list(_subscribers), old, new)
+        return True
+
+
+def check_reload() -> bool:
+    """Reload if the file's modification time differs from the snapshot's.
+
+    Otherwise only the subscribers waiting to be retried are called.
+    """
+    try:
+        mtime = os.stat(CONFIG_PATH).st_mtime
+    except OSError:
+        mtime = None
+    if mtime == snapshot().mtime:
+        if _pending:
+            with _reload_lock:
+                _retry_pending()
+        return False
+    return reload()
+
+
 def load_aprs_config(section: str | None = None):
     """Return APRS configuration, optionally overridden per module.
 
@@ -45,145 +654,152 @@ def load_aprs_config(section: str | None = None):
     -------
     tuple
         ``(callsign, latitude, longitude, symbol_table, symbol, path, destination, version)``
-    """
-
-    cfg = _get_config()
-    aprs = cfg["APRS"]
-
-    callsign = aprs["callsign"]
-    latitude = _parse_float(aprs["latitude"])
-    longitude = _parse_float(aprs["longitude"])
-
-    symbol_table_raw = aprs.get("symbol_table", "primary").strip().lower()
-    symbol_table = "/" if symbol_table_raw == "primary" else "\\"
-    symbol = aprs.get("symbol", "_")
-    path = [p.strip() for p in aprs.get("path", "").split(",") if p.strip()]
 
-    if section and section in cfg:
-        sec = cfg[section]
-        sym_raw = sec.get("symbol_table", symbol_table_raw).strip().lower()
-        symbol_table = "/" if sym_raw == "primary" else "\\"
-        symbol = sec.get("symbol", symbol)
-        # support either digipeater_path or aprs_path for clarity
-        path_key = "digipeater_path" if "digipeater_path" in sec else "aprs_path"
-        if path_key in sec:
-            path = [p.strip() for p in sec.get(path_key, "").split(",") if p.strip()]
+    Raises
+    ------
+    KeyError
+        If there is no ``[APRS]`` section.
+    """
 
-    destination = aprs.get("destination", "APZ001")
-    version = aprs.get("version", "v5")
+    cfg = snapshot()
+    if cfg.aprs is None:
+        raise KeyError("APRS")
+    return cfg.aprs_sections.get(section, cfg.aprs).as_tuple()
 
-    return callsign, latitude, longitude, symbol_table, symbol, path, destination, version
 
 def load_ecowitt_config():
-    cfg = _get_config()
-    if "ECOWITT" not in cfg:
-        return {
-            "port": 8080,
-            "path": "/data/report",
-            "enabled": True,
-        }
-    eco = cfg["ECOWITT"]
+    eco = snapshot().ecowitt
     return {
-        "port": int(eco.get("port", 8080)),
-        "path": eco.get("path", "/data/report"),
-        "enabled": eco.getboolean("enabled", True),
+        "port": eco.port,
+        "path": eco.path,
+        "enabled": eco.enabled,
+        "max_connections": eco.max_connections,
+        "timeout": eco.timeout,
+        "max_body": eco.max_body,
+        "queue_size": eco.queue_size,
     }
 
 
 def load_hubtelemetry_config():
-    cfg = _get_config()
-    section = "HUBTELEMETRY"
-    if section not in cfg:
-        return {"enabled": True}
-    hub = cfg[section]
-    return {"enabled": hub.getboolean("enabled", True)}
-
-
-def _load_module_list(section, default):
-    cfg = _get_config()
-    if section not in cfg:
-        return default
-    sec = cfg[section]
-    if not sec.getboolean("enabled", True):
-        return []
-    modules = [m.strip() for m in sec.get("modules", ",".join(default)).split(",") if m.strip()]
-    return modules
+    snap = snapshot()
+    return {
+        "enabled": snap.hubtelemetry_enabled,
+        "sample_interval": snap.hub_sampler.interval,
+        "samples": snap.hub_sampler.size,
+    }
 
 
 def load_daemon_modules():
     """Return list of enabled daemon module names."""
-    return _load_module_list(
-        "DAEMONS",
-        ["daemons.ecowitt_listener", "daemons.kiss_client", "daemons.aprsis_client"],
-    )
+    return list(snapshot().daemons)
 
 
 def load_telemetry_modules():
     """Return list of enabled telemetry module names."""
-    return _load_module_list("TELEMETRY", ["telemetry.hub_telemetry"])
+    return list(snapshot().telemetry.modules)
+
+
+def load_telemetry_isolated():
+    """Return telemetry module names that must run in a separate interpreter."""
+    return list(snapshot().telemetry.isolated)
+
+
+def load_telemetry_workers():
+    """Return the number of worker threads used to run telemetry modules."""
+    return snapshot().telemetry.workers
 
 
 def load_telemetry_schedules():
     """Return mapping of telemetry module names to cron expressions."""
-    cfg = _get_config()
-    section = "TELEMETRY_SCHEDULES"
-    if section not in cfg:
-        return {}
-    sec = cfg[section]
-    return {name: expr for name, expr in sec.items()}
+    return dict(snapshot().telemetry.schedules)
 
 
-def load_direwolf_config():
-    cfg = _get_config()
-    section = "DIREWOLF"
-    if section not in cfg:
-        return {"enabled": True}
-    dw = cfg[section]
-    return {"enabled": dw.getboolean("enabled", True)}
+def load_telemetry_deadlines():
+    """Return mapping of telemetry module names to run deadlines in seconds.
 
+    Deadlines are given in ``[TELEMETRY_SCHEDULES]`` as
+    ``<module>.deadline = <seconds>``.  Modules without an entry use
+    :data:`DEFAULT_TELEMETRY_DEADLINE`.
+    """
+    return dict(snapshot().telemetry.deadlines)
 
-def load_kiss_client_config():
-    cfg = _get_config()
-    section = "KISS_CLIENT"
-    if section not in cfg:
-        return {"enabled": False, "host": "127.0.0.1", "port": 8001}
-    kc = cfg[section]
+
+def load_direwolf_config():
+    cfg = snapshot().direwolf
     return {
-        "enabled": kc.getboolean("enabled", True),
-        "host": kc.get("host", "127.0.0.1"),
-        "port": int(kc.get("port", 8001)),
+        "enabled": cfg.enabled,
+        "output_log": cfg.output_log,
+        "output_max_bytes": cfg.output_max_bytes,
+        "output_backups": cfg.output_backups,
+        "ring_size": cfg.ring_size,
     }
 
 
+def load_kiss_client_config():
+    kc = snapshot().kiss_client
+    return {"enabled": kc.enabled, "host": kc.host, "port": kc.port}
+
+
 def load_aprsis_config():
-    cfg = _get_config()
-    section = "APRS_IS"
-    if section not in cfg:
+    sec = snapshot().aprs_is
+    if sec is None:
         return {"enabled": False}
-    sec = cfg[section]
-    callsign = sec.get("callsign", cfg["APRS"].get("callsign"))
     return {
-        "enabled": sec.getboolean("enabled", False),
-        "callsign": callsign,
-        "passcode": sec.get("passcode", ""),
-        "server": sec.get("server", "noam.aprs2.net"),
-        "port": int(sec.get("port", 14580)),
-        "timeout": float(sec.get("timeout", 10)),
+        "enabled": sec.enabled,
+        "callsign": sec.callsign,
+        "passcode": sec.passcode,
+        "server": sec.servers[0][0],
+        "servers": sec.servers,
+        "port": sec.port,
+        "timeout": sec.timeout,
+    }
+
+
+def load_spool_config():
+    snap = snapshot()
+    sec = snap.spool
+    # relative to the configuration file
+    directory = Path(snap.path).resolve().parent / sec.directory
+    return {
+        "enabled": sec.enabled,
+        "directory": str(directory),
+        "max_bytes": sec.max_bytes,
+        "max_age": sec.max_age,
+    }
+
+
+def load_journal_config():
+    snap = snapshot()
+    sec = snap.journal
+    directory = Path(snap.path).resolve().parent / sec.directory
+    return {
+        "enabled": sec.enabled,
+        "directory": str(directory),
+        "segment_bytes": sec.segment_bytes,
+        "max_bytes": sec.max_bytes,
     }
 
 
+def load_metrics_config():
+    sec = snapshot().metrics
+    return {"enabled": sec.enabled, "host": sec.host, "port": sec.port}
+
+
+def load_tracing_config():
+    sec = snapshot().tracing
+    return {"enabled": sec.enabled, "slow_threshold": sec.slow_threshold}
+
+
 def load_rig_config():
-    cfg = _get_config()
-    section = "RIG"
-    if section not in cfg:
+    rig = snapshot().rig
+    if rig is None:
         return {"enabled": True}
-    rig = cfg[section]
-    result = {"enabled": rig.getboolean("enabled", True)}
-    if "rig_id" in rig:
-        result["rig_id"] = int(rig.get("rig_id", 0))
-    if "usb_num" in rig:
-        result["usb_num"] = int(rig.get("usb_num", 0))
-    if "baud" in rig:
-        result["baud"] = int(rig.get("baud"))
-    result["port"] = int(rig.get("port", RIGCTLD_PORT))
+    result = {"enabled": rig.enabled}
+    if rig.rig_id is not None:
+        result["rig_id"] = rig.rig_id
+    if rig.usb_num is not None:
+        result["usb_num"] = rig.usb_num
+    if rig.baud is not None:
+        result["baud"] = rig.baud
+    result["port"] = rig.port
     return result
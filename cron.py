@@ -0,0 +1,257 @@
+"""Compiled five-field cron expressions.
+
+Each expression is parsed once into integer bitsets for minute, hour, day of
+month, month and day of week.  :meth:`CronExpr.next_after` then finds the
+next matching minute with bit scans over those sets and integer calendar
+arithmetic, without stepping through candidate minutes.  Times are Unix
+timestamps interpreted as UTC, matching ``croniter(expr, float)``.
+
+Supported syntax is the classic one: ``*``, numbers, ``a-b`` ranges,
+``/step`` suffixes, comma separated lists, month and weekday names, ``7`` for
+Sunday and the ``@hourly`` style aliases.
+"""
+from functools import lru_cache
+
+_ALIASES = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+
+_MONTH_NAMES = {
+    name: i + 1
+    for i, name in enumerate(
+        ["jan", "feb", "mar", "apr", "may", "jun",
+         "jul", "aug", "sep", "oct", "nov", "dec"]
+    )
+}
+_DOW_NAMES = {
+    name: i for i, name in enumerate(["sun", "mon", "tue", "wed", "thu", "fri", "sat"])
+}
+
+# (low, high, names) for minute, hour, day of month, month, day of week.
+# Day of week accepts 7 as an alias for Sunday.
+_FIELDS = (
+    (0, 59, {}),
+    (0, 23, {}),
+    (1, 31, {}),
+    (1, 12, _MONTH_NAMES),
+    (0, 7, _DOW_NAMES),
+)
+
+_DAYS_IN_MONTH = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# No expression can fail to match for longer than the 400 year Gregorian
+# cycle; stop searching after that many months.
+_MAX_MONTHS = 400 * 12
+
+
+def _mask(low, high, step=1):
+    mask = 0
+    for i in range(low, high + 1, step):
+        mask |= 1 << i
+    return mask
+
+
+def _next_bit(mask, start):
+    """Return the lowest set bit of ``mask`` at or above ``start``."""
+    rest = mask >> start
+    if not rest:
+        return None
+    return start + (rest & -rest).bit_length() - 1
+
+
+def _first_bit(mask):
+    return (mask & -mask).bit_length() - 1
+
+
+def _value(token, names, expr):
+    token = token.lower()
+    if token in names:
+        return names[token]
+    if not token.isdigit():
+        raise ValueError(f"invalid cron value {token!r} in {expr!r}")
+    return int(token)
+
+
+def _parse_field(text, index, expr):
+    low, high, names = _FIELDS[index]
+    mask = 0
+    for part in text.split(","):
+        rng, _, step = part.partition("/")
+        if step:
+            if not step.isdigit() or int(step) == 0:
+                raise ValueError(f"invalid cron step {part!r} in {expr!r}")
+            step = int(step)
+        else:
+            step = 1
+        if rng == "*":
+            start, end = low, high
+        elif "-" in rng:
+            a, b = rng.split("-", 1)
+            start, end = _value(a, names, expr), _value(b, names, expr)
+        else:
+            start = _value(rng, names, expr)
+            # "5/15" means "5-max/15"
+            end = high if step > 1 or "/" in part else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"cron field {part!r} out of range in {expr!r}")
+        mask |= _mask(start, end, step)
+    if index == 4 and mask & (1 << 7):
+        mask = (mask | 1) & ~(1 << 7)
+    return mask
+
+
+def _days_from_civil(y, m, d):
+    """Days since 1970-01-01 for a proleptic Gregorian date."""
+    y -= m <= 2
+    era = y // 400
+    yoe = y - era * 400
+    doy = (153 * (m + (-3 if m > 2 else 9)) + 2) // 5 + d - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def _civil_from_days(z):
+    """Inverse of :func:`_days_from_civil`, returning ``(y, m, d)``."""
+    z += 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    d = doy - (153 * mp + 2) // 5 + 1
+    m = mp + (3 if mp < 10 else -9)
+    return yoe + era * 400 + (m <= 2), m, d
+
+
+def _days_in_month(y, m):
+    if m == 2 and y % 4 == 0 and (y % 100 != 0 or y % 400 == 0):
+        return 29
+    return _DAYS_IN_MONTH[m - 1]
+
+
+@lru_cache(maxsize=None)
+def _weekday_days(dow_mask, first_weekday, ndays):
+    """Bitset of days 1..ndays whose weekday is in ``dow_mask``."""
+    mask = 0
+    for d in range(1, ndays + 1):
+        if dow_mask >> ((first_weekday + d - 1) % 7) & 1:
+            mask |= 1 << d
+    return mask
+
+
+class CronExpr:
+    """A compiled cron expression.
+
+    Use :func:`compile` to share compiled expressions.
+    """
+
+    __slots__ = ("expr", "minutes", "hours", "doms", "months", "dows", "_day_or",
+                 "_dom_all", "_dow_all")
+
+    def __init__(self, expr: str):
+        text = _ALIASES.get(expr.strip().lower(), expr)
+        fields = text.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron expression {expr!r} must have five fields")
+        self.expr = expr
+        (self.minutes, self.hours, self.doms, self.months, self.dows) = (
+            _parse_field(f, i, expr) for i, f in enumerate(fields)
+        )
+        self._dom_all = self.doms == _mask(1, 31)
+        self._dow_all = self.dows == _mask(0, 6)
+        # Like cron, a restricted day of month and day of week match either.
+        self._day_or = not self._dom_all and not self._dow_all
+
+    def __repr__(self):
+        return f"CronExpr({self.expr!r})"
+
+    def _day_mask(self, y, m):
+        ndays = _days_in_month(y, m)
+        valid = _mask(1, ndays)
+        if self._dow_all:
+            return self.doms & valid
+        first_weekday = (_days_from_civil(y, m, 1) + 4) % 7  # 0 = Sunday
+        by_dow = _weekday_days(self.dows, first_weekday, ndays)
+        if self._dom_all:
+            return by_dow
+        if self._day_or:
+            return (self.doms & valid) | by_dow
+        return self.doms & valid & by_dow
+
+    def next_after(self, timestamp: float) -> float:
+        """Return the first matching minute strictly after ``timestamp``."""
+        minute_count = int(timestamp // 60) + 1
+        days, minute_of_day = divmod(minute_count, 1440)
+        hour, minute = divmod(minute_of_day, 60)
+        y, m, d = _civil_from_days(days)
+
+        for _ in range(_MAX_MONTHS):
+            if not self.months >> m & 1:
+                nxt = _next_bit(self.months, m + 1)
+                if nxt is None:
+                    y, m = y + 1, _first_bit(self.months)
+                else:
+                    m = nxt
+                d, hour, minute = 1, 0, 0
+            day = _next_bit(self._day_mask(y, m), d)
+            if day is None:
+                y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+                d, hour, minute = 1, 0, 0
+                continue
+            if day != d:
+                d, hour, minute = day, 0, 0
+            h = _next_bit(self.hours, hour)
+            if h is not None and h != hour:
+                hour, minute = h, 0
+            mi = _next_bit(self.minutes, minute) if h is not None else None
+            if mi is None:
+                h = _next_bit(self.hours, hour + 1)
+                if h is None:
+                    # roll over to the next day
+                    d, hour, minute = d + 1, 0, 0
+                    if d > _days_in_month(y, m):
+                        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+                        d = 1
+                    continue
+                hour, mi = h, _first_bit(self.minutes)
+            return float(
+                (_days_from_civil(y, m, d) * 1440 + hour * 60 + mi) * 60
+            )
+        raise ValueError(f"cron expression {self.expr!r} never matches")
+
+    def upcoming(self, timestamp: float, count: int) -> list[float]:
+        """Return the next ``count`` fire times after ``timestamp``."""
+        fires = []
+        for _ in range(count):
+            timestamp = self.next_after(timestamp)
+            fires.append(timestamp)
+        return fires
+
+
+@lru_cache(maxsize=None)
+def compile(expr: str) -> CronExpr:
+    """Return the compiled form of ``expr``, parsing it only once."""
+    return CronExpr(expr)
+
+
+class CronIter:
+    """Minimal stand-in for ``croniter(expr, start)``.
+
+    Only ``get_next(float)`` is provided, which is all the scheduler needs.
+    """
+
+    def __init__(self, expr: str, start: float):
+        self._expr = compile(expr)
+        self._cur = start
+
+    def get_next(self, ret_type=float):
+        if ret_type is not float:
+            raise TypeError("CronIter only returns float timestamps")
+        self._cur = self._expr.next_after(self._cur)
+        return self._cur
@@ -4,14 +4,20 @@
 import socket
 import threading
 import queue
+import random
+import re
 import time
 import os
 import multiprocessing
-from multiprocessing.managers import SyncManager
+import multiprocessing.connection
+import multiprocessing.queues
 from pathlib import Path
-from utils import log_info, log_exception
+from utils import log_info, log_error
 
+import aprsis_pool
 import config
+import metrics
+import spool
 
 LOG_SOURCE = (
     f"{__package__}.{Path(__file__).stem}" if __package__ else Path(__file__).stem
@@ -19,20 +25,72 @@ LOG_SOURCE = (
 
 cfg = config.load_aprsis_config()
 ENABLED = cfg.get("enabled", False)
-HOST = cfg.get("server")
-PORT = cfg.get("port")
+
+
+def _servers(cfg):
+    servers = cfg.get("servers")
+    if servers is None:
+        servers = ((cfg["server"], cfg.get("port")),) if cfg.get("server") else ()
+    return tuple(servers)
+
+
+SERVERS = _servers(cfg)
 CALLSIGN = cfg.get("callsign")
 PASSCODE = cfg.get("passcode")
 TIMEOUT = cfg.get("timeout", 10)
+# section the settings above were read from; see start()
+_section = config.snapshot().aprs_is
+
+# APRS-IS servers send a comment line about every 20 seconds.  A session
+# that has been silent for this long is considered dead.
+IDLE_TIMEOUT = 90.0
+
+# Reconnect delays, as in ``kiss_client``.
+BACKOFF_INITIAL = 1.0
+BACKOFF_MAX = 120.0
 
 _manager = None
 FRAME_QUEUE = None
 _stop = threading.Event()
-_socket = None
+_reconnect = threading.Event()
+_session = None
+_thread = None
+_ready = threading.Event()
+_wake_r, _wake_w = socket.socketpair()
+_wake_r.setblocking(False)
+_wake_w.setblocking(False)
 
+# Seconds to wait for a frame whose put woke the session; it may still be
+# on its way through the queue's feeder thread.
+FEED_WAIT = 1.0
 
-class _QueueManager(SyncManager):
-    pass
+# "connecting", "connected", "backoff" or "stopped"; see :func:`status`.
+state = "stopped"
+
+# ``frames`` sent in ``writes`` taking ``send_time`` seconds in total and
+# ``send_time_max`` at most; ``sessions`` logged in, ``reconnects``,
+# ``connect_failures``, ``login_failures``, ``idle_timeouts``,
+# ``lines_received`` from the server, and frames ``spooled`` to and
+# ``replayed`` from the durable spool.
+stats = {
+    "frames": 0,
+    "writes": 0,
+    "send_time": 0.0,
+    "send_time_max": 0.0,
+    "sessions": 0,
+    "reconnects": 0,
+    "connect_failures": 0,
+    "login_failures": 0,
+    "idle_timeouts": 0,
+    "lines_received": 0,
+    "spooled": 0,
+    "replayed": 0,
+}
+
+_LOGRESP = re.compile(
+    r"^# logresp (?P<call>\S+) (?P<status>verified|unverified)(?:, server (?P<server>\S+))?",
+    re.IGNORECASE,
+)
 
 
 def _get_frame_queue():
@@ -52,57 +110,403 @@ _QUEUE_METHODS = (
 )
 
 
+class LoginError(ConnectionError):
+    """The server did not accept the login."""
+
+
+class Session:
+    """One logged-in APRS-IS connection.
+
+    Server output is consumed through :meth:`read` whenever the socket is
+    readable, so keepalive comments never fill the receive buffer and
+    ``last_heard`` tracks when the server last spoke.
+    """
+
+    def __init__(self, sock, address=None, greeting=b""):
+        self.sock = sock
+        self.address = address
+        self.server = None
+        self.connected_at = time.monotonic()
+        self.last_heard = self.connected_at
+        # the pool already read the server's greeting line
+        self._buf = greeting.partition(b"\n")[2]
+
+    def fileno(self):
+        return self.sock.fileno()
+
+    def login(self, callsign, passcode, timeout):
+        """Send the login line and wait for a matching ``# logresp``.
+
+        Raises
+        ------
+        LoginError
+            If the reply is missing, for another callsign, or unverified
+            although a passcode was given.
+        """
+        self.sock.sendall(f"user {callsign} pass {passcode} vers wx-helios 0\r\n".encode())
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LoginError("no logresp from server")
+            self.sock.settimeout(remaining)
+            try:
+                lines = self.read()
+            except TimeoutError:
+                raise LoginError("no logresp from server") from None
+            for line in lines:
+                m = _LOGRESP.match(line)
+                if not m:
+                    continue
+                if m["call"].upper() != str(callsign).upper():
+                    raise LoginError(f"logresp for {m['call']}, expected {callsign}")
+                if m["status"].lower() != "verified" and str(passcode) != "-1":
+                    raise LoginError(f"login for {callsign} not verified")
+                self.server = m["server"]
+                self.sock.settimeout(timeout)
+                return m["status"].lower() == "verified"
+
+    def read(self):
+        """Receive what the server sent and return the complete lines.
+
+        Raises
+        ------
+        ConnectionError
+            If the server closed the connection.
+        """
+        data = self.sock.recv(4096)
+        if not data:
+            raise ConnectionError("server closed the connection")
+        self.last_heard = time.monotonic()
+        lines = (self._buf + data).split(b"\n")
+        self._buf = lines.pop()
+        stats["lines_received"] += len(lines)
+        return [line.decode(errors="replace").rstrip("\r") for line in lines]
+
+    def send(self, frames):
+        """Write ``frames`` as TNC2 lines with one ``sendall``."""
+        payload = "".join(frame + "\r\n" for frame in frames).encode()
+        start = time.perf_counter()
+        self.sock.sendall(payload)
+        elapsed = time.perf_counter() - start
+        stats["frames"] += len(frames)
+        stats["writes"] += 1
+        stats["send_time"] += elapsed
+        stats["send_time_max"] = max(stats["send_time_max"], elapsed)
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+def _backoff(attempt):
+    """Return the delay before reconnect ``attempt`` (0-based)."""
+    delay = min(BACKOFF_MAX, BACKOFF_INITIAL * 2**attempt)
+    return random.uniform(delay / 2, delay)
+
+
+def _describe():
+    return ", ".join(f"{host}:{port}" for host, port in SERVERS) or "no server"
+
+
+def _connect():
+    """Return a new logged-in :class:`Session` to the best server.
+
+    The server is picked by :meth:`aprsis_pool.ServerPool.connect`; one
+    that rejects the login is tried last next time.
+    """
+    pool = aprsis_pool.pool_for(SERVERS, TIMEOUT)
+    conn = pool.connect()
+    session = Session(conn.sock, conn.address, conn.greeting)
+    try:
+        session.login(CALLSIGN, PASSCODE, TIMEOUT)
+    except LoginError:
+        pool.mark_failed(conn.address)
+        session.close()
+        raise
+    except BaseException:
+        session.close()
+        raise
+    return session
+
 
 def _connect_with_retry():
-    """Return a connected socket, retrying until stop is signaled."""
+    """Return a logged-in session, retrying until stop is signaled."""
+    global state
+    attempt = 0
     while not _stop.is_set():
+        state = "connecting"
         try:
-            sock = socket.create_connection((HOST, PORT), timeout=TIMEOUT)
-            login = f"user {CALLSIGN} pass {PASSCODE} vers wx-helios 0\r\n".encode()
-            sock.sendall(login)
-            sock.settimeout(0.2)
-            return sock
-        except Exception:
-            time.sleep(0.2)
+            session = _connect()
+        except LoginError as exc:
+            stats["login_failures"] += 1
+            log_error("APRS-IS login failed: %s", exc, source=LOG_SOURCE)
+        except OSError as exc:
+            stats["connect_failures"] += 1
+            if not attempt:
+                log_error(
+                    "Cannot connect to APRS-IS (%s): %s; retrying",
+                    _describe(),
+                    exc,
+                    source=LOG_SOURCE,
+                )
+        else:
+            stats["sessions"] += 1
+            state = "connected"
+            _ready.set()
+            log_info(
+                "Logged in to APRS-IS %s:%s (%s)",
+                *session.address,
+                session.server or "unknown server",
+                source=LOG_SOURCE,
+            )
+            return session
+        state = "backoff"
+        _spool_queued(_backoff(attempt))
+        attempt += 1
     return None
 
 
-def _run():
-    """Open APRS-IS connection and send queued frames."""
-    global _socket
-    _socket = _connect_with_retry()
-    if not _socket:
-        log_exception("aprsis_client failed to connect", source=LOG_SOURCE)
+def _spool_frames(sp, frames):
+    if frames:
+        sp.append(frame.encode() for frame in frames)
+        stats["spooled"] += len(frames)
+
+
+def _spool_queued(timeout):
+    """Wait ``timeout`` seconds, moving frames queued meanwhile to the spool.
+
+    Without a spool the frames stay in :data:`FRAME_QUEUE`.
+    """
+    sp = spool.for_sink("aprsis")
+    if sp is None or FRAME_QUEUE is None:
+        _stop.wait(timeout)
         return
+    deadline = time.monotonic() + timeout
+    while not _stop.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        try:
+            frame = FRAME_QUEUE.get(timeout=remaining)
+        except queue.Empty:
+            return
+        frames = [] if frame is None else [frame]
+        if frame is None or not _take_frames(frames):
+            _stop.set()
+        _spool_frames(sp, frames)
+
+
+def _replay_spool(session):
+    """Send the spooled frames over ``session``, oldest first."""
+    sp = spool.for_sink("aprsis")
+    while sp is not None and not _stop.is_set():
+        frames, token = sp.peek(64)
+        if not frames:
+            return
+        session.send([frame.decode() for frame in frames])
+        sp.commit(token, len(frames))
+        stats["replayed"] += len(frames)
+
 
+def _wake():
+    """Interrupt the session's wait, e.g. after :data:`_reconnect` was set."""
     try:
-        while not _stop.is_set():
-            try:
-                frame = FRAME_QUEUE.get(timeout=0.2)
-            except queue.Empty:
-                continue
+        _wake_w.send(b"\0")
+    except OSError:
+        pass
+
+
+def _drain_wake():
+    try:
+        while _wake_r.recv(4096):
+            pass
+    except (BlockingIOError, OSError):
+        pass
 
-            if frame is None:
-                _stop.set()
-                break
 
+class _FrameQueue(multiprocessing.queues.Queue):
+    """``multiprocessing.Queue`` waking the session for every frame put.
+
+    Puts made through the queue manager run in its forked process, which
+    shares the wake-up socket.
+    """
+
+    def __init__(self):
+        super().__init__(ctx=multiprocessing.get_context())
+
+    def put(self, obj, block=True, timeout=None):
+        super().put(obj, block, timeout)
+        _wake()
+
+
+def _take_frames(pending, wait=0.0):
+    """Move queued frames to ``pending``; return ``False`` on the stop sentinel.
+
+    The first frame is waited for up to ``wait`` seconds.
+    """
+    while True:
+        try:
+            if wait:
+                frame = FRAME_QUEUE.get(timeout=wait)
+                wait = 0.0
+            else:
+                frame = FRAME_QUEUE.get_nowait()
+        except queue.Empty:
+            return True
+        if frame is None:
+            return False
+        pending.append(frame)
+
+
+def _serve(session, pending):
+    """Exchange data on ``session`` until stop or reconnect is requested.
+
+    Blocks on the socket and the wake-up channel, which every frame put on
+    :data:`FRAME_QUEUE` writes to.  Frames are removed from ``pending`` only
+    after they were written.
+    """
+    while not _stop.is_set() and not _reconnect.is_set():
+        if pending:
+            session.send(pending)
+            pending.clear()
+        idle = session.last_heard + IDLE_TIMEOUT - time.monotonic()
+        if idle <= 0:
+            stats["idle_timeouts"] += 1
+            raise ConnectionError(f"nothing heard from server for {IDLE_TIMEOUT:.0f}s")
+        ready = multiprocessing.connection.wait([session.sock, _wake_r], idle)
+        woken = _wake_r in ready
+        if woken:
+            _drain_wake()
+        if session.sock in ready:
+            session.read()
+        # a wake-up not caused by stop or reconnect announces a frame
+        wait = FEED_WAIT if woken and not (_stop.is_set() or _reconnect.is_set()) else 0.0
+        if not _take_frames(pending, wait):
+            _stop.set()
+            if pending:
+                session.send(pending)
+                pending.clear()
+
+
+def _run():
+    """Keep an APRS-IS session open and send queued frames over it.
+
+    Queued frames stay in :data:`FRAME_QUEUE` while there is no session;
+    frames whose write failed are sent again on the next one.  With
+    ``[SPOOL]`` enabled both go to the durable spool instead, which is
+    replayed as soon as a new session is logged in.
+    """
+    global _session, state
+    pending = []
+    connected_before = False
+    _drain_wake()
+    try:
+        while not _stop.is_set():
+            if _reconnect.is_set():
+                _reconnect.clear()
+                _close_session()
+            if _session is None:
+                _session = _connect_with_retry()
+                if _session is None:
+                    break
+                if connected_before:
+                    stats["reconnects"] += 1
+                connected_before = True
             try:
-                _socket.sendall((frame + "\r\n").encode())
-            except Exception:
-                log_exception("Failed to send APRS-IS frame", source=LOG_SOURCE)
-                break
+                _replay_spool(_session)
+                _serve(_session, pending)
+            except OSError as exc:
+                log_error(
+                    "APRS-IS session with %s:%s lost: %s",
+                    *_session.address,
+                    exc,
+                    source=LOG_SOURCE,
+                )
+                _close_session()
+                sp = spool.for_sink("aprsis")
+                if sp is not None:
+                    _spool_frames(sp, pending)
+                    pending.clear()
     finally:
-        if _socket:
-            try:
-                _socket.close()
-            except Exception:
-                pass
-            _socket = None
+        _close_session()
+        state = "stopped"
+
+
+def _close_session():
+    global _session
+    _ready.clear()
+    if _session is not None:
+        _session.close()
+        _session = None
+
+
+def _collect_metrics():
+    families = metrics.stats_families(
+        "wx_aprsis",
+        stats,
+        "APRS-IS client",
+        gauges=("send_time_max",),
+        names={"send_time": "send_seconds", "send_time_max": "send_seconds_max"},
+    )
+    families.append(
+        (
+            "wx_aprsis_queue_depth",
+            "gauge",
+            "Frames waiting for APRS-IS",
+            [({}, metrics.queue_depth(FRAME_QUEUE) or 0)],
+        )
+    )
+    families.append(
+        (
+            "wx_aprsis_connected",
+            "gauge",
+            "1 while logged in to APRS-IS",
+            [({}, state == "connected")],
+        )
+    )
+    return families
+
+
+metrics.register_collector("aprsis_client", _collect_metrics)
+
+
+def status():
+    """Return the session state, uptime, send latency and counters."""
+    session = _session
+    result = {
+        "state": state,
+        "server": session.server if session else None,
+        "address": session.address if session else None,
+        "uptime": time.monotonic() - session.connected_at if session else 0.0,
+        "send_latency": stats["send_time"] / stats["writes"] if stats["writes"] else 0.0,
+    }
+    result.update(stats)
+    return result
+
+
+def is_ready():
+    """Return ``True`` while a session is logged in."""
+    return _ready.is_set()
+
+
+def wait_ready(timeout=None):
+    """Wait up to ``timeout`` seconds for a logged-in session.
+
+    Returns ``False`` at once if the client is not running.
+    """
+    if not (_thread and _thread.is_alive()):
+        return _ready.is_set()
+    return _ready.wait(timeout)
 
 
 class _Server:
     def shutdown(self):
+        config.unsubscribe(_on_reload)
         _stop.set()
+        _wake()
         if FRAME_QUEUE:
             FRAME_QUEUE.put(None)
         if _manager:
@@ -114,13 +518,22 @@ class _Server:
 
 def start():
     """Start the APRS-IS client thread."""
+    if config.snapshot().aprs_is != _section:
+        # changed while the daemon was stopped and not subscribed
+        _on_reload(None, config.snapshot())
     if not ENABLED:
         log_info("aprsis_client disabled in configuration", source=LOG_SOURCE)
         return None, None
 
-    global _manager, FRAME_QUEUE
+    # only needed once the daemon runs; see utils._queue_manager
+    from multiprocessing.managers import SyncManager
+
+    class _QueueManager(SyncManager):
+        pass
+
+    global _manager, FRAME_QUEUE, _thread
     authkey = os.urandom(16)
-    FRAME_QUEUE = multiprocessing.Queue()
+    FRAME_QUEUE = _FrameQueue()
 
     _QueueManager.register(
         "get_frame_queue",
@@ -132,13 +545,45 @@ def start():
     _manager.start()
 
     _stop.clear()
+    _reconnect.clear()
 
     host, port = _manager.address
     os.environ["APRSIS_MANAGER_HOST"] = host
     os.environ["APRSIS_MANAGER_PORT"] = str(port)
     os.environ["APRSIS_MANAGER_AUTHKEY"] = authkey.hex()
 
-    thread = threading.Thread(target=_run, daemon=True)
+    thread = _thread = threading.Thread(target=_run, daemon=True)
     thread.start()
+    config.subscribe(_on_reload)
     log_info("aprsis_client thread started", source=LOG_SOURCE)
     return _Server(), thread
+
+
+def _on_reload(old, new):
+    """Follow a reloaded configuration without restarting the daemon.
+
+    A new server or login makes the running connection reconnect; disabling
+    the client stops it.  The launcher starts it again once re-enabled.
+    """
+    global ENABLED, SERVERS, CALLSIGN, PASSCODE, TIMEOUT, _section
+    cfg = config.load_aprsis_config()
+    _section = config.snapshot().aprs_is
+    settings = (
+        _servers(cfg),
+        cfg.get("callsign"),
+        cfg.get("passcode"),
+        cfg.get("timeout", 10),
+    )
+    moved = settings != (SERVERS, CALLSIGN, PASSCODE, TIMEOUT)
+    ENABLED = cfg.get("enabled", False)
+    SERVERS, CALLSIGN, PASSCODE, TIMEOUT = settings
+    if not (_thread and _thread.is_alive()):
+        return
+    if not ENABLED:
+        log_info("aprsis_client disabled, stopping", source=LOG_SOURCE)
+        _Server().shutdown()
+    elif moved:
+        log_info("aprsis_client reconnecting to %s", _describe(), source=LOG_SOURCE)
+        _reconnect.set()
+        _wake()
+
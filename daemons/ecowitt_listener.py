@@ -1,13 +1,16 @@
 #!/usr/bin/env python3
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from urllib.parse import urlparse, parse_qsl
-from datetime import datetime, timedelta, timezone
-from collections import deque
+from datetime import date, datetime, timezone
 from pathlib import Path
 import utils
+import queue
+import sys
 import time
 import threading
 import config
+import metrics
+import tracing
 
 LOG_SOURCE = (
     f"{__package__}.{Path(__file__).stem}" if __package__ else Path(__file__).stem
@@ -17,38 +20,40 @@ cfg = config.load_ecowitt_config()
 ENABLED = cfg.get("enabled", True)
 PORT = cfg.get("port", 8080)
 PATH = cfg.get("path", "/data/report")
-RAIN_CACHE = deque(maxlen=24)      # store tuples (timestamp, hourly_inch)
+MAX_CONNECTIONS = cfg.get("max_connections", 16)
+TIMEOUT = cfg.get("timeout", 10.0)
+MAX_BODY = cfg.get("max_body", 16384)
+QUEUE_SIZE = cfg.get("queue_size", 64)
+RAIN_HOURS = 24                    # window of the rolling rain total
 MIN_INTERVAL = 300                 # minimum seconds between APRS packets
 LAST_TX = 0.0
 
-try:
-    (
-        _callsign,
-        _lat_dd,
-        _lon_dd,
-        _symbol_table,
-        _symbol,
-        _digipeater_path,
-        _dest,
-        _version,
-    ) = config.load_aprs_config("ECOWITT")
-except Exception as exc:
-    utils.log_exception(
-        "Falling back to default APRS config: %s", exc, source=LOG_SOURCE
-    )
-    _callsign = "NOCALL-13"
-    _lat_dd = 0.0
-    _lon_dd = 0.0
-    _symbol_table = "/"
-    _symbol = "-"
-    _digipeater_path = []
-    _dest = "APZ001"
-    _version = ""
-
-try:
-    APRS_IS_CFG = config.load_aprsis_config()
-except Exception:
-    APRS_IS_CFG = {"enabled": False}
+# Uploads are parsed by the HTTP handler and queued here; a single pipeline
+# thread converts, rate-limits and transmits them so responses never wait
+# on the radio or APRS-IS.
+INGEST_QUEUE = queue.Queue(maxsize=QUEUE_SIZE)
+STATS = {
+    "received": 0,
+    "dropped": 0,
+    "processed": 0,
+    "failed": 0,
+    "queue_wait": 0.0,
+    "queue_wait_max": 0.0,
+    "process_time": 0.0,
+    "process_time_max": 0.0,
+}
+_stats_lock = threading.Lock()
+_pipeline_thread = None
+_pipeline_abort = None      # Event telling the running pipeline to give up
+
+SKIPPED = metrics.counter(
+    "wx_ecowitt_uploads_skipped_total",
+    "Uploads not sent because the last packet is younger than MIN_INTERVAL",
+)
+CONVERT_TIME = metrics.histogram(
+    "wx_ecowitt_to_aprs_seconds", "Time to convert an upload to an APRS report"
+)
+
 
 def format_lat_lon(lat, lon):
     """Return APRS-formatted latitude and longitude strings."""
@@ -62,31 +67,150 @@ def format_lat_lon(lat, lon):
     lon_str = f"{lon_deg:03d}{lon_min:05.2f}{ew}"
     return lat_str, lon_str
 
-LAT, LON = format_lat_lon(_lat_dd, _lon_dd)
-POS_BLOCK = f"{LAT}/{LON}_"
+
+def _load_station():
+    """Set the APRS station globals from the current configuration."""
+    global _callsign, _lat_dd, _lon_dd, _symbol_table, _symbol
+    global _digipeater_path, _dest, _version, _encoder, APRS_IS_CFG
+    global LAT, LON, POS_BLOCK
+    try:
+        (
+            _callsign,
+            _lat_dd,
+            _lon_dd,
+            _symbol_table,
+            _symbol,
+            _digipeater_path,
+            _dest,
+            _version,
+        ) = config.load_aprs_config("ECOWITT")
+    except Exception as exc:
+        utils.log_exception(
+            "Falling back to default APRS config: %s", exc, source=LOG_SOURCE
+        )
+        _callsign = "NOCALL-13"
+        _lat_dd = 0.0
+        _lon_dd = 0.0
+        _symbol_table = "/"
+        _symbol = "-"
+        _digipeater_path = []
+        _dest = "APZ001"
+        _version = ""
+
+    _encoder = utils.ax25_encoder(_dest, _callsign, _digipeater_path)
+
+    try:
+        APRS_IS_CFG = config.load_aprsis_config()
+    except Exception:
+        APRS_IS_CFG = {"enabled": False}
+
+    LAT, LON = format_lat_lon(_lat_dd, _lon_dd)
+    POS_BLOCK = f"{LAT}/{LON}_"
+
+
+_load_station()
 
 # configure logging to use UTC timestamps
 utils.setup_logging(use_utc=True)
 
 
-def update_rain_24h(post):
-    """Call once per upload; returns rain last 24 h ×100 for pPPP."""
-    # 1) remember this hour’s total
-    hour = datetime.strptime(post["dateutc"], "%Y-%m-%d %H:%M:%S").replace(minute=0, second=0)
-    hourly = float(post["hourlyrainin"])
-    # if last cached hour matches, overwrite; else append
-    if RAIN_CACHE and RAIN_CACHE[-1][0] == hour:
-        RAIN_CACHE[-1] = (hour, hourly)
-    else:
-        RAIN_CACHE.append((hour, hourly))
+def dateutc_hour(text: str) -> int:
+    """Return the hour number of a ``YYYY-MM-DD HH:MM:SS`` timestamp.
+
+    Hours are counted from 0001-01-01.  The fixed layout is sliced directly
+    instead of going through ``strptime``; malformed input raises
+    ``ValueError`` like ``strptime`` would.
+    """
+    if (
+        len(text) != 19
+        or text[4] != "-"
+        or text[7] != "-"
+        or text[10] != " "
+        or text[13] != ":"
+        or text[16] != ":"
+    ):
+        raise ValueError(f"invalid dateutc {text!r}")
+    hour, minute, second = int(text[11:13]), int(text[14:16]), int(text[17:19])
+    if not (0 <= hour <= 23 and 0 <= minute <= 59 and 0 <= second <= 61):
+        raise ValueError(f"invalid dateutc {text!r}")
+    # date() validates the day against the month and year
+    return date(int(text[0:4]), int(text[5:7]), int(text[8:10])).toordinal() * 24 + hour
+
+
+class RainWindow:
+    """Rolling sum of hourly rain readings over the last ``hours`` hours.
+
+    Slot ``hour % hours`` holds the latest reading for that hour together
+    with the hour it belongs to, and a running total is adjusted as slots are
+    written or expire, so an update never re-sums the window.  Amounts are
+    kept as integer micro-inches so the total does not drift.
+
+    The window ends at the newest hour seen.  A reading for an older hour
+    still inside the window replaces that hour's slot; anything older is
+    ignored.
+    """
+
+    def __init__(self, hours: int = RAIN_HOURS):
+        self._size = hours
+        self._hours = [None] * hours
+        self._amounts = [0] * hours
+        self._total = 0
+        self._count = 0
+        self._newest = None
+
+    def __len__(self):
+        """Number of hours in the window that have a reading."""
+        return self._count
+
+    def clear(self):
+        self._hours = [None] * self._size
+        self._amounts = [0] * self._size
+        self._total = 0
+        self._count = 0
+        self._newest = None
+
+    def _expire(self, slot):
+        if self._hours[slot] is not None:
+            self._total -= self._amounts[slot]
+            self._count -= 1
+            self._hours[slot] = None
+            self._amounts[slot] = 0
+
+    def update(self, hour: int, inches: float) -> int:
+        """Record ``inches`` for ``hour`` and return the window total ×100."""
+        newest = self._newest
+        if newest is None or hour > newest:
+            if newest is None or hour - newest >= self._size:
+                self.clear()
+            else:
+                # expire the slots the window slid past, at most size - 1
+                for h in range(newest + 1, hour):
+                    self._expire(h % self._size)
+            self._newest = hour
+        elif hour <= newest - self._size:
+            return self.total
+        slot = hour % self._size
+        if self._hours[slot] != hour:
+            self._expire(slot)
+            self._hours[slot] = hour
+            self._count += 1
+        amount = round(inches * 1_000_000)
+        self._total += amount - self._amounts[slot]
+        self._amounts[slot] = amount
+        return self.total
+
+    @property
+    def total(self) -> int:
+        """Rain over the window in hundredths of an inch."""
+        return round(self._total / 10_000)
+
+
+RAIN_CACHE = RainWindow()
 
-    # 2) toss anything older than 24 h
-    cutoff = hour - timedelta(hours=24)
-    while RAIN_CACHE and RAIN_CACHE[0][0] < cutoff:
-        RAIN_CACHE.popleft()
 
-    # 3) sum and scale
-    return int(round(sum(r for _, r in RAIN_CACHE) * 100))
+def update_rain_24h(post):
+    """Call once per upload; returns rain last 24 h ×100 for pPPP."""
+    return RAIN_CACHE.update(dateutc_hour(post["dateutc"]), float(post["hourlyrainin"]))
 
 # --- helper ----------------------------------------------------------
 def clamp(val, lo, hi):
@@ -171,10 +295,18 @@ def log_params(client, params):
             now - LAST_TX,
             source=LOG_SOURCE,
         )
+        SKIPPED.inc()
         return
+    trace = tracing.current.get()
+    if trace is not None:
+        trace.mark("log")
+    started = time.perf_counter()
     info = ecowitt_to_aprs(params)
+    CONVERT_TIME.observe(time.perf_counter() - started)
+    ax25 = _encoder.encode(info)
+    if trace is not None:
+        trace.mark("convert")
     utils.log_info(info, source=LOG_SOURCE)
-    ax25 = utils.build_ax25_frame(_dest, _callsign, _digipeater_path, info)
     utils.send_via_kiss(ax25)
     if APRS_IS_CFG.get("enabled"):
         tnc2 = utils.build_tnc2_frame(
@@ -187,7 +319,166 @@ def log_params(client, params):
     LAST_TX = now
 
 
+def enqueue_upload(client, params, trace=None) -> bool:
+    """Queue an upload for the pipeline; return ``False`` if the queue is full."""
+    try:
+        INGEST_QUEUE.put_nowait((client, params, time.monotonic(), trace))
+    except queue.Full:
+        with _stats_lock:
+            STATS["dropped"] += 1
+            dropped = STATS["dropped"]
+        utils.log_error(
+            "Ingest queue full, dropping upload from %s (%d dropped)",
+            client,
+            dropped,
+            source=LOG_SOURCE,
+        )
+        return False
+    with _stats_lock:
+        STATS["received"] += 1
+    return True
+
+
+def _pipeline(abort):
+    """Process queued uploads until a ``None`` sentinel arrives.
+
+    If the event ``abort`` is set instead, the uploads still queued are
+    dropped.
+    """
+    while not abort.is_set():
+        item = INGEST_QUEUE.get()
+        try:
+            if item is None:
+                return
+            client, params, queued, trace = item
+            started = time.monotonic()
+            failed = False
+            if trace is not None:
+                trace.mark("ingest_queue")
+            # send_via_kiss picks the trace up from the context
+            token = tracing.current.set(trace)
+            try:
+                log_params(client, params)
+            except Exception as exc:
+                failed = True
+                utils.log_exception(
+                    "Failed to process upload from %s: %s",
+                    client,
+                    exc,
+                    source=LOG_SOURCE,
+                )
+            finally:
+                tracing.current.reset(token)
+            finished = time.monotonic()
+            with _stats_lock:
+                wait = started - queued
+                took = finished - started
+                STATS["processed"] += 1
+                STATS["failed"] += failed
+                STATS["queue_wait"] += wait
+                STATS["queue_wait_max"] = max(STATS["queue_wait_max"], wait)
+                STATS["process_time"] += took
+                STATS["process_time_max"] = max(STATS["process_time_max"], took)
+        finally:
+            INGEST_QUEUE.task_done()
+    _drop_queued()
+
+
+def _drop_queued():
+    """Discard the queued uploads, counting them as dropped."""
+    while True:
+        try:
+            item = INGEST_QUEUE.get_nowait()
+        except queue.Empty:
+            return
+        if item is not None:
+            with _stats_lock:
+                STATS["dropped"] += 1
+        INGEST_QUEUE.task_done()
+
+
+def start_pipeline():
+    """Start the pipeline thread if it is not already running."""
+    global _pipeline_thread, _pipeline_abort
+    if _pipeline_thread and _pipeline_thread.is_alive():
+        return _pipeline_thread
+    _pipeline_abort = threading.Event()
+    _pipeline_thread = threading.Thread(
+        target=_pipeline, args=(_pipeline_abort,), name="ecowitt-pipeline", daemon=True
+    )
+    _pipeline_thread.start()
+    return _pipeline_thread
+
+
+def stop_pipeline(timeout=5.0):
+    """Let the pipeline finish queued uploads and stop it.
+
+    Waits at most ``timeout`` seconds.  If the queue stays full for that
+    long, the pipeline stops after the upload it is working on and drops
+    the others.
+    """
+    global _pipeline_thread
+    if not _pipeline_thread:
+        return
+    deadline = time.monotonic() + timeout
+    try:
+        INGEST_QUEUE.put(None, timeout=timeout)
+    except queue.Full:
+        utils.log_error(
+            "Ingest queue still full, dropping %d upload(s)",
+            INGEST_QUEUE.qsize(),
+            source=LOG_SOURCE,
+        )
+        _pipeline_abort.set()
+    _pipeline_thread.join(max(0.0, deadline - time.monotonic()))
+    _pipeline_thread = None
+
+
+def ingest_stats():
+    """Return a snapshot of the ingest counters including the queue depth."""
+    with _stats_lock:
+        stats = dict(STATS)
+    stats["depth"] = INGEST_QUEUE.qsize()
+    return stats
+
+
+def _collect_metrics():
+    stats = ingest_stats()
+    depth = stats.pop("depth")
+    families = metrics.stats_families(
+        "wx_ecowitt",
+        stats,
+        "Ecowitt ingest",
+        gauges=("queue_wait_max", "process_time_max"),
+    )
+    families.append(
+        ("wx_ecowitt_queue_depth", "gauge", "Uploads waiting for the pipeline", [({}, depth)])
+    )
+    listener = _listener
+    if listener:
+        families.append(
+            (
+                "wx_ecowitt_connections_rejected_total",
+                "counter",
+                "Connections refused over max_connections",
+                [({}, listener[0].rejected)],
+            )
+        )
+    return families
+
+
+metrics.register_collector("ecowitt_listener", _collect_metrics)
+
+
 class Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps the connection open between uploads.  ``timeout``
+    # bounds both reading a request and waiting idle for the next one.
+    protocol_version = "HTTP/1.1"
+    timeout = TIMEOUT
+    # the status line and body are written separately; without this the
+    # client's delayed ACK stalls every keep-alive response by ~40 ms
+    disable_nagle_algorithm = True
+
     def setup(self):
         super().setup()
         utils.log_info(
@@ -197,50 +488,259 @@ class Handler(BaseHTTPRequestHandler):
             source=LOG_SOURCE,
         )
 
+    def _accept(self, params, trace):
+        if trace is not None:
+            trace.mark("parse")
+        if enqueue_upload(self.client_address[0], params, trace):
+            self._okay()
+        else:
+            self.send_response(503)
+            self.send_header("Retry-After", "60")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
     def _okay(self):
         self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", "3")
         self.end_headers()
         self.wfile.write(b"OK\n")
 
     def do_GET(self):
+        trace = tracing.begin()
         if not self.path.startswith(PATH):
             self.send_error(404, "Wrong path")
             return
         params = dict(parse_qsl(urlparse(self.path).query))
-        log_params(self.client_address[0], params)
-        self._okay()
+        self._accept(params, trace)
 
     def do_POST(self):
+        trace = tracing.begin()
         if not self.path.startswith(PATH):
             self.send_error(404, "Wrong path")
             return
         # read the URL-encoded body
-        length = int(self.headers.get('Content-Length', 0))
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_error(400, "Bad Content-Length")
+            self.close_connection = True
+            return
+        if length > MAX_BODY:
+            self.send_error(413, "Upload too large")
+            self.close_connection = True
+            return
         body   = self.rfile.read(length).decode(errors="replace")
         params = dict(parse_qsl(body))
-        log_params(self.client_address[0], params)
-        self._okay()
+        self._accept(params, trace)
 
     def log_message(self, *_):  # silence default logging
         pass
 
+
+class IngestServer(ThreadingHTTPServer):
+    """Threaded HTTP server with a cap on concurrent connections.
+
+    Connections over the cap are answered with ``503`` and closed right away
+    so a burst of clients cannot exhaust threads or file descriptors.  The
+    cap, :attr:`max_connections`, may be changed while the server runs.
+    """
+
+    # idle keep-alive connections must not delay shutdown
+    block_on_close = False
+
+    def __init__(self, address, handler, max_connections=MAX_CONNECTIONS):
+        super().__init__(address, handler)
+        self.max_connections = max_connections
+        self._active = 0
+        self._active_lock = threading.Lock()
+        self.rejected = 0
+
+    def _release(self):
+        with self._active_lock:
+            self._active -= 1
+
+    def process_request(self, request, client_address):
+        with self._active_lock:
+            full = self._active >= self.max_connections
+            if not full:
+                self._active += 1
+        if full:
+            self.rejected += 1
+            try:
+                request.sendall(
+                    b"HTTP/1.1 503 Service Unavailable\r\n"
+                    b"Content-Length: 0\r\nConnection: close\r\n\r\n"
+                )
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self._release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._release()
+
+    def handle_error(self, request, client_address):
+        exc = sys.exc_info()[1]
+        if isinstance(exc, (ConnectionError, TimeoutError)):
+            # clients that hang up early are routine, not worth a traceback
+            return
+        utils.log_exception(
+            "Error handling upload from %s", client_address[0], source=LOG_SOURCE
+        )
+
+
+_listener = None            # (server, thread) while the HTTP server is open
+_listener_lock = threading.Lock()
+_started = False
+_failed_port = None         # port the last rebind could not listen on
+
+
+def _sections():
+    """Return the parts of the snapshot the module settings come from."""
+    snap = config.snapshot()
+    return snap.ecowitt, snap.aprs, snap.aprs_sections, snap.aprs_is
+
+
+# sections the settings were read from; see start()
+_section = _sections()
+
+
+def _open_listener(port=None, max_connections=None):
+    port = PORT if port is None else port
+    max_connections = MAX_CONNECTIONS if max_connections is None else max_connections
+    server = IngestServer(("", port), Handler, max_connections)
+    thread = threading.Thread(
+        target=server.serve_forever, name="ecowitt-http", daemon=True
+    )
+    thread.start()
+    utils.log_info("Listening on 0.0.0.0:%s%s", port, PATH, source=LOG_SOURCE)
+    return server, thread
+
+
+def _close_listener(listener):
+    server, thread = listener
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+class _Listener:
+    """Handle returned by :func:`start`.
+
+    The HTTP server behind it may be replaced when the configuration is
+    reloaded; :meth:`shutdown` stops whichever one is current as well as the
+    pipeline.
+    """
+
+    def shutdown(self):
+        global _listener, _started
+        config.unsubscribe(_on_reload)
+        with _listener_lock:
+            listener, _listener = _listener, None
+            _started = False
+        if listener:
+            _close_listener(listener)
+        stop_pipeline()
+
+
 def start():
     """Start the HTTP listener in a background thread.
 
     Returns
     -------
     tuple
-        ``(server, thread)`` if enabled, otherwise ``(None, None)``.
+        ``(listener, pipeline_thread)`` if enabled, otherwise
+        ``(None, None)``.
     """
+    global _listener, _started
+    if _sections() != _section:
+        # changed while the daemon was stopped and not subscribed
+        _on_reload(None, config.snapshot())
     if not ENABLED:
         utils.log_info("Ecowitt listener disabled in configuration", source=LOG_SOURCE)
         return None, None
 
-    server = HTTPServer(("", PORT), Handler)
-    thread = threading.Thread(target=server.serve_forever, daemon=True)
-    thread.start()
-    utils.log_info("Listening on 0.0.0.0:%s%s", PORT, PATH, source=LOG_SOURCE)
-    return server, thread
+    thread = start_pipeline()
+    with _listener_lock:
+        _listener = _open_listener()
+        _started = True
+    config.subscribe(_on_reload)
+    return _Listener(), thread
+
+
+def _resize_queue(size):
+    with INGEST_QUEUE.mutex:
+        INGEST_QUEUE.maxsize = size
+        INGEST_QUEUE.not_full.notify_all()
+
+
+def _on_reload(old, new):
+    """Apply a reloaded configuration to the running listener.
+
+    Returns ``False`` if the new port is busy: the old listener keeps
+    serving and :mod:`config` calls this again until the port is free.
+    """
+    global ENABLED, PORT, PATH, MAX_CONNECTIONS, TIMEOUT, MAX_BODY, QUEUE_SIZE
+    global _listener, _failed_port, _section
+    _section = _sections()
+    _load_station()
+    cfg = config.load_ecowitt_config()
+    bind = (cfg["enabled"], cfg["port"], cfg["max_connections"])
+    rebind = bind != (ENABLED, PORT, MAX_CONNECTIONS)
+    PATH = cfg["path"]
+    TIMEOUT = Handler.timeout = cfg["timeout"]
+    MAX_BODY = cfg["max_body"]
+    if cfg["queue_size"] != QUEUE_SIZE:
+        QUEUE_SIZE = cfg["queue_size"]
+        _resize_queue(QUEUE_SIZE)
+    if not rebind:
+        return
+    enabled, port, max_connections = bind
+    with _listener_lock:
+        if not _started or not enabled:
+            ENABLED, PORT, MAX_CONNECTIONS = bind
+        if not _started:
+            return
+        current = _listener
+        if not enabled:
+            _listener = None
+            if current:
+                _close_listener(current)
+            utils.log_info("Ecowitt listener disabled", source=LOG_SOURCE)
+            return
+        if current and current[0].server_address[1] == port:
+            # same port: no need to let go of the socket for a new cap
+            current[0].max_connections = max_connections
+            ENABLED, PORT, MAX_CONNECTIONS = bind
+            return
+        try:
+            _listener = _open_listener(port, max_connections)
+        except OSError as exc:
+            if port != _failed_port:
+                utils.log_error(
+                    "Cannot listen on port %s, will retry: %s",
+                    port,
+                    exc,
+                    source=LOG_SOURCE,
+                )
+            _failed_port = port
+            return False
+        _failed_port = None
+        ENABLED, PORT, MAX_CONNECTIONS = bind
+        if current:
+            _close_listener(current)
+
 
 
 if __name__ == "__main__":
@@ -3,14 +3,18 @@
 import socket
 import threading
 import queue
+import random
 import time
 import os
 import multiprocessing
-from multiprocessing.managers import SyncManager
 from pathlib import Path
-from utils import log_info, log_exception
+from utils import log_info, log_error
 
 import config
+import kiss
+import metrics
+import spool
+import tracing
 
 LOG_SOURCE = (
     f"{__package__}.{Path(__file__).stem}" if __package__ else Path(__file__).stem
@@ -20,15 +24,45 @@ cfg = config.load_kiss_client_config()
 ENABLED = cfg.get("enabled", False)
 HOST = cfg.get("host", "127.0.0.1")
 PORT = cfg.get("port", 8001)
+# section the settings above were read from; see start()
+_section = config.snapshot().kiss_client
+
+# Seconds before the first reconnect attempt; doubled per failure up to
+# BACKOFF_MAX, with random jitter so several clients do not retry in step.
+BACKOFF_INITIAL = 0.2
+BACKOFF_MAX = 30.0
+
+# Most frames and bytes sent with one write when a burst is queued.
+MAX_BATCH = 64
+MAX_BATCH_BYTES = 16384
 
 _manager = None
 FRAME_QUEUE = None
 _stop = threading.Event()
+_reconnect = threading.Event()
+_ready = threading.Event()
 _socket = None
+_thread = None
 
+# "connecting", "connected", "backoff" or "stopped"; see :func:`status`.
+state = "stopped"
 
-class _QueueManager(SyncManager):
-    pass
+# ``frames`` and ``bytes`` sent, ``writes`` (batches) and the ``syscalls``
+# needed to deliver them; see :func:`write_stats`.  ``connects`` counts
+# established connections, ``reconnects`` those after a lost link and
+# ``connect_failures`` refused or timed out attempts.  ``spooled`` and
+# ``replayed`` count frames written to and sent from the durable spool.
+stats = {
+    "frames": 0,
+    "writes": 0,
+    "syscalls": 0,
+    "bytes": 0,
+    "connects": 0,
+    "reconnects": 0,
+    "connect_failures": 0,
+    "spooled": 0,
+    "replayed": 0,
+}
 
 
 def _get_frame_queue():
@@ -49,65 +83,310 @@ _QUEUE_METHODS = (
 
 
 
-def _escape(ax25_frame: bytes) -> bytes:
-    escaped = bytearray()
-    for b in ax25_frame:
-        if b == 0xC0:
-            escaped += b"\xDB\xDC"
-        elif b == 0xDB:
-            escaped += b"\xDB\xDD"
-        else:
-            escaped.append(b)
-    return b"\xC0\x00" + bytes(escaped) + b"\xC0"
+def _backoff(attempt):
+    """Return the delay before reconnect ``attempt`` (0-based)."""
+    delay = min(BACKOFF_MAX, BACKOFF_INITIAL * 2**attempt)
+    return random.uniform(delay / 2, delay)
 
 
 def _connect_with_retry():
     """Return a connected socket, retrying until stop is signaled."""
+    global state
+    attempt = 0
     while not _stop.is_set():
+        state = "connecting"
         try:
             sock = socket.create_connection((HOST, PORT))
             sock.settimeout(0.2)
-            return sock
-        except Exception:
-            time.sleep(0.2)
+            # frames are already batched; do not hold them back for Nagle
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as exc:
+            stats["connect_failures"] += 1
+            if not attempt:
+                log_error(
+                    "Cannot connect to KISS TNC at %s:%s: %s; retrying",
+                    HOST,
+                    PORT,
+                    exc,
+                    source=LOG_SOURCE,
+                )
+            state = "backoff"
+            _spool_queued(_backoff(attempt))
+            attempt += 1
+            continue
+        stats["connects"] += 1
+        state = "connected"
+        _ready.set()
+        log_info("Connected to KISS TNC at %s:%s", HOST, PORT, source=LOG_SOURCE)
+        return sock
     return None
 
 
-def _run():
-    """Open a single KISS TCP connection and send queued frames."""
-    global _socket
-    _socket = _connect_with_retry()
-    if not _socket:
-        log_exception("kiss_client failed to connect", source=LOG_SOURCE)
+def _spool_queued(timeout):
+    """Wait ``timeout`` seconds, moving frames queued meanwhile to the spool.
+
+    Without a spool the frames stay in :data:`FRAME_QUEUE`.
+    """
+    sp = spool.for_sink("kiss")
+    if sp is None or FRAME_QUEUE is None:
+        _stop.wait(timeout)
         return
+    deadline = time.monotonic() + timeout
+    while not _stop.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        batch = _next_batch(remaining)
+        if batch and batch[-1] is None:
+            batch.pop()
+            _stop.set()
+        _spool_frames(sp, batch)
+
+
+def _spool_frames(sp, frames):
+    if frames:
+        sp.append(frames)
+        stats["spooled"] += len(frames)
 
+
+def _replay_spool():
+    """Send the spooled frames, oldest first.
+
+    Returns ``False`` if the connection failed; frames not yet sent stay
+    in the spool.
+    """
+    sp = spool.for_sink("kiss")
+    while sp is not None and not _stop.is_set():
+        frames, token = sp.peek(MAX_BATCH)
+        if not frames:
+            break
+        buffers = [kiss.encode(frame) for frame in frames]
+        size = sum(map(len, buffers))
+        try:
+            calls = _send_all(_socket, buffers)
+        except Exception as exc:
+            log_error("KISS connection lost during spool replay: %s", exc, source=LOG_SOURCE)
+            _disconnect()
+            return False
+        sp.commit(token, len(frames))
+        stats["replayed"] += len(frames)
+        stats["writes"] += 1
+        stats["syscalls"] += calls
+        stats["bytes"] += size
+    return True
+
+
+def _disconnect():
+    global _socket
+    _ready.clear()
+    if _socket:
+        try:
+            _socket.close()
+        except Exception:
+            pass
+        _socket = None
+
+
+def _next_batch(timeout=0.2):
+    """Return frames available now, waiting up to ``timeout`` for the first.
+
+    The list ends with ``None`` if the stop sentinel was dequeued.
+    """
+    try:
+        frame = FRAME_QUEUE.get(timeout=timeout)
+    except queue.Empty:
+        return []
+    batch = [frame]
+    size = len(frame) if frame is not None else 0
+    while frame is not None and len(batch) < MAX_BATCH and size < MAX_BATCH_BYTES:
+        try:
+            frame = FRAME_QUEUE.get_nowait()
+        except queue.Empty:
+            break
+        batch.append(frame)
+        if frame is not None:
+            size += len(frame)
+    return batch
+
+
+def _send_all(sock, pending):
+    """Write the encoded frames in ``pending`` to ``sock``.
+
+    Frames are removed from ``pending`` once fully written, so after a
+    failure it holds exactly the frames to send again; a frame cut short by
+    the failure is resent whole on the next connection.  ``sendmsg`` writes
+    the frames with one vectored call and a short write resumes from the
+    first unsent byte.
+
+    Returns
+    -------
+    int
+        Number of write syscalls used.
+    """
+    if not hasattr(sock, "sendmsg"):
+        sock.sendall(b"".join(pending))
+        pending.clear()
+        return 1
+    calls = 0
+    offset = 0
+    while pending:
+        views = [memoryview(pending[0])[offset:], *pending[1:]]
+        try:
+            sent = sock.sendmsg(views)
+        except TimeoutError:
+            # nothing was written; the TNC is just slow to drain
+            if _stop.is_set():
+                raise
+            continue
+        finally:
+            calls += 1
+        sent += offset
+        while pending and sent >= len(pending[0]):
+            sent -= len(pending.pop(0))
+        offset = sent
+    return calls
+
+
+def write_stats():
+    """Return :data:`stats` with syscalls per frame and bytes per write."""
+    result = dict(stats)
+    result["syscalls_per_frame"] = (
+        stats["syscalls"] / stats["frames"] if stats["frames"] else 0.0
+    )
+    result["bytes_per_write"] = (
+        stats["bytes"] / stats["writes"] if stats["writes"] else 0.0
+    )
+    return result
+
+
+def _collect_metrics():
+    families = metrics.stats_families("wx_kiss", stats, "KISS client")
+    families.append(
+        (
+            "wx_kiss_queue_depth",
+            "gauge",
+            "Frames waiting for the TNC",
+            [({}, metrics.queue_depth(FRAME_QUEUE) or 0)],
+        )
+    )
+    families.append(
+        (
+            "wx_kiss_connected",
+            "gauge",
+            "1 while the TNC link is up",
+            [({}, state == "connected")],
+        )
+    )
+    return families
+
+
+metrics.register_collector("kiss_client", _collect_metrics)
+
+
+def status():
+    """Return the connection state, endpoint and counters."""
+    return {
+        "state": state,
+        "host": HOST,
+        "port": PORT,
+        "ready": _ready.is_set(),
+        **stats,
+    }
+
+
+def is_ready():
+    """Return ``True`` while the TNC link is up."""
+    return _ready.is_set()
+
+
+def wait_ready(timeout=None):
+    """Wait up to ``timeout`` seconds for the TNC link to come up.
+
+    Returns ``False`` at once if the client is not running.
+    """
+    if not (_thread and _thread.is_alive()):
+        return _ready.is_set()
+    return _ready.wait(timeout)
+
+
+def _run():
+    """Keep a KISS TCP connection open and send queued frames over it.
+
+    A lost connection is re-established with :func:`_connect_with_retry`;
+    frames that were not fully written are sent again once it is back.
+    With ``[SPOOL]`` enabled they, and the frames queued while the link is
+    down, are kept in the durable spool and replayed first.
+    """
+    global _socket, state
+    pending = []
+    batch = []
+    traced = []
+    stopping = False
+    connected_before = False
     try:
         while not _stop.is_set():
-            try:
-                frame = FRAME_QUEUE.get(timeout=0.2)
-            except queue.Empty:
-                continue
+            if _reconnect.is_set():
+                _reconnect.clear()
+                _disconnect()
+            if _socket is None:
+                _socket = _connect_with_retry()
+                if not _socket:
+                    break
+                if connected_before:
+                    stats["reconnects"] += 1
+                connected_before = True
+                if not _replay_spool():
+                    continue
 
-            if frame is None:
-                _stop.set()
-                break
+            if not pending:
+                batch = _next_batch()
+                if not batch:
+                    continue
+                stopping = batch[-1] is None
+                if stopping:
+                    batch.pop()
+                traced = tracing.traces(batch, "kiss_queue")
+                pending = [kiss.encode(frame) for frame in batch]
 
-            try:
-                _socket.send(_escape(frame))
-            except Exception:
-                log_exception("Failed to send KISS frame", source=LOG_SOURCE)
+            if pending:
+                frames, size = len(pending), sum(map(len, pending))
+                try:
+                    calls = _send_all(_socket, pending)
+                except Exception as exc:
+                    log_error(
+                        "KISS connection to %s:%s lost: %s; resending %d frame(s)",
+                        HOST,
+                        PORT,
+                        exc,
+                        len(pending),
+                        source=LOG_SOURCE,
+                    )
+                    _disconnect()
+                    sp = spool.for_sink("kiss")
+                    if sp is not None:
+                        # keep the unsent frames on disk rather than in memory
+                        _spool_frames(sp, batch[len(batch) - len(pending):])
+                        pending = []
+                        traced = []
+                    continue
+                stats["frames"] += frames
+                stats["writes"] += 1
+                stats["syscalls"] += calls
+                stats["bytes"] += size
+                for trace in traced:
+                    tracing.finish(trace, "write")
+                traced = []
+            if stopping:
+                _stop.set()
                 break
     finally:
-        if _socket:
-            try:
-                _socket.close()
-            except Exception:
-                pass
-            _socket = None
+        _disconnect()
+        state = "stopped"
 
 
 class _Server:
     def shutdown(self):
+        config.unsubscribe(_on_reload)
         _stop.set()
         if FRAME_QUEUE:
             FRAME_QUEUE.put(None)
@@ -120,11 +399,20 @@ class _Server:
 
 def start():
     """Start the KISS client thread."""
+    if config.snapshot().kiss_client != _section:
+        # changed while the daemon was stopped and not subscribed
+        _on_reload(None, config.snapshot())
     if not ENABLED:
         log_info("kiss_client disabled in configuration", source=LOG_SOURCE)
         return None, None
 
-    global _manager, FRAME_QUEUE
+    # only needed once the daemon runs; see utils._queue_manager
+    from multiprocessing.managers import SyncManager
+
+    class _QueueManager(SyncManager):
+        pass
+
+    global _manager, FRAME_QUEUE, _thread
     authkey = os.urandom(16)
     FRAME_QUEUE = multiprocessing.Queue()
 
@@ -138,13 +426,37 @@ def start():
     _manager.start()
 
     _stop.clear()
+    _reconnect.clear()
 
     host, port = _manager.address
     os.environ["KISS_MANAGER_HOST"] = host
     os.environ["KISS_MANAGER_PORT"] = str(port)
     os.environ["KISS_MANAGER_AUTHKEY"] = authkey.hex()
 
-    thread = threading.Thread(target=_run, daemon=True)
+    thread = _thread = threading.Thread(target=_run, daemon=True)
     thread.start()
+    config.subscribe(_on_reload)
     log_info("kiss_client thread started", source=LOG_SOURCE)
     return _Server(), thread
+
+
+def _on_reload(old, new):
+    """Follow a reloaded configuration without restarting the daemon.
+
+    A new host or port makes the running connection reconnect; disabling
+    the client stops it.  The launcher starts it again once re-enabled.
+    """
+    global ENABLED, HOST, PORT, _section
+    cfg = config.load_kiss_client_config()
+    _section = config.snapshot().kiss_client
+    moved = (cfg["host"], cfg["port"]) != (HOST, PORT)
+    ENABLED, HOST, PORT = cfg["enabled"], cfg["host"], cfg["port"]
+    if not (_thread and _thread.is_alive()):
+        return
+    if not ENABLED:
+        log_info("kiss_client disabled, stopping", source=LOG_SOURCE)
+        _Server().shutdown()
+    elif moved:
+        log_info("kiss_client reconnecting to %s:%s", HOST, PORT, source=LOG_SOURCE)
+        _reconnect.set()
+
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""HTTP endpoint serving :mod:`metrics` to a Prometheus scraper.
+
+``GET /metrics`` renders every registered metric and collector; the daemons
+only pay for their counters when they are scraped.  The exporter is off
+unless ``enabled = yes`` is set in ``[METRICS]`` and it binds to the
+loopback interface by default.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import threading
+
+import config
+import metrics
+from utils import log_info
+
+LOG_SOURCE = (
+    f"{__package__}.{Path(__file__).stem}" if __package__ else Path(__file__).stem
+)
+
+cfg = config.load_metrics_config()
+ENABLED = cfg.get("enabled", False)
+HOST = cfg.get("host", "127.0.0.1")
+PORT = cfg.get("port", 9108)
+# section the settings above were read from; see start()
+_section = config.snapshot().metrics
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_server = None          # (server, thread) while the endpoint is open
+_server_lock = threading.Lock()
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404, "Try /metrics")
+            return
+        body = metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *_):  # silence default logging
+        pass
+
+
+class MetricsServer(ThreadingHTTPServer):
+    daemon_threads = True
+    block_on_close = False
+
+
+class _Server:
+    """Handle returned by :func:`start`."""
+
+    def shutdown(self):
+        global _server
+        config.unsubscribe(_on_reload)
+        with _server_lock:
+            current, _server = _server, None
+        if current:
+            server, thread = current
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+
+def address():
+    """Return the bound ``(host, port)``, or ``None`` while closed."""
+    current = _server
+    return current[0].server_address[:2] if current else None
+
+
+def start():
+    """Start the metrics endpoint in a background thread.
+
+    Returns
+    -------
+    tuple
+        ``(server, thread)`` if enabled, otherwise ``(None, None)``.
+    """
+    global _server
+    if config.snapshot().metrics != _section:
+        # changed while the daemon was stopped and not subscribed
+        _on_reload(None, config.snapshot())
+    if not ENABLED:
+        log_info("Metrics exporter disabled in configuration", source=LOG_SOURCE)
+        return None, None
+    server = MetricsServer((HOST, PORT), Handler)
+    thread = threading.Thread(
+        target=server.serve_forever, name="metrics-http", daemon=True
+    )
+    thread.start()
+    with _server_lock:
+        _server = server, thread
+    config.subscribe(_on_reload)
+    log_info(
+        "Serving metrics on http://%s:%s/metrics",
+        HOST,
+        server.server_address[1],
+        source=LOG_SOURCE,
+    )
+    return _Server(), thread
+
+
+def _on_reload(old, new):
+    """Close the endpoint when ``[METRICS]`` changes.
+
+    The launcher starts it again on the new address once it is enabled.
+    """
+    global ENABLED, HOST, PORT, _section
+    cfg = config.load_metrics_config()
+    _section = config.snapshot().metrics
+    if (cfg["enabled"], cfg["host"], cfg["port"]) == (ENABLED, HOST, PORT):
+        return
+    ENABLED, HOST, PORT = cfg["enabled"], cfg["host"], cfg["port"]
+    if _server is not None:
+        log_info("Metrics settings changed, closing the endpoint", source=LOG_SOURCE)
+        _Server().shutdown()
+
+
+
+if __name__ == "__main__":
+    srv, th = start()
+    if srv and th:
+        try:
+            th.join()
+        except KeyboardInterrupt:
+            srv.shutdown()
@@ -0,0 +1,198 @@
+"""Statistics parsed from Direwolf's console output.
+
+The launcher starts Direwolf with its stdout and stderr on a pipe and hands
+the pipe to :func:`attach`.  A reader thread drains it line by line so
+Direwolf never blocks on a full pipe, matches every line once against
+:data:`PATTERN` and keeps the parsed values in a bounded ring.  Telemetry
+modules running in the launcher read them through :func:`current`.
+
+Three kinds of lines are recognised:
+
+``queue``
+    ``busy=12.5% ... rcvq=3(0.0) sendq=2(0.0)`` channel statistics.
+``audio``
+    ``receive audio level CH0 44`` from the ``-a`` device report.
+``packet``
+    ``audio level = 39(17/12)`` printed with each received packet.
+"""
+import logging
+import logging.handlers
+import re
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from pathlib import Path
+
+from utils import log_error, log_info
+
+LOG_SOURCE = (
+    f"{__package__}.{Path(__file__).stem}" if __package__ else Path(__file__).stem
+)
+
+# Samples kept when the configuration does not say otherwise.
+RING_SIZE = 512
+
+PATTERN = re.compile(
+    r"busy=(?P<busy>[0-9.]+)%.*?rcvq=(?P<rcvq>\d+).*?sendq=(?P<sendq>\d+)"
+    r"|receive audio levels? CH(?P<channel>\d+) (?P<level>\d+)"
+    r"|audio level = (?P<rx_level>\d+)\((?P<mark>\d+)/(?P<space>\d+)\)"
+)
+
+Sample = namedtuple("Sample", "seq time kind values")
+
+
+def parse(line):
+    """Return ``(kind, values)`` for a statistics line, else ``None``."""
+    m = PATTERN.search(line)
+    if m is None:
+        return None
+    if m.group("busy") is not None:
+        return "queue", {
+            "busy": float(m.group("busy")),
+            "rcvq": int(m.group("rcvq")),
+            "sendq": int(m.group("sendq")),
+        }
+    if m.group("level") is not None:
+        return "audio", {
+            "channel": int(m.group("channel")),
+            "level": int(m.group("level")),
+        }
+    return "packet", {
+        "rx_level": int(m.group("rx_level")),
+        "mark": int(m.group("mark")),
+        "space": int(m.group("space")),
+    }
+
+
+class Monitor:
+    """Reader for one Direwolf output stream.
+
+    Parameters
+    ----------
+    stream : binary file
+        Direwolf's stdout, read until EOF.
+    ring_size : int, optional
+        Number of samples kept in memory.
+    sink : callable, optional
+        Called with every raw line, for instance to log it.
+    """
+
+    def __init__(self, stream, ring_size=RING_SIZE, sink=None):
+        self._stream = stream
+        self._sink = sink
+        self._ring = deque(maxlen=max(1, ring_size))
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._latest = {}
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="direwolf-output", daemon=True
+        )
+        self._thread.start()
+        return self._thread
+
+    def _run(self):
+        try:
+            for raw in iter(self._stream.readline, b""):
+                line = raw.decode(errors="replace").rstrip("\r\n")
+                if self._sink is not None:
+                    self._sink(line)
+                self.feed(line)
+        except (OSError, ValueError) as exc:
+            log_error("Direwolf output closed: %s", exc, source=LOG_SOURCE)
+
+    def feed(self, line):
+        """Parse ``line`` and record it; return the :class:`Sample` or ``None``."""
+        parsed = parse(line)
+        if parsed is None:
+            return None
+        kind, values = parsed
+        with self._lock:
+            self._seq += 1
+            sample = Sample(self._seq, time.time(), kind, values)
+            self._ring.append(sample)
+            if kind == "audio":
+                levels = self._latest.setdefault("audio_level", {})
+                levels[values["channel"]] = values["level"]
+            else:
+                self._latest.update(values)
+            self._latest["time"] = sample.time
+        return sample
+
+    def latest(self):
+        """Return the newest value of every statistic seen so far."""
+        with self._lock:
+            latest = dict(self._latest)
+            if "audio_level" in latest:
+                latest["audio_level"] = dict(latest["audio_level"])
+            return latest
+
+    def since(self, seq=0, kind=None):
+        """Return samples newer than ``seq`` and the newest sequence number.
+
+        Samples that already fell out of the ring are not returned.
+        """
+        with self._lock:
+            samples = [
+                s for s in self._ring
+                if s.seq > seq and (kind is None or s.kind == kind)
+            ]
+            return samples, self._seq
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_monitor = None
+
+
+def _rotating_sink(path, max_bytes, backups):
+    logger = logging.getLogger(f"{LOG_SOURCE}.output")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backups
+    )
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    logger.addHandler(handler)
+    return logger.info
+
+
+def _console_sink(line):
+    print(line, file=sys.stdout, flush=True)
+
+
+def attach(proc, cfg=None):
+    """Start reading the output of Direwolf process ``proc``.
+
+    ``cfg`` is the dictionary from :func:`config.load_direwolf_config`.  Raw
+    lines go to ``output_log`` when set, otherwise to the console as before.
+    """
+    global _monitor
+    cfg = cfg or {}
+    output_log = cfg.get("output_log")
+    if output_log:
+        sink = _rotating_sink(
+            output_log,
+            cfg.get("output_max_bytes", 1 << 20),
+            cfg.get("output_backups", 3),
+        )
+        log_info("Writing Direwolf output to %s", output_log, source=LOG_SOURCE)
+    else:
+        sink = _console_sink
+    _monitor = Monitor(proc.stdout, cfg.get("ring_size", RING_SIZE), sink)
+    _monitor.start()
+    return _monitor
+
+
+def current():
+    """Return the :class:`Monitor` of the running Direwolf, or ``None``."""
+    return _monitor
@@ -0,0 +1,513 @@
+"""Time-indexed journal of the frames handed to the transmit path.
+
+:func:`utils.send_via_kiss` and :func:`utils.send_via_aprsis` pass every
+frame to :func:`record`, which only appends it to an in-memory queue.  A
+writer thread moves queued records to disk every :data:`FLUSH_INTERVAL`
+seconds, so the send path never waits for the file system.
+
+Records go to segment files named after the time, in milliseconds, of
+their first record.  A segment is closed once it reaches
+``segment_bytes`` and the oldest segments are removed beyond
+``max_bytes``.  Each record is ``time, length, sink, source length`` and
+a CRC-32 of those fields and the rest, followed by the source module name
+and the raw frame.  Next to every
+segment a sparse ``.idx`` file holds ``(time, offset)`` for one record
+in every :data:`INDEX_SPACING` bytes, so a query seeks close to its
+start time instead of reading the segment from the beginning.
+
+Several processes may write the same journal; writes are serialized with
+``flock`` on a lock file in the journal directory.  Records of different
+processes can therefore be out of order by up to a flush interval, which
+queries allow for with :data:`SLACK`.  A record torn by a crash fails its
+checksum and ends a scan of the segment.  Before appending to a segment
+that another writer has touched, a :class:`Journal` checks its tail and
+cuts off such a record, so later records stay readable.
+
+Run ``python journal.py --since 2024-05-01T12:00 --until 2024-05-01T13:00``
+to list what was sent in that hour.
+"""
+import atexit
+import bisect
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import deque, namedtuple
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not on Windows
+    fcntl = None
+
+import config
+from utils import log_error
+
+LOG_SOURCE = (
+    f"{__package__}.{Path(__file__).stem}" if __package__ else Path(__file__).stem
+)
+
+SINKS = ("kiss", "aprsis")
+
+SEGMENT_SUFFIX = ".wxj"
+INDEX_SUFFIX = ".idx"
+LOCK_NAME = ".lock"
+
+_RECORD = struct.Struct("<dIBB")
+_CRC = struct.Struct("<I")
+_INDEX = struct.Struct("<dQ")
+
+# Bytes of records between two index entries.
+INDEX_SPACING = 64 << 10
+
+# Seconds between writes of queued records.
+FLUSH_INTERVAL = 0.5
+
+# Records queued in memory before new ones are dropped.
+MAX_PENDING = 10000
+
+# Seconds records of concurrent writers may be out of time order.
+SLACK = 5.0
+
+Record = namedtuple("Record", "time sink source data")
+
+
+def _segment_start(path):
+    return int(path.name[: -len(SEGMENT_SUFFIX)])
+
+
+def segments(directory):
+    """Return the segment files of ``directory``, oldest first."""
+    try:
+        paths = Path(directory).glob("*" + SEGMENT_SUFFIX)
+        return sorted(
+            (p for p in paths if p.name[: -len(SEGMENT_SUFFIX)].isdigit()),
+            key=_segment_start,
+        )
+    except OSError:
+        return []
+
+
+def _index_path(segment):
+    return segment.with_suffix(INDEX_SUFFIX)
+
+
+class Journal:
+    """Writer for the journal in ``directory``.
+
+    ``stats`` counts ``records`` and ``bytes`` written, ``writes`` (one
+    per flush), records ``dropped`` because the queue was full or a write
+    failed, ``segments`` started and torn tails cut off in ``repairs``.
+    """
+
+    def __init__(self, directory, segment_bytes=4 << 20, max_bytes=None):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self._pending = deque()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread = None
+        self._start_lock = threading.Lock()
+        # (segment, size) after this journal's last write; see _write
+        self._tail = None
+        self.stats = dict.fromkeys(
+            ("records", "bytes", "writes", "dropped", "segments", "repairs"), 0
+        )
+
+    def record(self, sink, data, source=""):
+        """Queue ``data`` sent to ``sink`` by module ``source``."""
+        if len(self._pending) >= MAX_PENDING:
+            self.stats["dropped"] += 1
+            return
+        self._pending.append((time.time(), sink, source or "", bytes(data)))
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(
+                    target=self._run, name="journal-writer", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(FLUSH_INTERVAL)
+            self._wake.clear()
+            self.flush()
+
+    def _take(self):
+        items = []
+        try:
+            while True:
+                items.append(self._pending.popleft())
+        except IndexError:
+            return items
+
+    def flush(self):
+        """Write the queued records now."""
+        with self._write_lock:
+            items = self._take()
+            if not items:
+                return
+            data = bytearray()
+            offsets = []
+            for stamp, sink, source, payload in items:
+                source = source.encode()[:255]
+                offsets.append((stamp, len(data)))
+                fields = _RECORD.pack(stamp, len(payload), SINKS.index(sink), len(source))
+                body = source + payload
+                data += fields
+                data += _CRC.pack(zlib.crc32(body, zlib.crc32(fields)))
+                data += body
+            try:
+                self._write(items[0][0], data, offsets)
+            except OSError as exc:
+                self.stats["dropped"] += len(items)
+                log_error("Cannot write journal %s: %s", self.directory, exc, source=LOG_SOURCE)
+                return
+            self.stats["records"] += len(items)
+            self.stats["bytes"] += len(data)
+            self.stats["writes"] += 1
+
+    def _write(self, first_stamp, data, offsets):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lock = os.open(self.directory / LOCK_NAME, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            existing = segments(self.directory)
+            segment = existing[-1] if existing else None
+            if segment is None or segment.stat().st_size >= self.segment_bytes:
+                start = int(first_stamp * 1000)
+                if segment is not None:
+                    start = max(start, _segment_start(segment) + 1)
+                segment = self.directory / f"{start:013d}{SEGMENT_SUFFIX}"
+                existing.append(segment)
+                self.stats["segments"] += 1
+            fd = os.open(segment, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                base = os.fstat(fd).st_size
+                if base and self._tail != (segment, base):
+                    # written by someone else since, who may have crashed
+                    base = self._repair(segment, fd, base)
+                view = memoryview(data)
+                while view:
+                    view = view[os.write(fd, view):]
+            finally:
+                os.close(fd)
+            self._tail = (segment, base + len(data))
+            self._index(segment, base, offsets)
+            if self.max_bytes is not None:
+                self._expire(existing)
+        finally:
+            os.close(lock)
+
+    def _repair(self, segment, fd, size):
+        """Cut off a torn record at the end of ``segment``; return its size."""
+        if self._tail is not None and self._tail[0] == segment and self._tail[1] <= size:
+            start = self._tail[1]
+        else:
+            start = _seek(segment, float("inf"), size)
+        end = start
+        for _, end in _read(segment, start):
+            pass
+        if end == size:
+            return size
+        log_error(
+            "Cutting off %d torn byte(s) of journal %s",
+            size - end,
+            segment,
+            source=LOG_SOURCE,
+        )
+        os.ftruncate(fd, end)
+        self._trim_index(segment, end)
+        self.stats["repairs"] += 1
+        return end
+
+    def _trim_index(self, segment, size):
+        """Drop index entries pointing at or past ``size``."""
+        path = _index_path(segment)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return
+        keep = len(data) - len(data) % _INDEX.size
+        while keep and _INDEX.unpack_from(data, keep - _INDEX.size)[1] >= size:
+            keep -= _INDEX.size
+        if keep != len(data):
+            with open(path, "r+b") as f:
+                f.truncate(keep)
+
+    def _index(self, segment, base, offsets):
+        fd = os.open(_index_path(segment), os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            size -= size % _INDEX.size
+            last = None
+            if size:
+                last = _INDEX.unpack(os.pread(fd, _INDEX.size, size - _INDEX.size))[1]
+            entries = bytearray()
+            for stamp, offset in offsets:
+                offset += base
+                if last is None or offset - last >= INDEX_SPACING:
+                    entries += _INDEX.pack(stamp, offset)
+                    last = offset
+            if entries:
+                os.write(fd, entries)
+        finally:
+            os.close(fd)
+
+    def _expire(self, existing):
+        sizes = [p.stat().st_size for p in existing]
+        total = sum(sizes)
+        # never remove the segment being written
+        for path, size in zip(existing[:-1], sizes):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            _index_path(path).unlink(missing_ok=True)
+            total -= size
+
+    def close(self):
+        """Write the queued records and stop the writer thread."""
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(5)
+        self.flush()
+
+
+def _seek(segment, stamp, size=None):
+    """Return the offset of the last indexed record before ``stamp``.
+
+    Entries at or past ``size`` are ignored.
+    """
+    try:
+        data = _index_path(segment).read_bytes()
+    except OSError:
+        return 0
+    entries = [
+        _INDEX.unpack_from(data, i)
+        for i in range(0, len(data) - _INDEX.size + 1, _INDEX.size)
+    ]
+    if size is not None:
+        entries = [entry for entry in entries if entry[1] < size]
+    i = bisect.bisect_left(entries, (stamp,))
+    return entries[i - 1][1] if i else 0
+
+
+def _read(segment, offset):
+    """Yield ``(record, next_offset)`` for ``segment`` from ``offset`` on.
+
+    Stops at the end of the file or at the first record failing its
+    checksum, such as one torn by a crash while writing.
+    """
+    header_size = _RECORD.size + _CRC.size
+    with open(segment, "rb") as f:
+        f.seek(offset)
+        while True:
+            header = f.read(header_size)
+            if len(header) < header_size:
+                return
+            fields = header[: _RECORD.size]
+            stamp, length, sink, source_len = _RECORD.unpack(fields)
+            (crc,) = _CRC.unpack_from(header, _RECORD.size)
+            body = f.read(source_len + length)
+            if (
+                sink >= len(SINKS)
+                or len(body) < source_len + length
+                or zlib.crc32(body, zlib.crc32(fields)) != crc
+            ):
+                return
+            offset += header_size + len(body)
+            record = Record(
+                stamp,
+                SINKS[sink],
+                body[:source_len].decode(errors="replace"),
+                body[source_len:],
+            )
+            yield record, offset
+
+
+def _scan(segment, offset):
+    """Yield the records of ``segment`` from ``offset`` on."""
+    for record, _ in _read(segment, offset):
+        yield record
+
+
+def query(directory, start=None, end=None, sinks=None):
+    """Yield the records of ``directory`` sent between ``start`` and ``end``.
+
+    Times are seconds since the epoch; ``None`` leaves that side open.
+    Only segments that may hold matching records are read, each from the
+    index entry preceding ``start``.
+    """
+    paths = segments(directory)
+    for i, path in enumerate(paths):
+        if end is not None and _segment_start(path) / 1000 > end + SLACK:
+            break
+        if (
+            start is not None
+            and i + 1 < len(paths)
+            and _segment_start(paths[i + 1]) / 1000 < start - SLACK
+        ):
+            continue
+        offset = _seek(path, start - SLACK) if start is not None else 0
+        try:
+            for rec in _scan(path, offset):
+                if end is not None and rec.time > end + SLACK:
+                    break
+                if start is not None and rec.time < start:
+                    continue
+                if end is not None and rec.time > end:
+                    continue
+                if sinks and rec.sink not in sinks:
+                    continue
+                yield rec
+        except FileNotFoundError:
+            # removed by retention while reading
+            continue
+
+
+_journal = None
+_section = None
+_settings = None
+_journal_lock = threading.Lock()
+
+
+def current():
+    """Return the process-wide :class:`Journal`, or ``None`` if disabled."""
+    global _journal, _section, _settings
+    snap = config.snapshot()
+    if snap.journal is _section:
+        return _journal
+    with _journal_lock:
+        if snap.journal is not _section:
+            cfg = config.load_journal_config()
+            settings = None
+            if cfg["enabled"]:
+                settings = (cfg["directory"], cfg["segment_bytes"], cfg["max_bytes"])
+            if settings != _settings:
+                if _journal is not None:
+                    _journal.close()
+                _journal = Journal(*settings) if settings else None
+                _settings = settings
+            _section = snap.journal
+        return _journal
+
+
+def record(sink, data, source=None):
+    """Journal ``data`` handed to ``sink`` when the journal is enabled."""
+    journal = current()
+    if journal is not None:
+        journal.record(sink, data, source)
+
+
+# -- command line ---------------------------------------------------------
+
+
+def _decode_call(field):
+    call = bytes(b >> 1 for b in field[:6]).decode("ascii").strip()
+    ssid = (field[6] >> 1) & 0x0F
+    return f"{call}-{ssid}" if ssid else call
+
+
+def ax25_to_tnc2(frame):
+    """Return AX.25 UI ``frame`` as a TNC2 string.
+
+    Raises
+    ------
+    ValueError
+        If ``frame`` is not a UI frame with a valid address field.
+    """
+    end = 0
+    while end + 7 <= len(frame):
+        end += 7
+        if frame[end - 1] & 1:
+            break
+    else:
+        raise ValueError("unterminated address field")
+    if end < 14 or len(frame) < end + 2:
+        raise ValueError("short AX.25 frame")
+    calls = [_decode_call(frame[i : i + 7]) for i in range(0, end, 7)]
+    header = f"{calls[1]}>{calls[0]}"
+    if len(calls) > 2:
+        header += "," + ",".join(calls[2:])
+    return f"{header}:{bytes(frame[end + 2:]).decode('latin-1')}"
+
+
+def parse_time(text, now=None):
+    """Return seconds since the epoch for a command line time.
+
+    Accepts epoch seconds, ISO 8601 (local time unless an offset is
+    given) and ages such as ``-15m``, ``-2h`` or ``-1d``.
+    """
+    now = time.time() if now is None else now
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if text.startswith("-") and text[-1:] in units:
+        return now - float(text[1:-1]) * units[text[-1]]
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise ValueError(f"invalid time: {text!r}") from None
+
+
+def format_record(rec, raw=False):
+    stamp = datetime.fromtimestamp(rec.time, timezone.utc).isoformat(timespec="milliseconds")
+    if raw:
+        text = rec.data.hex()
+    elif rec.sink == "kiss":
+        try:
+            text = ax25_to_tnc2(rec.data)
+        except (ValueError, UnicodeDecodeError):
+            text = rec.data.hex()
+    else:
+        text = rec.data.decode(errors="replace")
+    return f"{stamp} {rec.sink:<6} {rec.source or '-'} {text}"
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="List frames sent by wx-helios")
+    parser.add_argument(
+        "--since",
+        type=parse_time,
+        help="start time: ISO 8601, epoch seconds or an age like --since=-2h",
+    )
+    parser.add_argument(
+        "--until", type=parse_time, help="end time, in the same forms as --since"
+    )
+    parser.add_argument("--sink", action="append", choices=SINKS, help="only this sink")
+    parser.add_argument(
+        "--directory", help="journal directory (default from [JOURNAL])"
+    )
+    parser.add_argument("--raw", action="store_true", help="print frames as hex")
+    args = parser.parse_args(argv)
+
+    directory = args.directory or config.load_journal_config()["directory"]
+    count = 0
+    try:
+        for rec in query(directory, args.since, args.until, args.sink):
+            print(format_record(rec, args.raw))
+            count += 1
+    except BrokenPipeError:
+        return 0
+    print(f"{count} frame(s)", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
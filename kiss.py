@@ -0,0 +1,104 @@
+"""KISS framing for AX.25 frames.
+
+The encoder escapes whole frames with two ``bytes.replace`` calls instead of
+a per-byte Python loop.  :class:`Decoder` accepts arbitrary chunks read from a
+TCP stream and returns complete frames as they become available.
+"""
+from collections import namedtuple
+
+FEND = 0xC0
+FESC = 0xDB
+TFEND = 0xDC
+TFESC = 0xDD
+
+_FEND = b"\xC0"
+_FESC = b"\xDB"
+_ESC_FEND = b"\xDB\xDC"
+_ESC_FESC = b"\xDB\xDD"
+
+# KISS command nibbles
+CMD_DATA = 0x00
+CMD_TXDELAY = 0x01
+CMD_P = 0x02
+CMD_SLOTTIME = 0x03
+CMD_TXTAIL = 0x04
+CMD_FULLDUPLEX = 0x05
+CMD_SETHARDWARE = 0x06
+
+KissFrame = namedtuple("KissFrame", "port command data")
+
+
+def escape(data) -> bytes:
+    """Escape ``FEND`` and ``FESC`` bytes in ``data``."""
+    # FESC must be escaped first so the escapes added for FEND stay intact
+    return bytes(data).replace(_FESC, _ESC_FESC).replace(_FEND, _ESC_FEND)
+
+
+def unescape(data) -> bytes:
+    """Reverse :func:`escape`."""
+    # An escaped FESC is never followed by TFEND, so undoing FEND first is
+    # unambiguous.
+    return bytes(data).replace(_ESC_FEND, _FEND).replace(_ESC_FESC, _FESC)
+
+
+def encode(frame, port: int = 0, command: int = CMD_DATA) -> bytes:
+    """Return ``frame`` wrapped in a KISS frame for ``port``.
+
+    Parameters
+    ----------
+    frame : bytes-like
+        Raw AX.25 frame, or the parameter value for non-data commands.
+    port : int, optional
+        TNC port number (0-15).
+    command : int, optional
+        KISS command nibble, :data:`CMD_DATA` by default.
+    """
+    if not 0 <= port <= 15 or not 0 <= command <= 15:
+        raise ValueError("KISS port and command must be in 0-15")
+    type_byte = bytes(((port << 4) | command,))
+    return _FEND + escape(type_byte + bytes(frame)) + _FEND
+
+
+class Decoder:
+    """Incremental KISS stream decoder.
+
+    Bytes received before the first ``FEND`` are discarded since they may be
+    the tail of a frame that started before the connection was opened.
+    """
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._synced = False
+
+    def feed(self, chunk) -> list:
+        """Add ``chunk`` to the stream and return the completed frames.
+
+        Returns
+        -------
+        list[KissFrame]
+            ``(port, command, data)`` tuples in stream order.
+        """
+        buf = self._buf
+        buf += chunk
+        frames = []
+        start = 0
+        with memoryview(buf) as view:
+            while True:
+                end = buf.find(_FEND, start)
+                if end < 0:
+                    break
+                if self._synced and end > start:
+                    raw = unescape(view[start:end])
+                    frames.append(KissFrame(raw[0] >> 4, raw[0] & 0x0F, raw[1:]))
+                self._synced = True
+                start = end + 1
+        if start:
+            del buf[:start]
+        elif not self._synced:
+            buf.clear()
+        return frames
+
+    @property
+    def pending(self) -> int:
+        """Number of buffered bytes that are not yet part of a frame."""
+        return len(self._buf)
@@ -1,4 +1,5 @@
 import argparse
+import queue
 import signal
 import subprocess
 import sys
@@ -6,10 +7,11 @@ import time
 import os
 from pathlib import Path
 import threading
-import shutil
 import importlib
+import itertools
 import config
-from croniter import croniter
+import metrics
+import scheduler
 from utils import log_info, log_error, log_exception, setup_logging
 
 LOG_SOURCE = (
@@ -18,6 +20,21 @@ LOG_SOURCE = (
 
 PROJECT_ROOT = Path(__file__).resolve().parent
 
+# Seconds a telemetry run may wait for a free worker before it counts as late.
+LATE_AFTER = 1.0
+
+# Seconds to wait at startup for daemons that report readiness.
+READY_TIMEOUT = 10.0
+
+TELEMETRY_TIME = metrics.histogram(
+    "wx_telemetry_run_seconds", "Duration of telemetry module runs", ("module",)
+)
+TELEMETRY_RUNS = metrics.counter(
+    "wx_telemetry_runs_total",
+    "Telemetry module runs by exit code, \"none\" if it could not be run",
+    ("module", "exit_code"),
+)
+
 
 def start_direwolf():
     cfg = config.load_direwolf_config()
@@ -26,6 +43,8 @@ def start_direwolf():
         return None
     conf = PROJECT_ROOT / "direwolf.conf"
     if not conf.exists():
+        import shutil
+
         shutil.copy(PROJECT_ROOT / "direwolf.conf.template", conf)
     runtime_dir = PROJECT_ROOT / "runtime"
     runtime_dir.mkdir(exist_ok=True)
@@ -55,7 +74,16 @@ def start_direwolf():
     if data_root.exists() and "DIREWOLF_DIR" not in env:
         env["DIREWOLF_DIR"] = str(data_root)
     log_info("Starting Direwolf: %s", " ".join(cmd), source=LOG_SOURCE)
-    return subprocess.Popen(cmd, env=env)
+    proc = subprocess.Popen(
+        cmd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    output_log = cfg.get("output_log")
+    if output_log:
+        cfg = dict(cfg, output_log=str(PROJECT_ROOT / output_log))
+    import direwolf_stats
+
+    direwolf_stats.attach(proc, cfg)
+    return proc
 
 
 def start_rigctld(rig_id: int, usb_num: int, port: int, baud: int | None = None):
@@ -77,44 +105,405 @@ def start_rigctld(rig_id: int, usb_num: int, port: int, baud: int | None = None)
     return subprocess.Popen(cmd)
 
 
+# Daemons started by this process, by module name.
+_daemons = {}
+
+
+def start_daemon(name):
+    """Import daemon module ``name`` and call its ``start``.
+
+    Returns
+    -------
+    tuple or None
+        ``(server, thread)`` if the daemon is running.
+    """
+    try:
+        log_info("Starting daemon %s", name, source=LOG_SOURCE)
+        module = importlib.import_module(name)
+        if hasattr(module, "start"):
+            server, thread = module.start()
+            if server:
+                _daemons[name] = (server, thread)
+                return server, thread
+    except Exception as exc:
+        log_exception("Failed to start daemon %s: %s", name, exc, source=LOG_SOURCE)
+    return None
+
+
 def start_daemon_modules():
     """Start daemon modules listed in the configuration."""
     daemons = []
     for name in config.load_daemon_modules():
-        try:
-            log_info("Starting daemon %s", name, source=LOG_SOURCE)
-            module = importlib.import_module(name)
-            if hasattr(module, "start"):
-                server, thread = module.start()
-                if server:
-                    daemons.append((server, thread))
-        except Exception as exc:
-            log_exception("Failed to start daemon %s: %s", name, exc, source=LOG_SOURCE)
+        daemon = start_daemon(name)
+        if daemon:
+            daemons.append(daemon)
     return daemons
 
 
-def run_telemetry_module(name: str):
-    """Execute a single telemetry module."""
+def wait_for_daemons(timeout=READY_TIMEOUT):
+    """Wait for started daemons that expose ``wait_ready`` to come up.
+
+    The launcher carries on either way: frames queued meanwhile are sent
+    once the link is up.
+
+    Returns
+    -------
+    dict
+        Daemon names mapped to whether they were ready in time.
+    """
+    deadline = time.monotonic() + timeout
+    ready = {}
+    for name in list(_daemons):
+        hook = getattr(sys.modules.get(name), "wait_ready", None)
+        if hook is None:
+            continue
+        ready[name] = hook(max(0.0, deadline - time.monotonic()))
+        if ready[name]:
+            log_info("Daemon %s is ready", name, source=LOG_SOURCE)
+        else:
+            log_error(
+                "Daemon %s not ready after %.0fs, continuing",
+                name,
+                timeout,
+                source=LOG_SOURCE,
+            )
+    return ready
+
+
+HUB_TELEMETRY = "telemetry.hub_telemetry"
+
+
+def start_system_sampler():
+    """Start the :mod:`system_stats` sampler when the hub beacon needs it.
+
+    The beacon only sees the sampler when it runs in this process, so
+    nothing is started if it is disabled, not scheduled or isolated.  A
+    running sampler is replaced, which applies changed settings.
+    """
+    cfg = config.load_hubtelemetry_config()
+    wanted = (
+        cfg.get("enabled", True)
+        and cfg.get("sample_interval")
+        and HUB_TELEMETRY in config.load_telemetry_modules()
+        and HUB_TELEMETRY not in config.load_telemetry_isolated()
+    )
+    running = sys.modules.get("system_stats")
+    if not wanted:
+        if running:
+            running.stop()
+        return None
+    try:
+        import system_stats
+    except ImportError as exc:
+        log_error("System sampler unavailable: %s", exc, source=LOG_SOURCE)
+        return None
+    return system_stats.start(cfg["sample_interval"], cfg["samples"])
+
+
+def refresh_daemons(daemon_instances):
+    """Bring running daemons in line with a reloaded configuration.
+
+    Daemons no longer listed are shut down.  Listed daemons that are not
+    running, for instance because they were disabled until now, are
+    started.  ``daemon_instances`` is updated in place.
+    """
+    wanted = config.load_daemon_modules()
+    for name in [n for n in _daemons if n not in wanted]:
+        server, thread = daemon = _daemons.pop(name)
+        log_info("Stopping daemon %s", name, source=LOG_SOURCE)
+        server.shutdown()
+        thread.join()
+        daemon_instances.remove(daemon)
+    for name in wanted:
+        current = _daemons.get(name)
+        if current and current[1].is_alive():
+            continue
+        if current:
+            del _daemons[name]
+            daemon_instances.remove(current)
+        daemon = start_daemon(name)
+        if daemon:
+            daemon_instances.append(daemon)
+
+
+def _exit_code(exc: SystemExit) -> int:
+    """Translate ``SystemExit`` into a process style exit code."""
+    if exc.code is None:
+        return 0
+    if isinstance(exc.code, int):
+        return exc.code
+    return 1
+
+
+def _run_subprocess(name: str, timeout: float | None = None) -> int:
+    """Run ``name`` in a fresh interpreter and return its exit code.
+
+    ``subprocess.run`` kills the child and raises ``TimeoutExpired`` when
+    ``timeout`` elapses.  The child inherits this process's configuration
+    snapshot through :data:`config.ENV_VAR`.
+    """
+    env = os.environ.copy()
+    # hand the parsed configuration down instead of having the child re-read it
+    env[config.ENV_VAR] = config.export()
+    result = subprocess.run(
+        [sys.executable, "-m", name],
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=timeout,
+    )
+    if result.stdout:
+        log_info("%s stdout: %s", name, result.stdout.strip(), source=LOG_SOURCE)
+    if result.stderr:
+        log_error("%s stderr: %s", name, result.stderr.strip(), source=LOG_SOURCE)
+    return result.returncode
+
+
+def _run_in_process(name: str) -> int:
+    """Import ``name`` once and call its ``main`` entry point.
+
+    The module is cached by ``importlib`` so later runs skip the import
+    entirely.  Frames sent by the module reach the daemon queues of this
+    process directly through :func:`utils.send_via_kiss`.
+    """
+    module = importlib.import_module(name)
+    entry = getattr(module, "main", None)
+    if entry is None:
+        raise AttributeError(f"telemetry module {name} has no main()")
+    try:
+        entry([])
+    except SystemExit as exc:
+        return _exit_code(exc)
+    return 0
+
+
+def run_telemetry_module(name: str, timeout: float | None = None):
+    """Execute a single telemetry module.
+
+    Modules run inside the launcher by default.  Modules listed in the
+    ``isolated`` option of ``[TELEMETRY]`` are started in a separate Python
+    interpreter instead and killed if they run longer than ``timeout``.
+
+    Returns
+    -------
+    int or None
+        The module's exit code, or ``None`` if it could not be run.
+    """
+    started = time.perf_counter()
+    code = None
     try:
-        log_info("Running telemetry %s", name, source=LOG_SOURCE)
-        env = os.environ.copy()
-        result = subprocess.run(
-            [sys.executable, "-m", name],
-            env=env,
-            capture_output=True,
-            text=True,
+        isolated = name in config.load_telemetry_isolated()
+        log_info(
+            "Running telemetry %s%s",
+            name,
+            " (isolated)" if isolated else "",
+            source=LOG_SOURCE,
         )
-        if result.stdout:
-            log_info("%s stdout: %s", name, result.stdout.strip(), source=LOG_SOURCE)
-        if result.stderr:
-            log_error("%s stderr: %s", name, result.stderr.strip(), source=LOG_SOURCE)
-        log_info("Telemetry %s exited with code %s", name, result.returncode, source=LOG_SOURCE)
+        if isolated:
+            code = _run_subprocess(name, timeout)
+        else:
+            code = _run_in_process(name)
+        log_info("Telemetry %s exited with code %s", name, code, source=LOG_SOURCE)
+        return code
     except Exception as exc:
         log_exception("Telemetry module %s failed: %s", name, exc, source=LOG_SOURCE)
+        return None
+    finally:
+        TELEMETRY_TIME.labels(name).observe(time.perf_counter() - started)
+        TELEMETRY_RUNS.labels(name, "none" if code is None else str(code)).inc()
+
+
+class TelemetryPool:
+    """Bounded pool of worker threads running telemetry modules.
+
+    A module is skipped if its previous run is still in flight.  Every run
+    has a deadline: isolated modules are killed by ``subprocess.run`` when it
+    passes, while in-process modules cannot be interrupted and are abandoned
+    instead.  An abandoned run keeps its module marked as in flight until it
+    returns, so it never overlaps with a later run.
+
+    ``stats`` maps module names to counters of ``runs``, ``skipped``,
+    ``late`` (started more than :data:`LATE_AFTER` seconds after they were
+    due) and ``overruns``.
+    """
+
+    def __init__(self, workers: int = config.DEFAULT_TELEMETRY_WORKERS):
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._in_flight = set()
+        self.stats = {}
+        self._threads = []
+        self._names = itertools.count()
+        for _ in range(max(1, workers)):
+            self._start_worker()
+
+    def _start_worker(self):
+        thread = threading.Thread(
+            target=self._worker, name=f"telemetry-{next(self._names)}", daemon=True
+        )
+        thread.start()
+        self._threads.append(thread)
+
+    def _stats(self, name):
+        return self.stats.setdefault(
+            name, {"runs": 0, "skipped": 0, "late": 0, "overruns": 0}
+        )
+
+    def submit(self, name: str, deadline: float, due: float | None = None) -> bool:
+        """Queue ``name`` to run; return ``False`` if it is still running."""
+        with self._lock:
+            stats = self._stats(name)
+            if name in self._in_flight:
+                stats["skipped"] += 1
+                log_error(
+                    "Telemetry %s still running, skipping this run (%d skipped)",
+                    name,
+                    stats["skipped"],
+                    source=LOG_SOURCE,
+                )
+                return False
+            self._in_flight.add(name)
+        self._jobs.put((name, deadline, time.time() if due is None else due))
+        return True
+
+    def _execute(self, name, deadline):
+        try:
+            run_telemetry_module(name, timeout=deadline)
+        finally:
+            with self._lock:
+                self._in_flight.discard(name)
+
+    def _worker(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            name, deadline, due = job
+            started = time.time()
+            clock = time.monotonic()
+            runner = threading.Thread(
+                target=self._execute,
+                args=(name, deadline),
+                name=f"telemetry-{name}",
+                daemon=True,
+            )
+            runner.start()
+            runner.join(deadline)
+            with self._lock:
+                stats = self._stats(name)
+                stats["runs"] += 1
+                if started - due > LATE_AFTER:
+                    stats["late"] += 1
+                    log_error(
+                        "Telemetry %s started %.1f seconds late",
+                        name,
+                        started - due,
+                        source=LOG_SOURCE,
+                    )
+                if runner.is_alive() or time.monotonic() - clock >= deadline:
+                    stats["overruns"] += 1
+                    log_error(
+                        "Telemetry %s overran its %.0f second deadline",
+                        name,
+                        deadline,
+                        source=LOG_SOURCE,
+                    )
+
+    def resize(self, workers: int):
+        """Change the number of worker threads.
+
+        Surplus workers exit once they finish their current run.
+        """
+        workers = max(1, workers)
+        self._threads = [t for t in self._threads if t.is_alive()]
+        extra = len(self._threads) - workers
+        for _ in range(extra):
+            self._jobs.put(None)
+        for i in range(-extra):
+            self._start_worker()
+
+    def report(self):
+        """Log the per-module counters."""
+        with self._lock:
+            for name, stats in sorted(self.stats.items()):
+                log_info(
+                    "Telemetry %s: runs=%d skipped=%d late=%d overruns=%d",
+                    name,
+                    stats["runs"],
+                    stats["skipped"],
+                    stats["late"],
+                    stats["overruns"],
+                    source=LOG_SOURCE,
+                )
 
+    def shutdown(self, timeout: float = 1.0):
+        """Stop the workers without waiting for stuck modules."""
+        for _ in self._threads:
+            self._jobs.put(None)
+        end = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0, end - time.monotonic()))
 
 
 
+
+def schedule_telemetry(sched, pool, modules, schedules, deadlines, interval):
+    """Add a scheduler job submitting each telemetry module to ``pool``.
+
+    Modules with a cron expression in ``schedules`` follow it; the others run
+    every ``interval`` seconds.
+
+    Returns
+    -------
+    dict
+        Mapping of module names to their :class:`scheduler.Job`.
+    """
+    jobs = {}
+    for name in modules:
+        deadline = deadlines.get(name, config.DEFAULT_TELEMETRY_DEADLINE)
+
+        def submit(due, name=name, deadline=deadline):
+            pool.submit(name, deadline, due)
+
+        expr = schedules.get(name)
+        if expr:
+            jobs[name] = sched.add_cron(name, expr, submit)
+        else:
+            jobs[name] = sched.add_interval(name, interval, submit)
+    return jobs
+
+
+def _telemetry_spec(cfg, name):
+    tele = cfg.telemetry
+    return name in tele.modules, tele.schedules.get(name), tele.deadlines.get(name)
+
+
+def reschedule_telemetry(sched, pool, jobs, old, new, interval):
+    """Apply telemetry changes between config snapshots ``old`` and ``new``.
+
+    Only modules whose schedule or deadline changed are rescheduled; the
+    others keep their timing.  ``jobs`` is updated in place.
+    """
+    names = set(old.telemetry.modules) | set(new.telemetry.modules)
+    changed = {n for n in names if _telemetry_spec(old, n) != _telemetry_spec(new, n)}
+    for name in changed:
+        job = jobs.pop(name, None)
+        if job:
+            sched.cancel(job)
+    jobs.update(
+        schedule_telemetry(
+            sched,
+            pool,
+            [n for n in new.telemetry.modules if n in changed],
+            config.load_telemetry_schedules(),
+            config.load_telemetry_deadlines(),
+            interval,
+        )
+    )
+    if old.telemetry.workers != new.telemetry.workers:
+        pool.resize(new.telemetry.workers)
+
+
 def main():
     parser = argparse.ArgumentParser(description="wx-helios combined launcher")
     parser.add_argument("--rig-id", type=int, help="rig model ID")
@@ -153,49 +542,59 @@ def main():
         log_info("rigctld disabled in configuration", source=LOG_SOURCE)
 
     daemon_instances = start_daemon_modules()
+    wait_for_daemons()
+    start_system_sampler()
 
-    telemetry_modules = config.load_telemetry_modules()
-    telemetry_schedules = config.load_telemetry_schedules()
-    cron_map = {}
-    next_times = {}
-    now = time.time()
-    for name in telemetry_modules:
-        expr = telemetry_schedules.get(name)
-        if expr:
-            itr = croniter(expr, now)
-            cron_map[name] = itr
-            next_times[name] = itr.get_next(float)
-        else:
-            cron_map[name] = None
-            next_times[name] = now + args.telemetry_interval
+    pool = TelemetryPool(config.load_telemetry_workers())
+    sched = scheduler.Scheduler()
+    jobs = schedule_telemetry(
+        sched,
+        pool,
+        config.load_telemetry_modules(),
+        config.load_telemetry_schedules(),
+        config.load_telemetry_deadlines(),
+        args.telemetry_interval,
+    )
 
-    running = True
+    def apply_config(old, new):
+        reschedule_telemetry(sched, pool, jobs, old, new, args.telemetry_interval)
+        # on the scheduler thread, which also shuts the daemons down, and
+        # after the daemons' own subscribers have applied the change
+        sched.add_once("refresh-daemons", lambda due: refresh_daemons(daemon_instances))
+        if (
+            old.hub_sampler != new.hub_sampler
+            or old.hubtelemetry_enabled != new.hubtelemetry_enabled
+            or old.telemetry != new.telemetry
+        ):
+            start_system_sampler()
+
+    config.subscribe(apply_config)
+    sched.add_interval(
+        "config-watch", config.WATCH_INTERVAL, lambda due: config.check_reload()
+    )
 
     def shutdown(signum, frame):
-        nonlocal running
-        running = False
+        sched.stop()
+
+    def reload(signum, frame):
+        # keep the signal handler short; reloading may rebind sockets
+        threading.Thread(target=config.reload, name="config-reload", daemon=True).start()
 
     signal.signal(signal.SIGINT, shutdown)
     signal.signal(signal.SIGTERM, shutdown)
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, reload)
 
     try:
-        while running:
-            now = time.time()
-            for name in telemetry_modules:
-                if now >= next_times[name]:
-                    run_telemetry_module(name)
-                    if cron_map[name]:
-                        next_times[name] = cron_map[name].get_next(float)
-                    else:
-                        next_times[name] = now + args.telemetry_interval
-
-            next_event = min(next_times.values())
-            sleep_left = next_event - time.time()
-            while running and sleep_left > 0:
-                time.sleep(min(1, sleep_left))
-                sleep_left -= 1
+        sched.run()
     finally:
         log_info("Shutting down", source=LOG_SOURCE)
+        config.unsubscribe(apply_config)
+        pool.shutdown()
+        pool.report()
+        sampler = sys.modules.get("system_stats")
+        if sampler:
+            sampler.stop()
         for server, thread in daemon_instances:
             server.shutdown()
             thread.join()
@@ -205,6 +604,12 @@ def main():
         for proc in (direwolf_proc, rigctld_proc):
             if proc:
                 proc.wait()
+        # only imported when Direwolf was started
+        stats_module = sys.modules.get("direwolf_stats")
+        monitor = stats_module.current() if stats_module else None
+        if monitor:
+            # the reader stops at EOF once Direwolf has exited
+            monitor.join(5)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,265 @@
+"""Process-wide metrics exported in the Prometheus text format.
+
+Hot paths record into :class:`Counter`, :class:`Gauge` and
+:class:`Histogram` objects created once at import time with
+:func:`counter`, :func:`gauge` and :func:`histogram`.  Recording is a plain
+attribute update without a lock: like the ``stats`` dictionaries of the
+daemons, a rare increment may be lost when two threads race on the same
+metric, which is acceptable for monitoring and keeps the ingest path fast.
+
+Values that modules already keep, such as the daemons' ``stats`` and their
+queue depths, are not copied on every update.  A collector registered with
+:func:`register_collector` reads them only when :func:`render` is called,
+which is what ``daemons.metrics_exporter`` does for every scrape.
+"""
+import bisect
+import math
+import threading
+
+# Default histogram buckets in seconds, from 100 microseconds to 60 seconds.
+BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help="", labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Return the child metric for ``values`` of :attr:`labelnames`."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _series(self):
+        if self.labelnames:
+            return sorted(self._children.items(), key=lambda item: item[0])
+        return [((), self)]
+
+    def samples(self):
+        """Yield ``(suffix, label pairs, value)`` for every series."""
+        for values, child in self._series():
+            pairs = tuple(zip(self.labelnames, values))
+            for suffix, extra, value in child._values():
+                yield suffix, pairs + tuple(extra), value
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, name, help="", labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.value = 0
+
+    def _new_child(self):
+        return Counter(self.name)
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def _values(self):
+        yield "", (), self.value
+
+
+class Gauge(_Metric):
+    """Value that may go up and down."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help="", labelnames=()):
+        super().__init__(name, help, labelnames)
+        self.value = 0
+
+    def _new_child(self):
+        return Gauge(self.name)
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+    def _values(self):
+        yield "", (), self.value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values over fixed ``buckets``.
+
+    Each observation increments one bucket; the cumulative counts of the
+    text format are only summed up when rendering.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help="", labelnames=(), buckets=BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def _new_child(self):
+        return Histogram(self.name, buckets=self.buckets)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def _values(self):
+        total = 0
+        for bound, count in zip(self.buckets + (math.inf,), list(self.counts)):
+            total += count
+            yield "_bucket", (("le", _number(bound)),), total
+        yield "_sum", (), self.sum
+        yield "_count", (), total
+
+
+class Registry:
+    """Named metrics and collectors rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, labelnames, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"metric {name} is already a {metric.kind}")
+            return metric
+
+    def register_collector(self, name, collect):
+        """Call ``collect()`` on every render, replacing one of the same name.
+
+        ``collect`` returns an iterable of ``(name, kind, help, samples)``
+        where ``samples`` are ``(labels dict, value)`` pairs.
+        """
+        with self._lock:
+            self._collectors[name] = collect
+
+    def unregister_collector(self, name):
+        with self._lock:
+            self._collectors.pop(name, None)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+            collectors = list(self._collectors.items())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, pairs, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_labels(pairs)} {_number(value)}")
+        for source, collect in collectors:
+            try:
+                families = list(collect())
+            except Exception as exc:
+                lines.append(f"# collector {source} failed: {_escape(exc)}")
+                continue
+            for name, kind, help, samples in families:
+                lines.append(f"# HELP {name} {_escape(help)}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(sorted(labels.items()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help="", labelnames=()):
+    """Return the :class:`Counter` ``name``, creating it on first use."""
+    return REGISTRY._get(Counter, name, help, labelnames)
+
+
+def gauge(name, help="", labelnames=()):
+    """Return the :class:`Gauge` ``name``, creating it on first use."""
+    return REGISTRY._get(Gauge, name, help, labelnames)
+
+
+def histogram(name, help="", labelnames=(), buckets=BUCKETS):
+    """Return the :class:`Histogram` ``name``, creating it on first use."""
+    return REGISTRY._get(Histogram, name, help, labelnames, buckets=buckets)
+
+
+def register_collector(name, collect):
+    REGISTRY.register_collector(name, collect)
+
+
+def render():
+    return REGISTRY.render()
+
+
+def stats_families(prefix, stats, help, gauges=(), names=None):
+    """Return collector families for a module's ``stats`` dictionary.
+
+    Every key becomes the counter ``<prefix>_<key>_total`` except those in
+    ``gauges``, which are exported as ``<prefix>_<key>``.  ``names`` maps keys
+    to the name used in place of ``<key>``, e.g. to carry the unit.
+    """
+    snapshot = dict(stats)
+    names = names or {}
+    families = []
+    for key, value in snapshot.items():
+        name = f"{prefix}_{names.get(key, key)}"
+        if key in gauges:
+            families.append((name, "gauge", f"{help}: {key}", [({}, value)]))
+        else:
+            families.append((f"{name}_total", "counter", f"{help}: {key}", [({}, value)]))
+    return families
+
+
+def queue_depth(q):
+    """Return ``q.qsize()``, or ``None`` where the platform cannot tell."""
+    if q is None:
+        return None
+    try:
+        return q.qsize()
+    except (NotImplementedError, OSError):
+        return None
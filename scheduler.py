@@ -0,0 +1,223 @@
+"""Heap ordered timer scheduler shared by the launcher and daemons.
+
+Jobs are kept in a heap keyed by their next due time.  :meth:`Scheduler.run`
+waits on a self-pipe until the earliest job is due, so it does not poll.
+Adding or cancelling a job and :meth:`Scheduler.stop` write a byte to the
+pipe, which wakes the loop immediately.  The byte stays in the pipe until
+the loop has looked at the heap again, so ``stop`` is also safe to call
+from a signal handler running on the scheduler thread, even between the
+loop's check of the stop flag and the start of its wait.
+"""
+import heapq
+import itertools
+import select
+import socket
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import cron
+from utils import log_exception
+
+LOG_SOURCE = (
+    f"{__package__}.{Path(__file__).stem}" if __package__ else Path(__file__).stem
+)
+
+# Number of upcoming fire times precomputed for each cron job.
+CRON_TABLE_SIZE = 8
+
+
+class Job:
+    """A scheduled callback.
+
+    ``callback`` is called with the time the job was due.  ``next_run`` holds
+    the next due time as a Unix timestamp.
+    """
+
+    __slots__ = ("name", "callback", "next_run", "cancelled", "_advance")
+
+    def __init__(self, name, callback, next_run, advance):
+        self.name = name
+        self.callback = callback
+        self.next_run = next_run
+        self.cancelled = False
+        self._advance = advance
+
+    def __repr__(self):
+        return f"Job({self.name!r}, next_run={self.next_run!r})"
+
+
+class Scheduler:
+    """Run interval and cron jobs from a single thread.
+
+    Parameters
+    ----------
+    clock : callable, optional
+        Function returning the current Unix time.  Defaults to
+        ``time.time``.
+    """
+
+    def __init__(self, clock=None):
+        self._clock = clock
+        self._heap = []
+        self._seq = itertools.count()
+        # reentrant: a signal handler may call stop() while the loop holds it
+        self._lock = threading.RLock()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._stopped = False
+
+    def __del__(self):
+        for sock in (getattr(self, "_wake_r", None), getattr(self, "_wake_w", None)):
+            if sock is not None:
+                sock.close()
+
+    def now(self) -> float:
+        return self._clock() if self._clock else time.time()
+
+    def _notify(self):
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            # full: the loop has not drained the earlier wakeups yet
+            pass
+
+    def _push(self, job):
+        with self._lock:
+            heapq.heappush(self._heap, (job.next_run, next(self._seq), job))
+        self._notify()
+        return job
+
+    def add_interval(self, name, interval, callback, start=None) -> Job:
+        """Run ``callback`` every ``interval`` seconds.
+
+        The first run happens ``interval`` seconds after ``start`` (default
+        now).  Later runs are spaced ``interval`` seconds after the previous
+        run started, so a stalled loop does not trigger a burst of catch-up
+        runs.
+        """
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        first = (self.now() if start is None else start) + interval
+        return self._push(
+            Job(name, callback, first, lambda due, now: max(due, now) + interval)
+        )
+
+    def add_cron(self, name, expr, callback, start=None) -> Job:
+        """Run ``callback`` at the times matched by cron expression ``expr``."""
+        compiled = cron.compile(expr)
+        table = deque(
+            compiled.upcoming(self.now() if start is None else start, CRON_TABLE_SIZE)
+        )
+
+        def advance(due, now):
+            # drop fire times missed while the loop was busy
+            while table and table[0] <= now:
+                table.popleft()
+            if not table:
+                table.extend(compiled.upcoming(max(due, now), CRON_TABLE_SIZE))
+            return table.popleft()
+
+        return self._push(Job(name, callback, table.popleft(), advance))
+
+    def add_once(self, name, callback, delay=0.0) -> Job:
+        """Run ``callback`` once, ``delay`` seconds from now."""
+        return self._push(Job(name, callback, self.now() + delay, None))
+
+    def cancel(self, job):
+        """Stop ``job`` from running again."""
+        with self._lock:
+            job.cancelled = True
+        self._notify()
+
+    def jobs(self):
+        """Return the active jobs ordered by next due time."""
+        with self._lock:
+            return [job for _, _, job in sorted(self._heap) if not job.cancelled]
+
+    def wake(self):
+        """Wake the run loop so it re-examines the heap."""
+        self._notify()
+
+    def stop(self):
+        """Make :meth:`run` return as soon as possible."""
+        self._stopped = True
+        self._notify()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped
+
+    def _wait(self, timeout):
+        """Sleep until ``timeout`` elapsed or :meth:`_notify` was called."""
+        select.select([self._wake_r], [], [], timeout)
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except OSError:
+            pass
+
+    def _next_due(self):
+        """Pop and reschedule the next due job, waiting until one is due."""
+        while True:
+            with self._lock:
+                if self._stopped:
+                    return None, None
+                while self._heap and self._heap[0][2].cancelled:
+                    heapq.heappop(self._heap)
+                now = self.now()
+                if self._heap and self._heap[0][0] <= now:
+                    due, _, job = heapq.heappop(self._heap)
+                    if job._advance is None:
+                        job.cancelled = True
+                    else:
+                        job.next_run = job._advance(due, now)
+                        heapq.heappush(self._heap, (job.next_run, next(self._seq), job))
+                    return job, due
+                timeout = self._heap[0][0] - now if self._heap else None
+            # a wakeup sent after the checks above is still in the pipe
+            self._wait(timeout)
+
+    def run(self):
+        """Run due jobs until :meth:`stop` is called.
+
+        Exceptions raised by callbacks are logged; ``BaseException``
+        subclasses such as ``KeyboardInterrupt`` propagate.
+        """
+        while True:
+            job, due = self._next_due()
+            if job is None:
+                return
+            try:
+                job.callback(due)
+            except Exception as exc:
+                log_exception(
+                    "Scheduled job %s failed: %s", job.name, exc, source=LOG_SOURCE
+                )
+
+    def start(self, name="scheduler") -> threading.Thread:
+        """Run the scheduler in a background daemon thread."""
+        thread = threading.Thread(target=self.run, name=name, daemon=True)
+        thread.start()
+        return thread
+
+
+_background = None
+_background_lock = threading.Lock()
+
+
+def background() -> Scheduler:
+    """Return a process-wide scheduler running in a daemon thread.
+
+    Daemons use this for their own periodic work instead of starting a
+    polling thread each.  Callbacks must return quickly since all jobs share
+    one thread.
+    """
+    global _background
+    with _background_lock:
+        if _background is None or _background.stopped:
+            _background = Scheduler()
+            _background.start("background-scheduler")
+        return _background
@@ -0,0 +1,370 @@
+"""Durable on-disk spool for frames a sink could not deliver.
+
+Each sink (``kiss``, ``aprsis``) has one append-only file.  The header
+holds the offset of the oldest undelivered record and a generation number,
+followed by records of ``length, timestamp, crc32`` and the raw frame.
+Delivery reads records from that offset with :meth:`Spool.peek` and moves
+it forward with :meth:`Spool.commit`, so a crash during replay resends at
+most one batch.  Emptying or compacting the file starts a new generation;
+a commit for frames peeked in an older one is ignored, so two processes
+replaying at once may send a batch twice but never drop a frame appended
+meanwhile.
+
+Appends are written immediately but ``fsync``'d in batches: after
+:data:`SYNC_EVERY` records or :data:`SYNC_INTERVAL` seconds, whichever
+comes first.  A timer syncs records no later append picks up, and the
+spools handed out by :func:`for_sink` are closed, and so synced, at exit.
+A record torn by a power cut fails its checksum and is cut off when the
+file is opened again.  Files are locked with ``flock`` so the launcher and
+isolated telemetry processes can share them.
+"""
+import atexit
+import contextlib
+import os
+import struct
+import threading
+import time
+import zlib
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not on Windows
+    fcntl = None
+
+import config
+from utils import log_error
+
+LOG_SOURCE = (
+    f"{__package__}.{Path(__file__).stem}" if __package__ else Path(__file__).stem
+)
+
+MAGIC = b"WXSPOOL2"
+_HEADER = struct.Struct("<8sQQ")
+_RECORD = struct.Struct("<IdI")
+HEADER_SIZE = _HEADER.size
+
+# Records written before the spool is fsync'd, and the longest time an
+# appended record may stay unsynced.
+SYNC_EVERY = 32
+SYNC_INTERVAL = 1.0
+
+# Rewrite the file once this many delivered bytes sit in front of the
+# undelivered ones.
+COMPACT_AT = 1 << 20
+
+
+class Spool:
+    """Append-only frame spool stored at ``path``.
+
+    Parameters
+    ----------
+    path : str or Path
+        Spool file, created when missing.
+    max_bytes : int, optional
+        Undelivered bytes kept; the oldest records are dropped beyond it.
+    max_age : float, optional
+        Seconds after which an undelivered record is discarded instead of
+        replayed.
+
+    ``stats`` counts ``appended``, ``delivered``, ``dropped`` (over
+    ``max_bytes``), ``expired`` (over ``max_age``), ``torn`` (records cut
+    off at open) and ``syncs``.
+    """
+
+    def __init__(self, path, max_bytes=None, max_age=None):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._timer = None
+        self.stats = dict.fromkeys(
+            ("appended", "delivered", "dropped", "expired", "torn", "syncs"), 0
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        with self._locked():
+            self._recover()
+
+    # -- file helpers -----------------------------------------------------
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with self._lock:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                # _compact and _reopen may have switched to a new file
+                if fcntl:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _head(self):
+        magic, head, generation = _HEADER.unpack(os.pread(self._fd, HEADER_SIZE, 0))
+        return head
+
+    def _generation(self):
+        magic, head, generation = _HEADER.unpack(os.pread(self._fd, HEADER_SIZE, 0))
+        return generation
+
+    def _set_head(self, head, generation=None):
+        if generation is None:
+            generation = self._generation()
+        os.pwrite(self._fd, _HEADER.pack(MAGIC, head, generation), 0)
+
+    def _size(self):
+        return os.fstat(self._fd).st_size
+
+    def _records(self, offset, end, limit=None):
+        """Yield ``(offset, next_offset, timestamp, payload)`` from ``offset``."""
+        count = 0
+        while offset + _RECORD.size <= end and (limit is None or count < limit):
+            length, stamp, crc = _RECORD.unpack(os.pread(self._fd, _RECORD.size, offset))
+            start = offset + _RECORD.size
+            if start + length > end:
+                return
+            payload = os.pread(self._fd, length, start)
+            if zlib.crc32(payload, zlib.crc32(struct.pack("<d", stamp))) != crc:
+                return
+            yield offset, start + length, stamp, payload
+            offset = start + length
+            count += 1
+
+    def _recover(self):
+        """Create the header or cut off a torn tail."""
+        size = self._size()
+        if size < HEADER_SIZE or os.pread(self._fd, len(MAGIC), 0) != MAGIC:
+            if size:
+                log_error("Discarding unreadable spool %s", self.path, source=LOG_SOURCE)
+            os.ftruncate(self._fd, 0)
+            # unrelated to any generation a stale token may still carry
+            self._set_head(HEADER_SIZE, int.from_bytes(os.urandom(4), "little"))
+            os.fsync(self._fd)
+            return
+        head = min(max(self._head(), HEADER_SIZE), size)
+        end = head
+        for _, end, _, _ in self._records(head, size):
+            pass
+        if end < size:
+            self.stats["torn"] += 1
+            log_error(
+                "Spool %s: discarding %d bytes after a torn record",
+                self.path,
+                size - end,
+                source=LOG_SOURCE,
+            )
+            os.ftruncate(self._fd, end)
+            os.fsync(self._fd)
+
+    def _sync(self, force=False):
+        if not self._unsynced:
+            return
+        if (
+            force
+            or self._unsynced >= SYNC_EVERY
+            or time.monotonic() - self._synced_at >= SYNC_INTERVAL
+        ):
+            os.fsync(self._fd)
+            self._unsynced = 0
+            self._synced_at = time.monotonic()
+            self.stats["syncs"] += 1
+        elif self._timer is None:
+            # nothing may append again soon, e.g. in a telemetry subprocess
+            delay = SYNC_INTERVAL - (time.monotonic() - self._synced_at)
+            self._timer = threading.Timer(max(0.0, delay), self._sync_due)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _sync_due(self):
+        with self._lock:
+            self._timer = None
+            if self._fd < 0:  # closed meanwhile
+                return
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                self._sync(force=True)
+            finally:
+                if fcntl:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _compact(self, head, size):
+        """Move the undelivered records to the front of the file."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as out:
+            out.write(_HEADER.pack(MAGIC, HEADER_SIZE, self._generation() + 1))
+            offset = head
+            while offset < size:
+                chunk = os.pread(self._fd, min(1 << 20, size - offset), offset)
+                out.write(chunk)
+                offset += len(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp, self.path)
+        # other processes holding the old file reopen it through _reopen
+        old = self._fd
+        self._fd = os.open(self.path, os.O_RDWR)
+        if fcntl:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            fcntl.flock(old, fcntl.LOCK_UN)
+        os.close(old)
+
+    def _reopen(self):
+        """Follow a compaction done by another process."""
+        try:
+            same = os.stat(self.path).st_ino == os.fstat(self._fd).st_ino
+        except FileNotFoundError:
+            same = False
+        if not same:
+            os.close(self._fd)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            self._recover()
+
+    def _trim(self, head, size):
+        """Drop the oldest records until at most ``max_bytes`` remain."""
+        dropped = 0
+        for _, head, _, _ in self._records(head, size):
+            dropped += 1
+            if size - head <= self.max_bytes:
+                break
+        self.stats["dropped"] += dropped
+        return head
+
+    # -- public API -------------------------------------------------------
+
+    def append(self, frames, stamp=None):
+        """Append ``frames`` (bytes) in order; they are synced in batches."""
+        frames = list(frames)
+        if not frames:
+            return
+        stamp = time.time() if stamp is None else stamp
+        packed = struct.pack("<d", stamp)
+        data = bytearray()
+        for frame in frames:
+            frame = bytes(frame)
+            crc = zlib.crc32(frame, zlib.crc32(packed))
+            data += _RECORD.pack(len(frame), stamp, crc) + frame
+        with self._locked():
+            self._reopen()
+            size = self._size()
+            os.pwrite(self._fd, data, size)
+            size += len(data)
+            self.stats["appended"] += len(frames)
+            self._unsynced += len(frames)
+            if self.max_bytes is not None:
+                head = self._head()
+                if size - head > self.max_bytes:
+                    self._set_head(self._trim(head, size))
+                    self._unsynced += 1
+            self._sync()
+
+    def peek(self, limit=64):
+        """Return up to ``limit`` undelivered frames and the offset after them.
+
+        Records older than ``max_age`` are skipped.  Pass the offset to
+        :meth:`commit` once the frames are delivered.
+        """
+        with self._locked():
+            self._reopen()
+            self._sync()
+            head = self._head()
+            size = self._size()
+            frames = []
+            end = head
+            cutoff = time.time() - self.max_age if self.max_age is not None else None
+            expired = 0
+            for _, end, stamp, payload in self._records(head, size):
+                if cutoff is not None and stamp < cutoff:
+                    expired += 1
+                    continue
+                frames.append(payload)
+                if len(frames) >= limit:
+                    break
+            if expired and not frames:
+                # nothing to deliver; forget the expired records right away
+                self._commit(end, expired=expired)
+            return frames, (end, expired, self._generation())
+
+    def _commit(self, end, delivered=0, expired=0):
+        size = self._size()
+        self.stats["delivered"] += delivered
+        self.stats["expired"] += expired
+        if end >= size:
+            # everything delivered: start over with an empty file
+            os.ftruncate(self._fd, HEADER_SIZE)
+            self._set_head(HEADER_SIZE, self._generation() + 1)
+        elif end - HEADER_SIZE >= COMPACT_AT and end - HEADER_SIZE >= size - end:
+            self._compact(end, size)
+        else:
+            self._set_head(end)
+        self._unsynced += 1
+        self._sync(force=True)
+
+    def commit(self, token, delivered):
+        """Mark the frames returned by :meth:`peek` as delivered."""
+        end, expired, generation = token
+        with self._locked():
+            self._reopen()
+            if generation != self._generation() or end < self._head():
+                # emptied, compacted or trimmed meanwhile: already gone
+                return
+            self._commit(end, delivered, expired)
+
+    def pending(self):
+        """Return the number of undelivered bytes, records included."""
+        with self._locked():
+            self._reopen()
+            return self._size() - self._head()
+
+    def __len__(self):
+        with self._locked():
+            self._reopen()
+            return sum(1 for _ in self._records(self._head(), self._size()))
+
+    def flush(self):
+        """Force unsynced appends to disk."""
+        with self._locked():
+            self._sync(force=True)
+
+    def close(self):
+        if self._fd < 0:
+            return
+        with self._locked():
+            self._sync(force=True)
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        with self._lock:
+            os.close(self._fd)
+            self._fd = -1
+
+
+_spools = {}
+_spools_lock = threading.Lock()
+
+
+def for_sink(name):
+    """Return the process-wide :class:`Spool` of sink ``name``.
+
+    Returns ``None`` when spooling is disabled in ``[SPOOL]``.
+    """
+    cfg = config.load_spool_config()
+    if not cfg.get("enabled"):
+        return None
+    path = Path(cfg["directory"]) / f"{name}.spool"
+    with _spools_lock:
+        spool = _spools.get(path)
+        if spool is None:
+            try:
+                spool = _spools[path] = Spool(path, cfg["max_bytes"], cfg["max_age"])
+            except OSError as exc:
+                log_error("Cannot open spool %s: %s", path, exc, source=LOG_SOURCE)
+                return None
+            atexit.register(spool.close)
+        spool.max_bytes, spool.max_age = cfg["max_bytes"], cfg["max_age"]
+        return spool
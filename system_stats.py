@@ -0,0 +1,155 @@
+"""Background sampler of the host's CPU, memory and network use.
+
+The launcher starts one :class:`Sampler` with :func:`start` when the hub
+telemetry beacon runs in its process.  A thread polls ``psutil`` every
+``interval`` seconds into fixed-size rings and keeps the minimum, average
+and maximum of each ring up to date, so :mod:`telemetry.hub_telemetry`
+reads them through :func:`current` without waiting.
+
+``cpu_load`` is measured between two polls instead of blocking for a
+second, and the network counters are turned into megabytes per sample
+interval so they no longer grow until they saturate a telemetry field.
+"""
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+import psutil
+
+from utils import log_error, log_info
+
+LOG_SOURCE = (
+    f"{__package__}.{Path(__file__).stem}" if __package__ else Path(__file__).stem
+)
+
+METRICS = ("cpu_temp", "cpu_load", "mem_percent", "net_rx_mb", "net_tx_mb")
+
+# Defaults of ``sample_interval`` and ``samples`` in ``[HUBTELEMETRY]``.
+INTERVAL = 10.0
+SIZE = 60
+
+
+def cpu_temperature():
+    """Return the first ``coretemp`` reading in degrees Celsius, else 0.0."""
+    try:
+        temps = psutil.sensors_temperatures()
+        if "coretemp" in temps:
+            return temps["coretemp"][0].current
+    except Exception:
+        pass
+    return 0.0
+
+
+def net_rate(old, new, seconds, interval=INTERVAL):
+    """Return ``(rx, tx)`` in MB per ``interval`` seconds.
+
+    ``old`` and ``new`` are ``net_io_counters`` taken ``seconds`` apart.
+    """
+    if seconds <= 0:
+        return 0.0, 0.0
+    scale = interval / seconds / (1 << 20)
+    # counters restart from zero when an interface goes down
+    rx = max(0, new.bytes_recv - old.bytes_recv) * scale
+    tx = max(0, new.bytes_sent - old.bytes_sent) * scale
+    return rx, tx
+
+
+class Sampler:
+    """Rolling statistics of the host, refreshed by a background thread.
+
+    Parameters
+    ----------
+    interval : float, optional
+        Seconds between polls.
+    size : int, optional
+        Samples kept per metric.
+    """
+
+    def __init__(self, interval=INTERVAL, size=SIZE, clock=time.monotonic):
+        self.interval = interval
+        self._clock = clock
+        self._rings = {name: deque(maxlen=max(1, size)) for name in METRICS}
+        self._aggregates = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # the first cpu_percent call only sets the reference point
+        psutil.cpu_percent(interval=None)
+        self._net = (self._clock(), psutil.net_io_counters())
+
+    def sample(self):
+        """Poll ``psutil`` once and update the rolling values."""
+        now = self._clock()
+        net = psutil.net_io_counters()
+        then, old = self._net
+        rx, tx = net_rate(old, net, now - then, self.interval)
+        self._net = (now, net)
+        values = {
+            "cpu_temp": cpu_temperature(),
+            "cpu_load": psutil.cpu_percent(interval=None),
+            "mem_percent": psutil.virtual_memory().percent,
+            "net_rx_mb": rx,
+            "net_tx_mb": tx,
+        }
+        aggregates = {}
+        for name, value in values.items():
+            ring = self._rings[name]
+            ring.append(value)
+            aggregates[name] = (min(ring), sum(ring) / len(ring), max(ring))
+        with self._lock:
+            self._aggregates = aggregates
+
+    def aggregates(self):
+        """Return ``{metric: (min, avg, max)}``, empty before the first poll."""
+        with self._lock:
+            return dict(self._aggregates)
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="system-sampler", daemon=True
+        )
+        self._thread.start()
+        return self._thread
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as exc:
+                log_error("System sample failed: %s", exc, source=LOG_SOURCE)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+_sampler = None
+
+
+def start(interval=INTERVAL, size=SIZE):
+    """Start the process-wide :class:`Sampler` and return it."""
+    global _sampler
+    stop()
+    _sampler = Sampler(interval, size)
+    _sampler.start()
+    log_info(
+        "Sampling system statistics every %.0fs (%d samples)",
+        interval,
+        size,
+        source=LOG_SOURCE,
+    )
+    return _sampler
+
+
+def stop():
+    global _sampler
+    if _sampler is not None:
+        _sampler.stop()
+        _sampler = None
+
+
+def current():
+    """Return the running :class:`Sampler`, or ``None``."""
+    return _sampler
@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
 import argparse
+import hashlib
+import json
+import os
 import sys
 import re
 import logging
@@ -10,55 +13,282 @@ LOG_SOURCE = (
 )
 
 import config
+import direwolf_stats
 import utils
 
 LOG_PATH = Path(__file__).resolve().parent.parent / "log"
 
+# Directory of the launcher's runtime files, where the cursors are kept.
+RUNTIME_DIR = Path(__file__).resolve().parent.parent / "runtime"
+
+# Prefix of the files remembering how far each log directory was read.
+CURSOR_PREFIX = "direwolf_telemetry"
+
+# Bytes read at a time when scanning a log backwards or forwards.
+BLOCK_SIZE = 64 * 1024
+
+_RCVQ = re.compile(r"rcvq=(\d+)")
+_SENDQ = re.compile(r"sendq=(\d+)")
+_BUSY = re.compile(r"busy=([0-9.]+)")
+
 
 def parse_metrics(line):
     """Extract metrics from a Direwolf telemetry line."""
     metrics = {}
-    m = re.search(r"rcvq=(\d+)", line)
+    m = _RCVQ.search(line)
     if m:
         metrics["rcvq"] = int(m.group(1))
-    m = re.search(r"sendq=(\d+)", line)
+    m = _SENDQ.search(line)
     if m:
         metrics["sendq"] = int(m.group(1))
-    m = re.search(r"busy=([0-9.]+)", line)
+    m = _BUSY.search(line)
     if m:
         metrics["busy"] = float(m.group(1))
     return metrics
 
 
-def read_metrics(path=LOG_PATH):
-    """Return the most recent set of metrics from ``direwolf.log``.
+def _is_stats(line):
+    return "busy=" in line and "sendq=" in line
+
+
+class WindowStats:
+    """Aggregate of the Direwolf statistics lines seen in one window."""
+
+    __slots__ = ("samples", "busy_sum", "busy_max", "rcvq_max", "sendq_max")
+
+    def __init__(self):
+        self.samples = 0
+        self.busy_sum = 0.0
+        self.busy_max = 0.0
+        self.rcvq_max = 0
+        self.sendq_max = 0
+
+    def add(self, metrics):
+        busy = metrics.get("busy", 0.0)
+        self.samples += 1
+        self.busy_sum += busy
+        self.busy_max = max(self.busy_max, busy)
+        self.rcvq_max = max(self.rcvq_max, metrics.get("rcvq", 0))
+        self.sendq_max = max(self.sendq_max, metrics.get("sendq", 0))
+
+    def feed(self, line):
+        if _is_stats(line):
+            metrics = parse_metrics(line)
+            if metrics:
+                self.add(metrics)
+
+    def as_metrics(self):
+        """Return average and peak values, or ``None`` without samples."""
+        if not self.samples:
+            return None
+        return {
+            "busy": self.busy_sum / self.samples,
+            "busy_max": self.busy_max,
+            "rcvq": self.rcvq_max,
+            "sendq": self.sendq_max,
+            "samples": self.samples,
+        }
+
+
+def _newest_log(path):
+    p = Path(path)
+    if not p.is_dir():
+        return p
+    newest, newest_mtime = None, None
+    with os.scandir(p) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".log") or not entry.is_file():
+                continue
+            mtime = entry.stat().st_mtime
+            if newest is None or mtime > newest_mtime:
+                newest, newest_mtime = Path(entry.path), mtime
+    return newest
+
+
+def _find_inode(directory, inode):
+    """Return the file in ``directory`` with ``inode``, following renames."""
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.inode() == inode and entry.is_file():
+                    return entry.path
+    except OSError:
+        pass
+    return None
+
+
+def _last_stats(f, end):
+    """Return metrics from the last statistics line before offset ``end``.
+
+    The file is read backwards in :data:`BLOCK_SIZE` blocks so only the
+    tail is touched when the line is recent.
+    """
+    pos = end
+    partial = b""
+    while pos > 0:
+        start = max(0, pos - BLOCK_SIZE)
+        f.seek(start)
+        lines = (f.read(pos - start) + partial).split(b"\n")
+        # the first piece may be the end of a line starting in the next block
+        partial = lines.pop(0) if start else b""
+        for raw in reversed(lines):
+            line = raw.decode(errors="replace")
+            if _is_stats(line):
+                metrics = parse_metrics(line)
+                if metrics:
+                    return metrics
+        pos = start
+    line = partial.decode(errors="replace")
+    if _is_stats(line):
+        return parse_metrics(line) or None
+    return None
+
+
+def _read_forward(f, offset, window):
+    """Feed complete lines after ``offset`` to ``window``; return the new offset."""
+    f.seek(offset)
+    rest = b""
+    while True:
+        block = f.read(BLOCK_SIZE)
+        if not block:
+            break
+        lines = (rest + block).split(b"\n")
+        rest = lines.pop()
+        for raw in lines:
+            window.feed(raw.decode(errors="replace"))
+        offset += len(block)
+    # leave an unfinished last line for the next run
+    return offset - len(rest)
+
+
+def _load_cursor(path):
+    try:
+        with open(path) as f:
+            data = json.load(f)
+        return data["path"], int(data["inode"]), int(data["offset"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _save_cursor(path, log, inode, offset):
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(json.dumps({"path": str(log), "inode": inode, "offset": offset}))
+        os.replace(tmp, path)
+    except OSError as exc:
+        utils.log_error("Cannot save log cursor %s: %s", path, exc, source=LOG_SOURCE)
+
+
+def _cursor_path(log_dir):
+    """Return the cursor file for the logs in ``log_dir``."""
+    key = hashlib.sha1(str(Path(log_dir).resolve()).encode()).hexdigest()[:12]
+    return RUNTIME_DIR / f"{CURSOR_PREFIX}-{key}.cursor"
+
+
+def read_window(path=LOG_PATH, advance=True):
+    """Aggregate the statistics Direwolf logged since the previous call.
+
+    The read position is kept as ``(inode, offset)`` in a cursor file under
+    :data:`RUNTIME_DIR`, one per log directory, so each call only parses
+    bytes appended since the last one.  When the log was rotated the rest of
+    the old file is read before the new one; a truncated file is read from
+    the start.  Without a cursor the window starts at the end of the file.
+    With ``advance`` false the cursor is left where it was, so a dry run
+    does not take the window from the next beacon.
+
+    Returns
+    -------
+    tuple
+        ``(window, log_file, end_offset)``; ``window`` is a
+        :class:`WindowStats` and ``log_file`` is ``None`` if there is no log.
+    """
+    log = _newest_log(path)
+    window = WindowStats()
+    if log is None:
+        return window, None, 0
+    cursor_file = _cursor_path(Path(path) if Path(path).is_dir() else log.parent)
+    cursor = _load_cursor(cursor_file)
+    try:
+        f = log.open("rb")
+    except FileNotFoundError:
+        return window, None, 0
+    with f:
+        st = os.fstat(f.fileno())
+        offset = st.st_size
+        if cursor:
+            old_path, inode, old_offset = cursor
+            if inode == st.st_ino:
+                offset = old_offset if old_offset <= st.st_size else 0
+            else:
+                # rotated: finish the previous file, then read all of this one
+                rotated = _find_inode(Path(old_path).parent, inode)
+                if rotated is not None:
+                    try:
+                        with open(rotated, "rb") as old:
+                            _read_forward(old, old_offset, window)
+                    except OSError:
+                        pass
+                offset = 0
+        end = _read_forward(f, offset, window)
+        if advance:
+            _save_cursor(cursor_file, log, st.st_ino, end)
+    return window, log, end
+
+
+def read_metrics(path=LOG_PATH, advance=True):
+    """Return Direwolf metrics aggregated since the previous call.
 
     ``path`` may point directly to a log file or a directory containing
     rotated log files.  When a directory is provided, the newest ``*.log``
     file inside the directory is used.
-    """
-    p = Path(path)
-    if p.is_dir():
-        log_files = sorted(
-            [f for f in p.glob("*.log") if f.is_file()],
-            key=lambda f: f.stat().st_mtime,
-            reverse=True,
-        )
-        if not log_files:
-            return None
-        p = log_files[0]
 
+    The result holds the average ``busy`` with its maximum ``busy_max``,
+    and the peak ``rcvq`` and ``sendq`` over the window (see
+    :func:`read_window`).  If nothing new was logged the most recent
+    statistics line is used instead.  ``advance`` is passed on to
+    :func:`read_window`.
+    """
+    window, log, end = read_window(path, advance)
+    metrics = window.as_metrics()
+    if metrics or log is None:
+        return metrics
     try:
-        with p.open("r") as f:
-            lines = f.readlines()
-    except FileNotFoundError:
+        with log.open("rb") as f:
+            last = _last_stats(f, end)
+    except OSError:
         return None
-    for line in reversed(lines):
-        if "busy=" in line and "sendq=" in line:
-            data = parse_metrics(line)
-            if data:
-                return data
-    return None
+    if not last:
+        return None
+    window.add(last)
+    return window.as_metrics()
+
+
+# Sequence number of the last Direwolf output sample included in a beacon.
+_last_seq = 0
+
+
+def live_metrics():
+    """Return metrics streamed from Direwolf's output since the last call.
+
+    Returns ``None`` when Direwolf was not started by this process or has
+    not reported queue statistics yet; :func:`read_metrics` is used then.
+    """
+    global _last_seq
+    monitor = direwolf_stats.current()
+    if monitor is None:
+        return None
+    samples, _last_seq = monitor.since(_last_seq, "queue")
+    window = WindowStats()
+    for sample in samples:
+        window.add(sample.values)
+    metrics = window.as_metrics()
+    if metrics is None:
+        latest = monitor.latest()
+        if "busy" in latest:
+            window.add(latest)
+            metrics = window.as_metrics()
+    return metrics
 
 
 def build_aprs_info(lat, lon, table, symbol, version, metrics, seq=0):
@@ -67,8 +297,9 @@ def build_aprs_info(lat, lon, table, symbol, version, metrics, seq=0):
     busy = metrics.get("busy", 0.0) * 10
     rcvq = metrics.get("rcvq", 0)
     sendq = metrics.get("sendq", 0)
+    busy_max = metrics.get("busy_max", 0.0) * 10
 
-    analog = [busy, rcvq, sendq]
+    analog = [busy, rcvq, sendq, busy_max]
     comment = f"ver={version}"
     return utils.build_aprs_telemetry(seq, analog=analog, comment=comment)
 
@@ -85,7 +316,8 @@ def main(argv=None):
         utils.log_info("direwolf telemetry disabled in configuration", source=LOG_SOURCE)
         sys.exit(0)
 
-    metrics = read_metrics()
+    # a debug run must not consume the window of the next real beacon
+    metrics = live_metrics() or read_metrics(advance=not args.debug)
     if not metrics:
         utils.log_info(
             "No telemetry metrics found, sending zeros", source=LOG_SOURCE
@@ -95,7 +327,7 @@ def main(argv=None):
     callsign, lat, lon, table, symbol, path, dest, ver = config.load_aprs_config("DIREWOLF_TELEMETRY")
     callsign = utils.callsign_with_offset(callsign, 1)
     info = build_aprs_info(lat, lon, table, symbol, ver, metrics)
-    frame = utils.build_ax25_frame(dest, callsign, path, info)
+    frame = utils.ax25_encoder(dest, callsign, path).encode(info)
 
     if args.debug:
         utils.log_info(info, source=LOG_SOURCE)
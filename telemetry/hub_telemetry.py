@@ -7,6 +7,7 @@ import sys
 import logging
 from pathlib import Path
 
+import system_stats
 import utils
 
 LOG_SOURCE = (
@@ -17,33 +18,50 @@ LOG_SOURCE = (
 def get_laptop_telemetry():
     """Gather basic system metrics using ``psutil``.
 
+    When the launcher's :mod:`system_stats` sampler runs in this process the
+    CPU and network values are its rolling averages and ``mem_percent`` is
+    the peak, all available at once.  Otherwise they are measured over one
+    second.  Network use is the MB moved in the window of ``samples`` times
+    ``sample_interval`` of ``[HUBTELEMETRY]``, the average rate scaled to
+    it, rounded and limited to the 0-999 range of the telemetry field.
+
     Returns
     -------
     tuple
         ``(cpu_temp, cpu_load, uptime_hours, mem_percent, disk_percent,
         net_rx_mb, net_tx_mb)``.
     """
-    cpu_temp = 0.0
-    try:
-        temps = psutil.sensors_temperatures()
-        if 'coretemp' in temps:
-            cpu_temp = temps['coretemp'][0].current
-    except Exception:
-        cpu_temp = 0.0
-
-    cpu_load = psutil.cpu_percent(interval=1)
+    cfg = config.load_hubtelemetry_config()
+    samples = cfg["samples"]
+    sampler = system_stats.current()
+    rolling = sampler.aggregates() if sampler else {}
+    if rolling:
+        cpu_temp = rolling["cpu_temp"][1]
+        cpu_load = rolling["cpu_load"][1]
+        mem_percent = rolling["mem_percent"][2]
+        # MB per sample interval, averaged: scaled to the whole window
+        net_rx = rolling["net_rx_mb"][1] * samples
+        net_tx = rolling["net_tx_mb"][1] * samples
+    else:
+        cpu_temp = system_stats.cpu_temperature()
+        before, start = psutil.net_io_counters(), time.monotonic()
+        cpu_load = psutil.cpu_percent(interval=1)
+        net_rx, net_tx = system_stats.net_rate(
+            before,
+            psutil.net_io_counters(),
+            time.monotonic() - start,
+            (cfg["sample_interval"] or system_stats.INTERVAL) * samples,
+        )
+        mem_percent = psutil.virtual_memory().percent
+
     uptime_sec = int(time.time() - psutil.boot_time())
     uptime_hours = uptime_sec // 3600
 
-    mem = psutil.virtual_memory()
-    mem_percent = mem.percent
-
     disk = psutil.disk_usage('/')
     disk_percent = disk.percent
 
-    net = psutil.net_io_counters()
-    net_rx_mb = int(net.bytes_recv / 1024 / 1024)
-    net_tx_mb = int(net.bytes_sent / 1024 / 1024)
+    net_rx_mb = min(999, round(net_rx))
+    net_tx_mb = min(999, round(net_tx))
 
     return cpu_temp, cpu_load, uptime_hours, mem_percent, disk_percent, net_rx_mb, net_tx_mb
 
@@ -115,7 +133,7 @@ def main(argv=None):
         utils.log_info("APRS Info Field:", source=LOG_SOURCE)
         utils.log_info(info, source=LOG_SOURCE)
 
-    ax25_frame = utils.build_ax25_frame(destination, callsign, path, info)
+    ax25_frame = utils.ax25_encoder(destination, callsign, path).encode(info)
     if args.debug:
         utils.log_info("AX25 Frame Built:", source=LOG_SOURCE)
         utils.log_info(ax25_frame.hex(), source=LOG_SOURCE)
@@ -42,8 +42,8 @@ def hub_definitions(addressee):
 
 
 def direwolf_definitions(addressee):
-    names = ["busy", "rcvq", "sendq"]
-    units = ["%", "", ""]
+    names = ["busy", "rcvq", "sendq", "busyMax"]
+    units = ["%", "", "", "%"]
     bits = []
     return _build_def_packets(names, units, bits, addressee)
 
@@ -60,17 +60,13 @@ def main(argv=None):
         callsign, lat, lon, table, sym, path, dest, ver = config.load_aprs_config("HUBTELEMETRY")
         callsign = utils.callsign_with_offset(callsign, 0)
         defs = hub_definitions(dest)
-        for info in defs:
-            frame = utils.build_ax25_frame(dest, callsign, path, info)
-            frames.append(frame)
+        frames.extend(utils.ax25_encoder(dest, callsign, path).encode_many(defs))
 
     if config.load_direwolf_config().get("enabled", True):
         callsign, lat, lon, table, sym, path, dest, ver = config.load_aprs_config("DIREWOLF_TELEMETRY")
         callsign = utils.callsign_with_offset(callsign, 1)
         defs = direwolf_definitions(dest)
-        for info in defs:
-            frame = utils.build_ax25_frame(dest, callsign, path, info)
-            frames.append(frame)
+        frames.extend(utils.ax25_encoder(dest, callsign, path).encode_many(defs))
 
     for frame in frames:
         if args.debug:
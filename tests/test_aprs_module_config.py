@@ -5,7 +5,7 @@ def write_config(tmp_path, text, monkeypatch):
     path = tmp_path / "wx-helios.conf"
     path.write_text(text)
     monkeypatch.setattr(config, "CONFIG_PATH", path)
-    config._config = None
+    monkeypatch.setattr(config, "_config", None)
     return path
 
 
@@ -1,12 +1,25 @@
 import utils
 import config
+import aprsis_pool
 import sys
 import importlib.machinery
 import importlib.util
 
+import spool
+from tests.test_spool import spool_dir  # noqa: F401
+
+VERIFIED = b"# logresp N0CALL verified, server T2TEST\r\n"
+
 class DummySocket:
-    def __init__(self):
+    def __init__(self, logresp=VERIFIED):
         self.sent = b""
+        self.replies = [b"# aprsc 2.1.10\r\n", logresp]
+    def recv(self, size):
+        return self.replies.pop(0) if self.replies else b""
+    def settimeout(self, timeout):
+        pass
+    def close(self):
+        pass
     def sendall(self, data):
         self.sent += data
     def __enter__(self):
@@ -14,15 +27,20 @@ class DummySocket:
     def __exit__(self, exc_type, exc_val, exc_tb):
         pass
 
-def test_send_via_aprsis(monkeypatch):
-    dummy = DummySocket()
+def fake_server(monkeypatch, dummy):
     captured = {}
     def fake_create(addr, timeout=None):
         captured['addr'] = addr
         captured['timeout'] = timeout
         return dummy
 
+    def fake_getaddrinfo(host, port, type=0):
+        assert host == 'host'
+        return [(utils.socket.AF_INET, type, 6, '', ('192.0.2.1', port))]
+
     monkeypatch.setattr(utils.socket, 'create_connection', fake_create)
+    monkeypatch.setattr(utils.socket, 'getaddrinfo', fake_getaddrinfo)
+    monkeypatch.setattr(aprsis_pool, '_pools', {})
     monkeypatch.setattr(config, 'load_aprsis_config', lambda: {
         'enabled': True,
         'callsign': 'N0CALL',
@@ -31,15 +49,33 @@ def test_send_via_aprsis(monkeypatch):
         'port': 2020,
         'timeout': 3,
     })
+    return captured
+
+
+def test_send_via_aprsis(monkeypatch):
+    dummy = DummySocket()
+    captured = fake_server(monkeypatch, dummy)
 
     utils.send_via_aprsis('SRC>DEST:HELLO')
 
-    assert captured['addr'] == ('host', 2020)
-    assert captured['timeout'] == 3
+    assert captured['addr'] == ('192.0.2.1', 2020)
+    assert 0 < captured['timeout'] <= 3
     expected = b"user N0CALL pass 11111 vers wx-helios 0\r\nSRC>DEST:HELLO\r\n"
     assert dummy.sent == expected
 
 
+def test_rejected_login_keeps_the_spool(monkeypatch, spool_dir):
+    spool.for_sink("aprsis").append([b"SRC>DEST:OLD"])
+    dummy = DummySocket(b"# logresp N0CALL unverified, server T2TEST\r\n")
+    fake_server(monkeypatch, dummy)
+
+    utils.send_via_aprsis('SRC>DEST:HELLO')
+
+    assert dummy.sent == b"user N0CALL pass 11111 vers wx-helios 0\r\n"
+    frames, _ = spool.for_sink("aprsis").peek()
+    assert frames == [b"SRC>DEST:OLD", b"SRC>DEST:HELLO"]
+
+
 def test_send_via_aprsis_uses_daemon_queue(monkeypatch):
     items = []
 
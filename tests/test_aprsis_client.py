@@ -0,0 +1,202 @@
+import socket
+import threading
+import time
+
+import pytest
+
+import aprsis_pool
+import daemons.aprsis_client as ac
+
+
+class FakeAprsIs:
+    """Local APRS-IS server answering logins and recording frames.
+
+    ``replies`` gives the logresp status for successive connections (the
+    last one repeats).  ``keepalive`` is the comment interval in seconds,
+    or ``None`` for a server that goes silent after the login.
+    ``close_after`` closes each connection after that many frames and
+    ``delay`` holds back the greeting to simulate a slow or distant node.
+    """
+
+    def __init__(self, replies=("verified",), keepalive=0.05, close_after=None, delay=0):
+        self._sock = socket.create_server(("127.0.0.1", 0))
+        self.port = self._sock.getsockname()[1]
+        self.address = ("127.0.0.1", self.port)
+        self.delay = delay
+        self.connections = 0
+        self.replies = list(replies)
+        self.keepalive = keepalive
+        self.close_after = close_after
+        self.logins = []
+        self.frames = []
+        self.received = threading.Event()
+        self._closed = False
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        self.connections += 1
+        with conn:
+            time.sleep(self.delay)
+            if self._closed:
+                return
+            conn.sendall(b"# aprsc 2.1.10\r\n")
+            f = conn.makefile("rb")
+            login = f.readline().decode().strip()
+            if not login:
+                return
+            self.logins.append(login)
+            call = login.split()[1]
+            conn.sendall(f"# logresp {call} {reply}, server FAKE\r\n".encode())
+            if reply != "verified":
+                return
+            count = 0
+            conn.settimeout(self.keepalive or 0.05)
+            buf = b""
+            while not self._closed:
+                try:
+                    data = conn.recv(4096)
+                except socket.timeout:
+                    if self.keepalive:
+                        conn.sendall(b"# keepalive\r\n")
+                    continue
+                if not data:
+                    return
+                buf += data
+                *lines, buf = buf.split(b"\r\n")
+                for line in lines:
+                    self.frames.append(line.decode())
+                    self.received.set()
+                    count += 1
+                    if self.close_after and count >= self.close_after:
+                        return
+
+    def close(self):
+        self._closed = True
+        self._sock.close()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(ac, "CALLSIGN", "N0CALL")
+    monkeypatch.setattr(ac, "PASSCODE", "12345")
+    monkeypatch.setattr(ac, "TIMEOUT", 2)
+    monkeypatch.setattr(aprsis_pool, "_pools", {})
+    monkeypatch.setattr(ac, "_backoff", lambda attempt: 0.01)
+    monkeypatch.setattr(ac, "stats", dict.fromkeys(ac.stats, 0))
+    monkeypatch.setattr(ac, "FRAME_QUEUE", ac._FrameQueue())
+    ac._stop.clear()
+    ac._reconnect.clear()
+    thread = threading.Thread(target=ac._run, daemon=True)
+    monkeypatch.setattr(ac, "_thread", thread)
+
+    def start(*servers):
+        monkeypatch.setattr(ac, "SERVERS", tuple(s.address for s in servers))
+        thread.start()
+        return thread
+
+    yield start
+    ac._stop.set()
+    ac._wake()
+    thread.join(2)
+    assert not thread.is_alive()
+
+
+def wait_for(predicate, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_session_logs_in_and_sends(client):
+    server = FakeAprsIs()
+    try:
+        client(server)
+        assert ac.wait_ready(2)
+        ac.FRAME_QUEUE.put("SRC>DEST:one")
+        ac.FRAME_QUEUE.put("SRC>DEST:two")
+        assert wait_for(lambda: len(server.frames) == 2)
+        assert server.logins == ["user N0CALL pass 12345 vers wx-helios 0"]
+        status = ac.status()
+        assert status["state"] == "connected" and status["server"] == "FAKE"
+        assert status["uptime"] > 0 and status["frames"] == 2
+        assert status["send_latency"] > 0
+        # keepalive comments are consumed as they arrive
+        assert wait_for(lambda: ac.stats["lines_received"] > 3)
+    finally:
+        server.close()
+
+
+def test_unverified_login_is_retried(client):
+    server = FakeAprsIs(replies=("unverified", "verified"))
+    try:
+        client(server)
+        assert ac.wait_ready(2)
+        assert ac.stats["login_failures"] == 1
+        assert ac.stats["sessions"] == 1
+    finally:
+        server.close()
+
+
+def test_silent_server_is_dropped(client, monkeypatch):
+    monkeypatch.setattr(ac, "IDLE_TIMEOUT", 0.2)
+    server = FakeAprsIs(keepalive=None)
+    try:
+        client(server)
+        assert wait_for(lambda: ac.stats["idle_timeouts"] >= 1)
+        assert wait_for(lambda: ac.stats["reconnects"] >= 1)
+        assert len(server.logins) >= 2
+    finally:
+        server.close()
+
+
+def test_frames_survive_a_dropped_session(client):
+    server = FakeAprsIs(close_after=1)
+    try:
+        client(server)
+        assert ac.wait_ready(2)
+        ac.FRAME_QUEUE.put("SRC>DEST:one")
+        assert wait_for(lambda: server.frames == ["SRC>DEST:one"])
+        ac.FRAME_QUEUE.put("SRC>DEST:two")
+        assert wait_for(lambda: "SRC>DEST:two" in server.frames)
+        assert ac.stats["reconnects"] >= 1
+    finally:
+        server.close()
+
+
+def test_reload_wakes_the_session(client, monkeypatch):
+    first, second = FakeAprsIs(), FakeAprsIs()
+    try:
+        client(first)
+        assert ac.wait_ready(2)
+        monkeypatch.setattr(ac, "SERVERS", (second.address,))
+        ac._reconnect.set()
+        ac._wake()
+        assert wait_for(lambda: second.logins)
+        ac.FRAME_QUEUE.put("SRC>DEST:moved")
+        assert wait_for(lambda: second.frames == ["SRC>DEST:moved"])
+    finally:
+        first.close()
+        second.close()
+
+
+def test_session_uses_fastest_server(client):
+    slow, fast = FakeAprsIs(delay=0.3), FakeAprsIs()
+    try:
+        client(slow, fast)
+        assert ac.wait_ready(2)
+        assert ac.status()["address"] == fast.address
+    finally:
+        slow.close()
+        fast.close()
@@ -0,0 +1,116 @@
+import socket
+import time
+
+import pytest
+
+import aprsis_pool
+import config
+from tests.test_aprsis_client import FakeAprsIs
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def make(**kwargs):
+        server = FakeAprsIs(**kwargs)
+        started.append(server)
+        return server
+
+    yield make
+    for server in started:
+        server.close()
+
+
+def _dead_address():
+    """Return a local address that refuses connections."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()
+
+
+def test_race_picks_fastest_and_remembers_rtt(servers):
+    slow, fast = servers(delay=0.4), servers(delay=0.05)
+    pool = aprsis_pool.ServerPool([slow.address, fast.address], timeout=2)
+    start = time.monotonic()
+    conn = pool.connect()
+    conn.sock.close()
+    assert conn.address == fast.address
+    assert conn.greeting.startswith(b"# aprsc")
+    # the slow server was only tried first, not waited for
+    assert time.monotonic() - start < 0.4
+    # with a measured round trip the fast server is tried first next time
+    assert pool.candidates()[0][1] == fast.address
+    conn = pool.connect()
+    conn.sock.close()
+    assert conn.address == fast.address
+    assert slow.connections == 1
+
+
+def test_failed_address_starts_next_attempt_at_once(servers, monkeypatch):
+    monkeypatch.setattr(aprsis_pool, "STAGGER", 5.0)
+    good = servers()
+    dead = _dead_address()
+    pool = aprsis_pool.ServerPool([dead, good.address], timeout=2)
+    start = time.monotonic()
+    conn = pool.connect()
+    conn.sock.close()
+    assert conn.address == good.address
+    assert time.monotonic() - start < 1.0
+    # the refused address is tried last from now on
+    assert [a for _, a in pool.candidates()] == [good.address, dead]
+
+
+def test_failover_is_bounded_by_timeout(servers):
+    silent = servers(delay=5)
+    pool = aprsis_pool.ServerPool([silent.address], timeout=0.3)
+    start = time.monotonic()
+    with pytest.raises(OSError):
+        pool.connect()
+    assert time.monotonic() - start < 1.0
+
+
+def test_resolution_is_cached(monkeypatch):
+    lookups = []
+    now = [0.0]
+
+    def fake_getaddrinfo(host, port, type=0):
+        lookups.append(host)
+        if len(lookups) > 2:
+            raise socket.gaierror("offline")
+        return [
+            (socket.AF_INET6, type, 6, "", ("2001:db8::1", port, 0, 0)),
+            (socket.AF_INET, type, 6, "", ("192.0.2.1", port)),
+            (socket.AF_INET, type, 6, "", ("192.0.2.2", port)),
+        ]
+
+    monkeypatch.setattr(aprsis_pool.socket, "getaddrinfo", fake_getaddrinfo)
+    pool = aprsis_pool.ServerPool([("rotate.example", 14580)], clock=lambda: now[0])
+    expected = [("2001:db8::1", 14580), ("192.0.2.1", 14580), ("192.0.2.2", 14580)]
+    assert pool.resolve("rotate.example", 14580) == expected
+    assert pool.resolve("rotate.example", 14580) == expected
+    assert lookups == ["rotate.example"]
+    now[0] += aprsis_pool.DNS_TTL + 1
+    assert pool.resolve("rotate.example", 14580) == expected
+    now[0] += aprsis_pool.DNS_TTL + 1
+    # a failed lookup keeps the stale addresses
+    assert pool.resolve("rotate.example", 14580) == expected
+    assert len(lookups) == 3
+
+
+def test_config_server_list(tmp_path):
+    path = tmp_path / "wx-helios.conf"
+    path.write_text(
+        "[APRS_IS]\nport = 14580\n"
+        "server = first.example, second.example:10152, [2001:db8::1]:14581, 2001:db8::2\n"
+    )
+    cfg = config.parse(path)
+    assert cfg.aprs_is.servers == (
+        ("first.example", 14580),
+        ("second.example", 10152),
+        ("2001:db8::1", 14581),
+        ("2001:db8::2", 14580),
+    )
+    path.write_text("[APRS_IS]\nserver = host:port\n")
+    with pytest.raises(config.ConfigError):
+        config.parse(path)
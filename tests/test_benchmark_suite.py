@@ -0,0 +1,39 @@
+import json
+
+from benchmarks import suite
+
+
+def test_summarize_orders_samples():
+    stats = suite.summarize([3.0, 1.0, 2.0, 4.0, 5.0])
+    assert stats["min"] == 1.0
+    assert stats["median"] == 3.0
+    assert stats["samples"] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert stats["iqr"] > 0
+
+
+def test_synthetic_log_has_recent_metrics(tmp_path, monkeypatch):
+    from telemetry import direwolf_telemetry
+
+    monkeypatch.setattr(direwolf_telemetry, "RUNTIME_DIR", tmp_path / "runtime")
+    path = suite.synthetic_log(tmp_path, 300_000)
+    assert path.stat().st_size >= 300_000
+    assert suite.synthetic_log(tmp_path, 300_000) == path
+    assert direwolf_telemetry.read_metrics(path) is not None
+
+
+def test_run_writes_json_and_compares(tmp_path, capsys):
+    out = tmp_path / "result.json"
+    argv = ["-k", "kiss", "--scale", "0.001", "--repeat", "2", "--workdir", str(tmp_path)]
+    suite.run(argv + ["--json", str(out)])
+    report = json.loads(out.read_text())
+    assert set(report["results"]) == {"kiss.encode", "kiss.Decoder.feed"}
+    assert report["meta"]["profile"] == "full"
+
+    suite.run(argv + ["--compare", str(out)])
+    assert "kiss.encode" in capsys.readouterr().out.split("compared with")[1]
+
+
+def test_parse_size():
+    assert suite._parse_size("1M") == 1 << 20
+    assert suite._parse_size("1g") == 1 << 30
+    assert suite._parse_size("512") == 512
@@ -0,0 +1,280 @@
+import http.client
+import importlib.util
+import os
+import socket
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+import config
+import main
+import scheduler
+import daemons.kiss_client as kc
+
+
+def write_config(tmp_path, text, monkeypatch):
+    path = tmp_path / "wx-helios.conf"
+    path.write_text(text)
+    monkeypatch.setattr(config, "CONFIG_PATH", path)
+    monkeypatch.setattr(config, "_config", None)
+    return path
+
+
+def rewrite(path, text):
+    path.write_text(text)
+    # make sure the modification time moves even on coarse filesystems
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 1))
+
+
+@pytest.fixture
+def changes():
+    seen = []
+
+    def record(old, new):
+        seen.append((old, new))
+
+    config.subscribe(record)
+    yield seen
+    config.unsubscribe(record)
+
+
+def test_reload_notifies_only_on_change(tmp_path, monkeypatch, changes):
+    path = write_config(tmp_path, "[KISS_CLIENT]\nport = 9001\n", monkeypatch)
+    assert config.snapshot().kiss_client.port == 9001
+
+    rewrite(path, "[KISS_CLIENT]\nport = 9001\n")
+    assert not config.reload()
+    assert changes == []
+
+    rewrite(path, "[KISS_CLIENT]\nport = 9002\n")
+    assert config.reload()
+    old, new = changes[0]
+    assert (old.kiss_client.port, new.kiss_client.port) == (9001, 9002)
+    assert config.snapshot() is new
+
+
+def test_invalid_file_keeps_current_snapshot(tmp_path, monkeypatch, changes):
+    path = write_config(tmp_path, "[KISS_CLIENT]\nport = 9001\n", monkeypatch)
+    snap = config.snapshot()
+    rewrite(path, "[KISS_CLIENT]\nport = ninety\n")
+    assert not config.reload()
+    assert config.snapshot() is snap
+    assert changes == []
+
+
+def test_refused_change_is_retried(tmp_path, monkeypatch, changes):
+    path = write_config(tmp_path, "[TELEMETRY]\nworkers = 1\n", monkeypatch)
+    config.snapshot()
+    attempts = []
+
+    def busy(old, new):
+        attempts.append(new.telemetry.workers)
+        return len(attempts) > 2
+
+    config.subscribe(busy)
+    try:
+        rewrite(path, "[TELEMETRY]\nworkers = 3\n")
+        assert config.reload()
+        assert not config.check_reload()
+        assert not config.check_reload()
+        assert attempts == [3, 3, 3]
+    finally:
+        config.unsubscribe(busy)
+    assert len(changes) == 1
+
+
+def test_check_reload_watches_mtime(tmp_path, monkeypatch, changes):
+    path = write_config(tmp_path, "[TELEMETRY]\nworkers = 1\n", monkeypatch)
+    config.snapshot()
+    assert not config.check_reload()
+    rewrite(path, "[TELEMETRY]\nworkers = 3\n")
+    assert config.check_reload()
+    assert config.load_telemetry_workers() == 3
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(port, path):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+    try:
+        conn.request("GET", path + "?tempf=1")
+        return conn.getresponse().status
+    finally:
+        conn.close()
+
+
+def test_ecowitt_listener_rebinds_on_reload(tmp_path, monkeypatch):
+    first, second = _free_port(), _free_port()
+    path = write_config(tmp_path, f"[ECOWITT]\nport = {first}\n", monkeypatch)
+    spec = importlib.util.spec_from_file_location(
+        "ecowitt_listener",
+        Path(__file__).resolve().parent.parent / "daemons" / "ecowitt_listener.py",
+    )
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    mod.log_params = lambda client, params: None
+    handle, thread = mod.start()
+    try:
+        assert _get(first, mod.PATH) == 200
+        rewrite(path, f"[ECOWITT]\nport = {second}\npath = /wx\n")
+        assert config.reload()
+        assert _get(second, "/wx") == 200
+        with pytest.raises(OSError):
+            _get(first, "/wx")
+    finally:
+        config.unsubscribe(mod._on_reload)
+        handle.shutdown()
+        thread.join()
+
+
+def test_ecowitt_failed_rebind_is_retried(tmp_path, monkeypatch):
+    first = _free_port()
+    busy = socket.create_server(("", 0))
+    second = busy.getsockname()[1]
+    path = write_config(tmp_path, f"[ECOWITT]\nport = {first}\n", monkeypatch)
+    spec = importlib.util.spec_from_file_location(
+        "ecowitt_listener",
+        Path(__file__).resolve().parent.parent / "daemons" / "ecowitt_listener.py",
+    )
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    mod.log_params = lambda client, params: None
+    handle, thread = mod.start()
+    try:
+        rewrite(path, f"[ECOWITT]\nport = {second}\n")
+        assert config.reload()
+        # the old listener keeps serving and the module still says so
+        assert mod.PORT == first
+        assert _get(first, mod.PATH) == 200
+        busy.close()
+        # the file did not change, but the listener asked to be retried
+        assert not config.reload()
+        assert mod.PORT == second
+        assert _get(second, mod.PATH) == 200
+        server = mod._listener[0]
+        rewrite(path, f"[ECOWITT]\nport = {second}\nmax_connections = 2\n")
+        assert config.reload()
+        # a new cap is applied without letting go of the port
+        assert mod._listener[0] is server
+        assert server.max_connections == 2
+        assert _get(second, mod.PATH) == 200
+    finally:
+        busy.close()
+        config.unsubscribe(mod._on_reload)
+        handle.shutdown()
+        thread.join()
+
+
+def test_kiss_client_reconnects_to_new_host(tmp_path, monkeypatch):
+    path = write_config(
+        tmp_path, "[KISS_CLIENT]\nhost = 10.0.0.1\nport = 8001\n", monkeypatch
+    )
+    addresses = []
+    sent = threading.Event()
+
+    class DummySocket:
+        def __init__(self, addr):
+            self.addr = addr
+
+        def settimeout(self, t):
+            pass
+
+        def setsockopt(self, *args):
+            pass
+
+        def close(self):
+            pass
+
+        def sendall(self, data):
+            if self.addr[0] == "10.0.0.2":
+                sent.set()
+
+    def fake_create(addr):
+        addresses.append(addr)
+        return DummySocket(addr)
+
+    monkeypatch.setattr(kc.socket, "create_connection", fake_create)
+    monkeypatch.setattr(kc, "HOST", "10.0.0.1")
+    monkeypatch.setattr(kc, "PORT", 8001)
+    monkeypatch.setattr(kc, "ENABLED", True)
+    monkeypatch.setattr(kc, "_section", kc._section)
+    monkeypatch.setattr(kc, "FRAME_QUEUE", kc.queue.Queue())
+    kc._stop.clear()
+    kc._reconnect.clear()
+    thread = threading.Thread(target=kc._run, daemon=True)
+    monkeypatch.setattr(kc, "_thread", thread)
+    thread.start()
+    config.subscribe(kc._on_reload)
+    try:
+        config.snapshot()
+        rewrite(path, "[KISS_CLIENT]\nhost = 10.0.0.2\nport = 8002\n")
+        config.reload()
+        deadline = time.monotonic() + 2
+        while len(addresses) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        kc.FRAME_QUEUE.put(b"HI")
+        assert sent.wait(2)
+    finally:
+        config.unsubscribe(kc._on_reload)
+        kc.FRAME_QUEUE.put(None)
+        thread.join(2)
+    assert addresses == [("10.0.0.1", 8001), ("10.0.0.2", 8002)]
+
+
+def test_reschedule_only_changed_telemetry(tmp_path, monkeypatch):
+    path = write_config(
+        tmp_path,
+        "[TELEMETRY]\nmodules = a, b\n[TELEMETRY_SCHEDULES]\na = 0 * * * *\n",
+        monkeypatch,
+    )
+    old = config.snapshot()
+    sched = scheduler.Scheduler(clock=lambda: 0)
+
+    class Pool:
+        workers = None
+
+        def submit(self, name, deadline, due=None):
+            pass
+
+        def resize(self, workers):
+            self.workers = workers
+
+    pool = Pool()
+    jobs = main.schedule_telemetry(
+        sched, pool, ["a", "b"], {"a": "0 * * * *"}, {}, 60
+    )
+    kept = jobs["b"]
+    rewrite(
+        path,
+        "[TELEMETRY]\nmodules = a, b, c\nworkers = 4\n"
+        "[TELEMETRY_SCHEDULES]\na = */5 * * * *\n",
+    )
+    config.reload()
+    main.reschedule_telemetry(sched, pool, jobs, old, config.snapshot(), 60)
+    assert jobs["b"] is kept
+    assert set(jobs) == {"a", "b", "c"}
+    assert jobs["a"].next_run == 300
+    assert pool.workers == 4
+    assert {job.name for job in sched.jobs()} == {"a", "b", "c"}
+
+
+def test_pool_resize(monkeypatch):
+    monkeypatch.setattr(main, "run_telemetry_module", lambda name, timeout=None: 0)
+    pool = main.TelemetryPool(1)
+    try:
+        pool.resize(3)
+        assert sum(t.is_alive() for t in pool._threads) == 3
+        pool.resize(1)
+        deadline = time.monotonic() + 2
+        while sum(t.is_alive() for t in pool._threads) > 1 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert sum(t.is_alive() for t in pool._threads) == 1
+    finally:
+        pool.shutdown()
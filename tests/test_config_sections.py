@@ -1,3 +1,5 @@
+import pytest
+
 import config
 
 
@@ -5,7 +7,7 @@ def write_config(tmp_path, text, monkeypatch):
     path = tmp_path / "wx-helios.conf"
     path.write_text(text)
     monkeypatch.setattr(config, "CONFIG_PATH", path)
-    config._config = None
+    monkeypatch.setattr(config, "_config", None)
     return path
 
 
@@ -99,6 +101,80 @@ def test_aprsis_values(tmp_path, monkeypatch):
         "callsign": "N0CALL",
         "passcode": "2222",
         "server": "test.example",
+        "servers": (("test.example", 1234),),
         "port": 1234,
         "timeout": 5.0,
     }
+
+
+def test_metrics_config(tmp_path, monkeypatch):
+    write_config(tmp_path, "", monkeypatch)
+    assert config.load_metrics_config() == {
+        "enabled": False,
+        "host": "127.0.0.1",
+        "port": 9108,
+    }
+    write_config(tmp_path, "[METRICS]\nenabled = yes\nhost = 0.0.0.0\nport = 9200\n", monkeypatch)
+    assert config.load_metrics_config() == {
+        "enabled": True,
+        "host": "0.0.0.0",
+        "port": 9200,
+    }
+
+
+def test_telemetry_isolated(tmp_path, monkeypatch):
+    write_config(tmp_path, "", monkeypatch)
+    assert config.load_telemetry_isolated() == []
+    write_config(
+        tmp_path, "[TELEMETRY]\nmodules = t1, t2\nisolated = t2 ,\n", monkeypatch
+    )
+    assert config.load_telemetry_isolated() == ["t2"]
+
+
+def test_telemetry_deadlines(tmp_path, monkeypatch):
+    write_config(
+        tmp_path,
+        "[TELEMETRY]\nworkers = 3\n"
+        "[TELEMETRY_SCHEDULES]\nfoo = 0 * * * *\nfoo.deadline = 15\n",
+        monkeypatch,
+    )
+    assert config.load_telemetry_schedules() == {"foo": "0 * * * *"}
+    assert config.load_telemetry_deadlines() == {"foo": 15.0}
+    assert config.load_telemetry_workers() == 3
+
+
+def test_invalid_value_reported_at_load(tmp_path, monkeypatch):
+    write_config(tmp_path, "[ECOWITT]\nport = eighty\n", monkeypatch)
+    with pytest.raises(config.ConfigError, match=r"\[ECOWITT\] port"):
+        config.load_daemon_modules()
+
+
+def test_invalid_schedule_reported_at_load(tmp_path, monkeypatch):
+    write_config(tmp_path, "[TELEMETRY_SCHEDULES]\nfoo = 61 * * * *\n", monkeypatch)
+    with pytest.raises(config.ConfigError, match="foo"):
+        config.snapshot()
+
+
+def test_snapshot_is_frozen_and_cached(tmp_path, monkeypatch):
+    path = write_config(tmp_path, "[KISS_CLIENT]\nport = 9001\n", monkeypatch)
+    snap = config.snapshot()
+    assert snap.kiss_client.port == 9001
+    with pytest.raises(AttributeError):
+        snap.kiss_client.port = 1
+    path.write_text("[KISS_CLIENT]\nport = 9002\n")
+    assert config.snapshot() is snap
+
+
+def test_child_uses_exported_snapshot(tmp_path, monkeypatch):
+    path = write_config(tmp_path, "[KISS_CLIENT]\nport = 9001\n", monkeypatch)
+    monkeypatch.setenv(config.ENV_VAR, config.export())
+    path.write_text("[KISS_CLIENT]\nport = 9002\n")
+    config._config = None
+    assert config.load_kiss_client_config()["port"] == 9001
+
+    # a snapshot of another file is ignored
+    other = tmp_path / "other.conf"
+    other.write_text("")
+    monkeypatch.setattr(config, "CONFIG_PATH", other)
+    config._config = None
+    assert config.load_kiss_client_config()["port"] == 8001
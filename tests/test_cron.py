@@ -0,0 +1,100 @@
+import random
+from datetime import datetime, timezone
+import pytest
+
+import cron
+
+# croniter versions < 1.4 trigger DeprecationWarnings on Python 3.12 when
+# using ``datetime.utcfromtimestamp`` internally.
+CRON_DEPRECATION_FILTER = (
+    "ignore:.*utcfromtimestamp.*:DeprecationWarning:croniter.*"
+)
+
+
+def ts(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.mark.parametrize("expr,start,expected", [
+    ("*/2 * * * *", 0, 120),
+    ("*/2 * * * *", 119.5, 120),
+    ("*/2 * * * *", 120, 240),
+    ("0 */4 * * *", ts(2024, 1, 1, 3, 59), ts(2024, 1, 1, 4, 0)),
+    ("0 0 29 2 *", ts(2023, 3, 1), ts(2024, 2, 29)),
+    ("30 6 * * mon", ts(2024, 5, 1), ts(2024, 5, 6, 6, 30)),
+    ("0 0 1 jan-mar *", ts(2024, 4, 1), ts(2025, 1, 1)),
+    ("0 12 13 * 5", ts(2024, 9, 1), ts(2024, 9, 6, 12, 0)),
+    ("0 0 * * 7", ts(2024, 5, 1), ts(2024, 5, 5)),
+    ("@hourly", ts(2024, 12, 31, 23, 30), ts(2025, 1, 1)),
+])
+def test_next_after(expr, start, expected):
+    assert cron.compile(expr).next_after(start) == expected
+
+
+@pytest.mark.parametrize("expr", [
+    "* * * *",
+    "60 * * * *",
+    "* * 0 * *",
+    "*/0 * * * *",
+    "5-1 * * * *",
+    "* * * foo *",
+])
+def test_invalid_expressions(expr):
+    with pytest.raises(ValueError):
+        cron.CronExpr(expr)
+
+
+def test_upcoming_table():
+    fires = cron.compile("*/15 * * * *").upcoming(0, 4)
+    assert fires == [900, 1800, 2700, 3600]
+
+
+def test_cron_iter_is_stateful():
+    itr = cron.CronIter("*/5 * * * *", 0)
+    assert [itr.get_next(float) for _ in range(3)] == [300, 600, 900]
+
+
+def _random_field(rnd, lo, hi, names=()):
+    k = rnd.random()
+    if k < 0.3:
+        return "*"
+    if k < 0.45:
+        return f"*/{rnd.randint(1, hi - lo + 1)}"
+    a = rnd.randint(lo, hi)
+    if k < 0.6:
+        return names[a - lo] if names and rnd.random() < 0.3 else str(a)
+    b = rnd.randint(a, hi)
+    if k < 0.75:
+        return f"{a}-{b}"
+    if k < 0.9:
+        return f"{a}-{b}/{rnd.randint(1, 5)}"
+    return ",".join(str(rnd.randint(lo, hi)) for _ in range(rnd.randint(2, 4)))
+
+
+@pytest.mark.filterwarnings(CRON_DEPRECATION_FILTER)
+def test_equivalent_to_croniter():
+    croniter = pytest.importorskip("croniter").croniter
+    months = ["jan", "feb", "mar", "apr", "may", "jun",
+              "jul", "aug", "sep", "oct", "nov", "dec"]
+    days = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+    rnd = random.Random(4)
+    checked = 0
+    for _ in range(1500):
+        expr = " ".join([
+            _random_field(rnd, 0, 59),
+            _random_field(rnd, 0, 23),
+            _random_field(rnd, 1, 31),
+            _random_field(rnd, 1, 12, months),
+            _random_field(rnd, 0, 6, days),
+        ])
+        start = rnd.uniform(0, 4.1e9)
+        try:
+            ref_itr = croniter(expr, start)
+            expected = [ref_itr.get_next(float) for _ in range(4)]
+        except Exception:
+            # impossible dates such as "31 2" are rejected by both
+            continue
+        itr = cron.CronIter(expr, start)
+        assert [itr.get_next(float) for _ in range(4)] == expected, expr
+        checked += 1
+    assert checked > 1000
@@ -0,0 +1,76 @@
+import io
+import os
+import subprocess
+import sys
+
+import direwolf_stats as ds
+import telemetry.direwolf_telemetry as dw
+
+
+OUTPUT = b"""Dire Wolf version 1.7
+ADEVICE0: Sample rate approx. 44.1 k, 0 errors, receive audio level CH0 44
+T: busy=12.5% cd=0 rcvq=3(0.0) sendq=2(0.0)
+KF6UFO-1 audio level = 39(17/12)   [NONE]   |||||____
+T: busy=2.5% cd=0 rcvq=0(0.0) sendq=5(0.0)
+"""
+
+
+def test_parse_kinds():
+    assert ds.parse("T: busy=12.5% cd=0 rcvq=3(0.0) sendq=2(0.0)") == (
+        "queue", {"busy": 12.5, "rcvq": 3, "sendq": 2},
+    )
+    assert ds.parse("receive audio levels CH1 7, CH0 3") == (
+        "audio", {"channel": 1, "level": 7},
+    )
+    assert ds.parse("N0CALL audio level = 39(17/12)") == (
+        "packet", {"rx_level": 39, "mark": 17, "space": 12},
+    )
+    assert ds.parse("Ready to accept KISS TCP client application") is None
+
+
+def test_monitor_reads_stream_into_ring():
+    lines = []
+    monitor = ds.Monitor(io.BytesIO(OUTPUT), ring_size=3, sink=lines.append)
+    monitor.start()
+    monitor.join(2)
+    assert len(lines) == 5
+    samples, seq = monitor.since()
+    assert seq == 4
+    assert [s.kind for s in samples] == ["queue", "packet", "queue"]
+    latest = monitor.latest()
+    assert latest["audio_level"] == {0: 44}
+    assert (latest["busy"], latest["sendq"], latest["rx_level"]) == (2.5, 5, 39)
+    assert monitor.since(3, "queue")[0][0].values["busy"] == 2.5
+
+
+def test_attach_writes_rotating_log(tmp_path):
+    proc = subprocess.Popen(
+        [sys.executable, "-c", "import sys; sys.stdout.write(%r)" % OUTPUT.decode()],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    log = tmp_path / "out" / "direwolf.log"
+    monitor = ds.attach(proc, {"output_log": str(log), "ring_size": 8})
+    try:
+        proc.wait(5)
+        monitor.join(5)
+        assert ds.current() is monitor
+        assert "receive audio level CH0 44" in log.read_text()
+        assert len(monitor.since()[0]) == 4
+    finally:
+        proc.stdout.close()
+        ds._monitor = None
+
+
+def test_telemetry_uses_live_samples(monkeypatch):
+    monitor = ds.Monitor(io.BytesIO(b""))
+    monkeypatch.setattr(ds, "_monitor", monitor)
+    monkeypatch.setattr(dw, "_last_seq", 0)
+    assert dw.live_metrics() is None
+    for line in OUTPUT.decode().splitlines():
+        monitor.feed(line)
+    assert dw.live_metrics() == {
+        "busy": 7.5, "busy_max": 12.5, "rcvq": 3, "sendq": 5, "samples": 2,
+    }
+    # nothing new: repeat the newest values
+    assert dw.live_metrics()["busy"] == 2.5
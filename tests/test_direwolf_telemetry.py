@@ -7,6 +7,13 @@ import utils as shared
 import config
 
 
+@pytest.fixture(autouse=True)
+def runtime_dir(tmp_path, monkeypatch):
+    path = tmp_path / "runtime"
+    monkeypatch.setattr(dw, "RUNTIME_DIR", path)
+    return path
+
+
 def test_parse_metrics():
     line = "T: busy=12.5% cd=0 rcvq=3(0.0) sendq=2(0.0)"
     result = dw.parse_metrics(line)
@@ -23,14 +30,83 @@ def test_read_metrics_directory(tmp_path):
         "noise\nT: busy=12.5% cd=0 rcvq=4(0.0) sendq=3(0.0)\nmore\n"
     )
     result = dw.read_metrics(tmp_path)
-    assert result == {"busy": 12.5, "rcvq": 4, "sendq": 3}
+    assert result == {"busy": 12.5, "busy_max": 12.5, "rcvq": 4, "sendq": 3, "samples": 1}
+
+
+def _stats(busy, rcvq=0, sendq=0):
+    return f"T: busy={busy}% cd=0 rcvq={rcvq}(0.0) sendq={sendq}(0.0)\n"
+
+
+def test_read_metrics_aggregates_appended_lines(tmp_path):
+    log = tmp_path / "direwolf.log"
+    log.write_text(_stats(5.0, 1, 1))
+    assert dw.read_metrics(tmp_path)["busy"] == 5.0
+    with log.open("a") as f:
+        f.write("noise\n" + _stats(10.0, 4, 0) + _stats(20.0, 2, 6) + "T: busy=99")
+    result = dw.read_metrics(tmp_path)
+    assert result == {"busy": 15.0, "busy_max": 20.0, "rcvq": 4, "sendq": 6, "samples": 2}
+    # the unfinished line is picked up once it is complete
+    with log.open("a") as f:
+        f.write(".0% cd=0 rcvq=0(0.0) sendq=0(0.0)\n")
+    assert dw.read_metrics(tmp_path)["busy"] == 99.0
+
+
+def test_cursor_is_kept_out_of_the_log_directory(tmp_path, runtime_dir):
+    logs = tmp_path / "log"
+    logs.mkdir()
+    log = logs / "direwolf.log"
+    log.write_text(_stats(1.0))
+    dw.read_metrics(logs)
+    assert [p.name for p in logs.iterdir()] == ["direwolf.log"]
+    assert len(list(runtime_dir.glob("*.cursor"))) == 1
+
+
+def test_dry_run_leaves_the_window_to_the_next_beacon(tmp_path):
+    log = tmp_path / "direwolf.log"
+    log.write_text(_stats(1.0))
+    dw.read_metrics(tmp_path)
+    with log.open("a") as f:
+        f.write(_stats(3.0) + _stats(5.0))
+    assert dw.read_metrics(tmp_path, advance=False)["samples"] == 2
+    assert dw.read_metrics(tmp_path)["samples"] == 2
+
+
+def test_read_metrics_falls_back_to_last_line(tmp_path, monkeypatch):
+    monkeypatch.setattr(dw, "BLOCK_SIZE", 16)
+    log = tmp_path / "direwolf.log"
+    log.write_text(_stats(7.5, 3, 2) + "noise\n" * 20)
+    dw.read_metrics(tmp_path)
+    result = dw.read_metrics(tmp_path)
+    assert result == {"busy": 7.5, "busy_max": 7.5, "rcvq": 3, "sendq": 2, "samples": 1}
+
+
+def test_read_metrics_follows_rotation(tmp_path):
+    log = tmp_path / "direwolf.log"
+    log.write_text(_stats(1.0))
+    dw.read_metrics(log)
+    with log.open("a") as f:
+        f.write(_stats(3.0))
+    log.rename(tmp_path / "direwolf.log.1")
+    log.write_text(_stats(5.0, 7, 0))
+    result = dw.read_metrics(log)
+    assert result == {"busy": 4.0, "busy_max": 5.0, "rcvq": 7, "sendq": 0, "samples": 2}
+
+
+def test_read_metrics_restarts_after_truncation(tmp_path):
+    log = tmp_path / "direwolf.log"
+    log.write_text(_stats(1.0) * 5)
+    dw.read_metrics(log)
+    with log.open("w") as f:
+        f.write(_stats(2.0))
+    assert dw.read_metrics(log)["samples"] == 1
+    assert dw.read_metrics(log)["busy"] == 2.0
 
 
 def test_kiss_frame_generation(monkeypatch):
     metrics = {"busy": 1.0, "rcvq": 2, "sendq": 3}
 
     monkeypatch.setattr(config, "load_direwolf_config", lambda: {"enabled": True})
-    monkeypatch.setattr(dw, "read_metrics", lambda path=None: metrics)
+    monkeypatch.setattr(dw, "read_metrics", lambda path=None, advance=True: metrics)
     monkeypatch.setattr(
         config,
         "load_aprs_config",
@@ -53,9 +129,15 @@ def test_kiss_frame_generation(monkeypatch):
     assert info == "T#000,010,002,003,000,000,00000000 ver=v1"
 
 
+def test_busy_max_channel():
+    metrics = {"busy": 2.0, "busy_max": 9.5, "rcvq": 0, "sendq": 0}
+    info = dw.build_aprs_info(10.0, -100.0, "/", "Y", "v1", metrics)
+    assert info == "T#000,020,000,000,095,000,00000000 ver=v1"
+
+
 def test_zero_frame_when_no_metrics(monkeypatch):
     monkeypatch.setattr(config, "load_direwolf_config", lambda: {"enabled": True})
-    monkeypatch.setattr(dw, "read_metrics", lambda path=None: None)
+    monkeypatch.setattr(dw, "read_metrics", lambda path=None, advance=True: None)
     monkeypatch.setattr(
         config,
         "load_aprs_config",
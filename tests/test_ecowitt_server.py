@@ -0,0 +1,166 @@
+import http.client
+import importlib.util
+import socket
+import threading
+import time
+from pathlib import Path
+import pytest
+
+MODULE_PATH = Path(__file__).resolve().parent.parent / "daemons" / "ecowitt_listener.py"
+
+
+def load_module():
+    spec = importlib.util.spec_from_file_location("ecowitt_listener", MODULE_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def server():
+    mod = load_module()
+    uploads = []
+    mod.log_params = lambda client, params: uploads.append(params)
+    mod.Handler.timeout = 0.5
+    mod.start_pipeline()
+    srv = mod.IngestServer(("127.0.0.1", 0), mod.Handler, max_connections=4)
+    thread = threading.Thread(target=srv.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield mod, srv, uploads
+    finally:
+        srv.shutdown()
+        srv.server_close()
+        thread.join()
+        mod.stop_pipeline()
+
+
+def test_keep_alive_serves_several_uploads(server):
+    mod, srv, uploads = server
+    conn = http.client.HTTPConnection("127.0.0.1", srv.server_address[1], timeout=2)
+    for i in range(3):
+        conn.request(
+            "POST",
+            mod.PATH,
+            body=f"tempf={i}",
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        resp = conn.getresponse()
+        assert resp.status == 200
+        assert resp.read() == b"OK\n"
+    conn.request("GET", mod.PATH + "?tempf=9")
+    assert conn.getresponse().read() == b"OK\n"
+    conn.close()
+    mod.INGEST_QUEUE.join()
+    assert uploads == [{"tempf": "0"}, {"tempf": "1"}, {"tempf": "2"}, {"tempf": "9"}]
+    stats = mod.ingest_stats()
+    assert stats["received"] == stats["processed"] == 4
+    assert stats["depth"] == 0
+
+
+def test_wrong_path_is_404(server):
+    mod, srv, uploads = server
+    conn = http.client.HTTPConnection("127.0.0.1", srv.server_address[1], timeout=2)
+    conn.request("GET", "/nope")
+    assert conn.getresponse().status == 404
+    assert uploads == []
+
+
+def test_stalled_client_does_not_block_others(server):
+    mod, srv, uploads = server
+    stalled = socket.create_connection(srv.server_address)
+    stalled.sendall(b"POST " + mod.PATH.encode() + b" HTTP/1.1\r\nContent-Length: 100\r\n\r\n")
+    try:
+        start = time.monotonic()
+        conn = http.client.HTTPConnection("127.0.0.1", srv.server_address[1], timeout=2)
+        conn.request("GET", mod.PATH + "?tempf=1")
+        assert conn.getresponse().status == 200
+        assert time.monotonic() - start < 0.4
+    finally:
+        stalled.close()
+
+
+def test_idle_connection_times_out(server):
+    mod, srv, uploads = server
+    sock = socket.create_connection(srv.server_address)
+    sock.settimeout(2)
+    # the server closes the idle connection after Handler.timeout
+    assert sock.recv(1) == b""
+    sock.close()
+
+
+def test_oversized_body_rejected(server):
+    mod, srv, uploads = server
+    conn = http.client.HTTPConnection("127.0.0.1", srv.server_address[1], timeout=2)
+    conn.request("POST", mod.PATH, body=b"x" * (mod.MAX_BODY + 1))
+    assert conn.getresponse().status == 413
+    assert uploads == []
+
+
+def test_connection_cap(server):
+    mod, srv, uploads = server
+    held = [socket.create_connection(srv.server_address) for _ in range(4)]
+    try:
+        time.sleep(0.1)
+        extra = socket.create_connection(srv.server_address)
+        extra.settimeout(2)
+        assert extra.recv(64).startswith(b"HTTP/1.1 503")
+        extra.close()
+        assert srv.rejected == 1
+    finally:
+        for sock in held:
+            sock.close()
+
+
+def test_response_does_not_wait_for_transmission(server):
+    mod, srv, uploads = server
+    release = threading.Event()
+
+    def slow_transmit(client, params):
+        release.wait(5)
+        uploads.append(params)
+
+    mod.log_params = slow_transmit
+    try:
+        start = time.monotonic()
+        conn = http.client.HTTPConnection("127.0.0.1", srv.server_address[1], timeout=2)
+        conn.request("GET", mod.PATH + "?tempf=1")
+        assert conn.getresponse().status == 200
+        assert time.monotonic() - start < 1
+        assert uploads == []
+    finally:
+        release.set()
+    mod.INGEST_QUEUE.join()
+    assert uploads == [{"tempf": "1"}]
+    assert mod.ingest_stats()["queue_wait_max"] >= 0
+
+
+def test_stop_does_not_block_on_a_full_queue(server):
+    mod, srv, uploads = server
+    release = threading.Event()
+    mod.log_params = lambda client, params: release.wait(5)
+    for i in range(mod.INGEST_QUEUE.maxsize + 1):
+        mod.INGEST_QUEUE.put(("x", {}, time.monotonic(), None), timeout=2)
+    dropped = mod.ingest_stats()["dropped"]
+    start = time.monotonic()
+    mod.stop_pipeline(timeout=0.2)
+    assert time.monotonic() - start < 1
+    release.set()
+    mod.INGEST_QUEUE.join()
+    assert mod.ingest_stats()["dropped"] == dropped + mod.INGEST_QUEUE.maxsize
+
+
+def test_full_queue_drops_upload(server):
+    mod, srv, uploads = server
+    mod.stop_pipeline()
+    for i in range(mod.INGEST_QUEUE.maxsize):
+        mod.INGEST_QUEUE.put_nowait(("x", {}, 0.0))
+    conn = http.client.HTTPConnection("127.0.0.1", srv.server_address[1], timeout=2)
+    conn.request("GET", mod.PATH + "?tempf=1")
+    resp = conn.getresponse()
+    assert resp.status == 503
+    assert resp.getheader("Retry-After") == "60"
+    assert mod.ingest_stats()["dropped"] == 1
+    while not mod.INGEST_QUEUE.empty():
+        mod.INGEST_QUEUE.get_nowait()
+        mod.INGEST_QUEUE.task_done()
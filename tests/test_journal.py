@@ -0,0 +1,171 @@
+import threading
+
+import pytest
+
+import config
+import journal
+import utils
+import daemons.kiss_client as kc
+
+
+def write(jl, items):
+    for stamp, sink, source, data in items:
+        jl._pending.append((stamp, sink, source, data))
+    jl.flush()
+
+
+def test_records_round_trip(tmp_path):
+    jl = journal.Journal(tmp_path)
+    write(jl, [(100.0, "kiss", "mod.a", b"\x01\x02"), (101.0, "aprsis", "mod.b", b"A>B:x")])
+    records = list(journal.query(tmp_path))
+    assert records == [
+        journal.Record(100.0, "kiss", "mod.a", b"\x01\x02"),
+        journal.Record(101.0, "aprsis", "mod.b", b"A>B:x"),
+    ]
+    assert [r.data for r in journal.query(tmp_path, sinks=["aprsis"])] == [b"A>B:x"]
+    assert jl.stats["records"] == 2 and jl.stats["writes"] == 1
+
+
+def test_query_seeks_through_the_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "INDEX_SPACING", 256)
+    jl = journal.Journal(tmp_path, segment_bytes=4096)
+    for start in range(0, 500, 50):
+        write(jl, [(1000.0 + i, "kiss", "m", b"x" * 40) for i in range(start, start + 50)])
+    paths = journal.segments(tmp_path)
+    assert len(paths) > 1
+    assert all(journal._index_path(p).exists() for p in paths)
+    times = [r.time for r in journal.query(tmp_path, 1200.0, 1210.0)]
+    assert times == [1200.0 + i for i in range(11)]
+
+    read = []
+    real_scan = journal._scan
+
+    def counting_scan(segment, offset):
+        for rec in real_scan(segment, offset):
+            read.append(rec)
+            yield rec
+
+    monkeypatch.setattr(journal, "_scan", counting_scan)
+    list(journal.query(tmp_path, 1200.0, 1210.0))
+    # only the neighbourhood of the range is read, not all 500 records
+    assert len(read) < 60
+
+
+def test_old_segments_are_removed(tmp_path):
+    jl = journal.Journal(tmp_path, segment_bytes=1024, max_bytes=4096)
+    for i in range(20):
+        write(jl, [(1000.0 + i, "kiss", "m", b"x" * 200)])
+    assert sum(p.stat().st_size for p in journal.segments(tmp_path)) <= 4096 + 1024
+    times = [r.time for r in journal.query(tmp_path)]
+    assert times[-1] == 1019.0 and times[0] > 1000.0
+
+
+def test_torn_record_ends_the_scan(tmp_path):
+    jl = journal.Journal(tmp_path)
+    write(jl, [(1.0, "kiss", "m", b"one"), (2.0, "kiss", "m", b"two")])
+    path = journal.segments(tmp_path)[0]
+    with open(path, "r+b") as f:
+        f.truncate(path.stat().st_size - 1)
+    assert [r.data for r in journal.query(tmp_path)] == [b"one"]
+
+
+def test_corrupt_record_fails_its_checksum(tmp_path):
+    jl = journal.Journal(tmp_path)
+    write(jl, [(1.0, "kiss", "m", b"one"), (2.0, "kiss", "m", b"two")])
+    path = journal.segments(tmp_path)[0]
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(bytes(data))
+    assert [r.data for r in journal.query(tmp_path)] == [b"one"]
+
+
+def test_torn_tail_is_cut_off_before_appending(tmp_path):
+    write(journal.Journal(tmp_path), [(1.0, "kiss", "m", b"one"), (2.0, "kiss", "m", b"two")])
+    path = journal.segments(tmp_path)[0]
+    with open(path, "r+b") as f:
+        f.truncate(path.stat().st_size - 1)
+    # a new writer, as after a restart
+    jl = journal.Journal(tmp_path)
+    write(jl, [(3.0, "kiss", "m", b"three")])
+    assert [r.data for r in journal.query(tmp_path)] == [b"one", b"three"]
+    assert jl.stats["repairs"] == 1
+
+
+def test_torn_tail_of_another_writer_is_cut_off(tmp_path):
+    first, second = journal.Journal(tmp_path), journal.Journal(tmp_path)
+    write(first, [(1.0, "kiss", "m", b"one")])
+    write(second, [(2.0, "kiss", "m", b"two")])
+    path = journal.segments(tmp_path)[0]
+    with open(path, "r+b") as f:
+        f.truncate(path.stat().st_size - 1)
+    write(first, [(3.0, "kiss", "m", b"three")])
+    assert [r.data for r in journal.query(tmp_path)] == [b"one", b"three"]
+    # no check needed while nobody else writes
+    write(first, [(4.0, "kiss", "m", b"four")])
+    assert first.stats["repairs"] == 1
+
+
+def test_writer_thread_flushes(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, "FLUSH_INTERVAL", 0.01)
+    jl = journal.Journal(tmp_path)
+    jl.record("kiss", b"frame", "mod")
+    try:
+        done = threading.Event()
+        for _ in range(200):
+            if jl.stats["records"]:
+                break
+            done.wait(0.01)
+        assert [r.data for r in journal.query(tmp_path)] == [b"frame"]
+    finally:
+        jl.close()
+
+
+def test_ax25_to_tnc2():
+    frame = utils.ax25_encoder("APZ001", "N0CALL-13", ["WIDE1-1"]).encode("!test")
+    assert journal.ax25_to_tnc2(frame) == "N0CALL-13>APZ001,WIDE1-1:!test"
+    with pytest.raises(ValueError):
+        journal.ax25_to_tnc2(b"\x00" * 5)
+
+
+def test_parse_time():
+    assert journal.parse_time("1700000000") == 1700000000.0
+    assert journal.parse_time("-2h", now=10000.0) == 2800.0
+    assert journal.parse_time("2024-05-01T12:00:00+00:00") == 1714564800.0
+
+
+def test_cli_lists_range(tmp_path, capsys):
+    jl = journal.Journal(tmp_path)
+    frame = utils.ax25_encoder("APZ001", "N0CALL", []).encode(">hello")
+    write(jl, [(10.0, "kiss", "mod.a", frame), (20.0, "aprsis", "mod.b", b"A>B:late")])
+    journal.main(["--directory", str(tmp_path), "--since", "5", "--until", "15"])
+    out = capsys.readouterr().out.splitlines()
+    assert out == ["1970-01-01T00:00:10.000+00:00 kiss   mod.a N0CALL>APZ001:>hello"]
+
+
+@pytest.fixture
+def enabled(tmp_path, monkeypatch):
+    path = tmp_path / "wx-helios.conf"
+    path.write_text("[JOURNAL]\nenabled = yes\ndirectory = jl\n")
+    monkeypatch.setattr(config, "CONFIG_PATH", path)
+    monkeypatch.setattr(config, "_config", None)
+    for name in ("_journal", "_section", "_settings"):
+        monkeypatch.setattr(journal, name, None)
+    yield tmp_path / "jl"
+    if journal._journal is not None:
+        journal._journal.close()
+
+
+def test_send_via_kiss_records_the_caller(enabled, monkeypatch):
+    items = []
+
+    class DummyQueue:
+        def put(self, frame):
+            items.append(frame)
+
+    monkeypatch.setattr(kc, "FRAME_QUEUE", DummyQueue())
+    monkeypatch.setattr(kc, "ENABLED", True)
+    utils.send_via_kiss(b"\x01\x02")
+    journal.current().flush()
+    assert items == [b"\x01\x02"]
+    [rec] = journal.query(enabled)
+    assert (rec.sink, rec.source, rec.data) == ("kiss", __name__, b"\x01\x02")
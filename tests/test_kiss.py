@@ -12,7 +12,7 @@ import config
 class DummySocket:
     def __init__(self):
         self.sent = b''
-    def send(self, data):
+    def sendall(self, data):
         self.sent += data
     def __enter__(self):
         return self
@@ -36,10 +36,13 @@ def test_kiss_client_connects_to_configured_host_port(monkeypatch):
         def settimeout(self, t):
             pass
 
+        def setsockopt(self, *args):
+            pass
+
         def close(self):
             pass
 
-        def send(self, data):
+        def sendall(self, data):
             pass
 
     def fake_create(addr):
@@ -64,10 +67,13 @@ def test_subprocess_can_queue_frame(monkeypatch):
         def settimeout(self, t):
             pass
 
+        def setsockopt(self, *args):
+            pass
+
         def close(self):
             pass
 
-        def send(self, data):
+        def sendall(self, data):
             sent.append(data)
 
     monkeypatch.setattr(kc.socket, "create_connection", lambda a: DummySocket())
@@ -98,10 +104,13 @@ def test_kiss_client_retries_until_connects(monkeypatch):
         def settimeout(self, t):
             pass
 
+        def setsockopt(self, *args):
+            pass
+
         def close(self):
             pass
 
-        def send(self, data):
+        def sendall(self, data):
             pass
 
     def fake_create(addr):
@@ -111,10 +120,133 @@ def test_kiss_client_retries_until_connects(monkeypatch):
         return DummySocket()
 
     monkeypatch.setattr(kc.socket, "create_connection", fake_create)
-    monkeypatch.setattr(kc.time, "sleep", lambda t: None)
+    monkeypatch.setattr(kc, "_backoff", lambda attempt: 0)
     kc.FRAME_QUEUE = kc.queue.Queue()
     kc.FRAME_QUEUE.put(None)
     kc._stop.clear()
     kc._run()
 
     assert len(attempts) >= 3
+
+
+class ShortWriteSocket:
+    """Socket accepting at most ``limit`` bytes per ``sendmsg`` call."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.data = b""
+        self.calls = 0
+        self.options = []
+
+    def settimeout(self, t):
+        pass
+
+    def setsockopt(self, *args):
+        self.options.append(args)
+
+    def close(self):
+        pass
+
+    def sendmsg(self, buffers):
+        self.calls += 1
+        chunk = b"".join(bytes(b) for b in buffers)[: self.limit]
+        self.data += chunk
+        return len(chunk)
+
+
+def test_send_all_resumes_after_short_writes():
+    sock = ShortWriteSocket(limit=5)
+    buffers = [b"\xC0\x00ABC\xC0", b"\xC0\x00DEFGH\xC0", b"\xC0\x00I\xC0"]
+    pending = list(buffers)
+    calls = kc._send_all(sock, pending)
+    assert pending == []
+    assert sock.data == b"".join(buffers)
+    assert calls == sock.calls == 4
+
+
+def test_burst_is_coalesced_into_one_write(monkeypatch):
+    sock = ShortWriteSocket(limit=1 << 20)
+    monkeypatch.setattr(kc.socket, "create_connection", lambda a: sock)
+    monkeypatch.setattr(kc, "stats", dict.fromkeys(kc.stats, 0))
+    kc.FRAME_QUEUE = kc.queue.Queue()
+    frames = [bytes([i]) * 20 for i in range(10)]
+    for frame in frames:
+        kc.FRAME_QUEUE.put(frame)
+    kc.FRAME_QUEUE.put(None)
+    kc._stop.clear()
+    kc._run()
+
+    assert sock.data == b"".join(kc.kiss.encode(f) for f in frames)
+    assert (kc.socket.IPPROTO_TCP, kc.socket.TCP_NODELAY, 1) in sock.options
+    stats = kc.write_stats()
+    assert (stats["frames"], stats["writes"], stats["syscalls"]) == (10, 1, 1)
+    assert stats["bytes_per_write"] == len(sock.data)
+    assert stats["syscalls_per_frame"] == 0.1
+
+
+def test_backoff_grows_with_jitter_and_caps(monkeypatch):
+    monkeypatch.setattr(kc.random, "uniform", lambda a, b: (a, b))
+    assert kc._backoff(0) == (0.1, 0.2)
+    assert kc._backoff(3) == (0.8, 1.6)
+    assert kc._backoff(20) == (kc.BACKOFF_MAX / 2, kc.BACKOFF_MAX)
+
+
+class DroppingSocket(ShortWriteSocket):
+    """Socket whose connection drops after ``limit`` bytes."""
+
+    def sendmsg(self, buffers):
+        if len(self.data) >= self.limit:
+            raise ConnectionResetError("peer went away")
+        return super().sendmsg(buffers)
+
+
+def test_frames_survive_a_dropped_connection(monkeypatch):
+    first = DroppingSocket(limit=8)
+    second = ShortWriteSocket(limit=1 << 20)
+    sockets = [first, second]
+    monkeypatch.setattr(kc.socket, "create_connection", lambda a: sockets.pop(0))
+    monkeypatch.setattr(kc, "_backoff", lambda attempt: 0)
+    monkeypatch.setattr(kc, "stats", dict.fromkeys(kc.stats, 0))
+    kc.FRAME_QUEUE = kc.queue.Queue()
+    frames = [b"AAAA", b"BBBB", b"CCCC"]
+    for frame in frames:
+        kc.FRAME_QUEUE.put(frame)
+    kc.FRAME_QUEUE.put(None)
+    kc._stop.clear()
+    kc._reconnect.clear()
+    kc._run()
+
+    encoded = [kc.kiss.encode(f) for f in frames]
+    # the first frame got through; the cut-off second one is resent whole
+    assert first.data == encoded[0] + encoded[1][:1]
+    assert second.data == encoded[1] + encoded[2]
+    status = kc.status()
+    assert status["state"] == "stopped" and not status["ready"]
+    assert (status["connects"], status["reconnects"]) == (2, 1)
+
+
+def test_wait_ready_reports_link(monkeypatch):
+    release = kc.threading.Event()
+
+    def slow_create(addr):
+        if not release.wait(2):
+            raise OSError("never released")
+        return ShortWriteSocket(limit=1 << 20)
+
+    monkeypatch.setattr(kc.socket, "create_connection", slow_create)
+    kc.FRAME_QUEUE = kc.queue.Queue()
+    kc._stop.clear()
+    kc._reconnect.clear()
+    thread = kc.threading.Thread(target=kc._run, daemon=True)
+    monkeypatch.setattr(kc, "_thread", thread)
+    thread.start()
+    try:
+        assert not kc.wait_ready(0.05)
+        assert kc.status()["state"] == "connecting"
+        release.set()
+        assert kc.wait_ready(2)
+        assert kc.is_ready()
+    finally:
+        kc.FRAME_QUEUE.put(None)
+        thread.join(2)
+    assert not kc.is_ready()
@@ -0,0 +1,84 @@
+import random
+import pytest
+
+import kiss
+
+
+def legacy_escape(ax25_frame):
+    escaped = bytearray()
+    for b in ax25_frame:
+        if b == 0xC0:
+            escaped += b"\xDB\xDC"
+        elif b == 0xDB:
+            escaped += b"\xDB\xDD"
+        else:
+            escaped.append(b)
+    return b"\xC0\x00" + bytes(escaped) + b"\xC0"
+
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"\x01\x02\x03",
+    b"\xC0",
+    b"\xDB",
+    b"\xDB\xDC",
+    b"\xDB\xDD\xC0\xC0\xDB",
+])
+def test_encode_matches_legacy(data):
+    assert kiss.encode(data) == legacy_escape(data)
+
+
+def test_encode_random_matches_legacy():
+    rnd = random.Random(1)
+    for _ in range(200):
+        data = bytes(rnd.choice(b"\xC0\xDB\xDC\xDD\x00A") for _ in range(rnd.randint(0, 64)))
+        assert kiss.encode(data) == legacy_escape(data)
+
+
+def test_encode_port_and_command():
+    assert kiss.encode(b"A", port=1) == b"\xC0\x10A\xC0"
+    assert kiss.encode(b"\x32", command=kiss.CMD_TXDELAY) == b"\xC0\x01\x32\xC0"
+    # port 12 data frames have a type byte equal to FEND
+    assert kiss.encode(b"A", port=12) == b"\xC0\xDB\xDCA\xC0"
+    with pytest.raises(ValueError):
+        kiss.encode(b"A", port=16)
+
+
+def test_unescape_round_trip():
+    rnd = random.Random(2)
+    for _ in range(200):
+        data = bytes(rnd.choice(b"\xC0\xDB\xDC\xDD\x00") for _ in range(rnd.randint(0, 32)))
+        assert kiss.unescape(kiss.escape(data)) == data
+
+
+def test_decoder_arbitrary_chunks():
+    rnd = random.Random(3)
+    frames = [
+        bytes(rnd.choice(b"\xC0\xDB\xDC\xDDxyz") for _ in range(rnd.randint(1, 40)))
+        for _ in range(50)
+    ]
+    stream = b"".join(kiss.encode(f, port=i % 3) for i, f in enumerate(frames))
+    decoder = kiss.Decoder()
+    out = []
+    pos = 0
+    while pos < len(stream):
+        step = rnd.randint(1, 17)
+        out.extend(decoder.feed(stream[pos:pos + step]))
+        pos += step
+    assert [f.data for f in out] == frames
+    assert [f.port for f in out] == [i % 3 for i in range(len(frames))]
+    assert all(f.command == kiss.CMD_DATA for f in out)
+    assert decoder.pending == 0
+
+
+def test_decoder_discards_data_before_first_fend():
+    decoder = kiss.Decoder()
+    assert decoder.feed(b"garbage") == []
+    assert decoder.feed(b"more\xC0\x00AB\xC0") == [kiss.KissFrame(0, 0, b"AB")]
+
+
+def test_decoder_keeps_partial_frame():
+    decoder = kiss.Decoder()
+    assert decoder.feed(b"\xC0\x00AB") == []
+    assert decoder.pending == 3
+    assert decoder.feed(b"C\xC0\xC0") == [kiss.KissFrame(0, 0, b"ABC")]
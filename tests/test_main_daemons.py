@@ -5,6 +5,7 @@ import pytest
 import types
 import main
 import config
+import scheduler
 
 
 def test_start_daemon_modules_loads(monkeypatch):
@@ -72,11 +73,24 @@ def test_main_start_and_shutdown(monkeypatch):
         return val
 
     monkeypatch.setattr(main.time, "time", fake_time)
-    monkeypatch.setattr(main, "run_telemetry_module", lambda name: (_ for _ in ()).throw(KeyboardInterrupt()))
+    class FakePool:
+        def __init__(self, workers):
+            pass
+
+        def submit(self, name, deadline, due=None):
+            raise KeyboardInterrupt()
+
+        def shutdown(self):
+            pass
+
+        def report(self):
+            pass
+
+    monkeypatch.setattr(main, "TelemetryPool", FakePool)
     monkeypatch.setattr(config, "load_telemetry_modules", lambda: ["dummy"])
     monkeypatch.setattr(config, "load_telemetry_schedules", lambda: {})
     monkeypatch.setattr(main.signal, "signal", lambda *a, **k: None)
-    monkeypatch.setattr(main.time, "sleep", lambda t: None)
+    monkeypatch.setattr(scheduler.Scheduler, "_wait", lambda self, t: None)
     monkeypatch.setattr(logging, "basicConfig", lambda **k: None)
     monkeypatch.setattr(config, "load_rig_config", lambda: {"enabled": True})
     monkeypatch.setattr(config, "load_direwolf_config", lambda: {"enabled": True})
@@ -93,3 +107,21 @@ def test_main_start_and_shutdown(monkeypatch):
     for p in procs:
         assert p.terminated == 1
         assert p.waited == 1
+
+
+def test_wait_for_daemons_reports_readiness(monkeypatch):
+    waited = []
+
+    def ready(timeout):
+        waited.append(timeout)
+        return True
+
+    monkeypatch.setattr(main, "_daemons", {"up": None, "down": None, "plain": None})
+    monkeypatch.setitem(sys.modules, "up", types.SimpleNamespace(wait_ready=ready))
+    monkeypatch.setitem(
+        sys.modules, "down", types.SimpleNamespace(wait_ready=lambda timeout: False)
+    )
+    monkeypatch.setitem(sys.modules, "plain", types.SimpleNamespace())
+
+    assert main.wait_for_daemons(5) == {"up": True, "down": False}
+    assert 0 < waited[0] <= 5
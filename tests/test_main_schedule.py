@@ -5,16 +5,9 @@ import pytest
 
 import main
 import config
+import scheduler
 
-# croniter versions < 1.4 trigger DeprecationWarnings on Python 3.12 when
-# using ``datetime.utcfromtimestamp`` internally. Silence these warnings for
-# this test using PyTest's ``filterwarnings`` mark so the rule is applied
-# even when PyTest resets the warnings filters.
-CRON_DEPRECATION_FILTER = (
-    "ignore:.*utcfromtimestamp.*:DeprecationWarning:croniter.*"
-)
 
-@pytest.mark.filterwarnings(CRON_DEPRECATION_FILTER)
 def test_scheduler_runs_at_cron_times(monkeypatch):
     calls = []
     current = 0
@@ -22,17 +15,27 @@ def test_scheduler_runs_at_cron_times(monkeypatch):
     def fake_time():
         return current
 
-    def fake_sleep(t):
+    def fake_wait(self, timeout):
         nonlocal current
-        current += t
+        current += timeout
 
-    def fake_run(name):
-        calls.append((name, current))
-        if len(calls) >= 3:
-            raise KeyboardInterrupt()
+    class FakePool:
+        def __init__(self, workers):
+            pass
+
+        def submit(self, name, deadline, due=None):
+            calls.append((name, current))
+            if len(calls) >= 3:
+                raise KeyboardInterrupt()
+
+        def shutdown(self):
+            pass
+
+        def report(self):
+            pass
 
     monkeypatch.setattr(main.time, "time", fake_time)
-    monkeypatch.setattr(main.time, "sleep", fake_sleep)
+    monkeypatch.setattr(scheduler.Scheduler, "_wait", fake_wait)
     monkeypatch.setattr(main.signal, "signal", lambda *a, **k: None)
     monkeypatch.setattr(logging, "basicConfig", lambda **k: None)
     monkeypatch.setattr(main, "start_direwolf", lambda: None)
@@ -46,7 +49,7 @@ def test_scheduler_runs_at_cron_times(monkeypatch):
         "load_telemetry_schedules",
         lambda: {"m1": "*/2 * * * *", "m2": "*/5 * * * *"},
     )
-    monkeypatch.setattr(main, "run_telemetry_module", fake_run)
+    monkeypatch.setattr(main, "TelemetryPool", FakePool)
 
     argv = ["main.py", "--rig-id", "1", "--usb-num", "0", "--telemetry-interval", "60"]
     monkeypatch.setattr(sys, "argv", argv)
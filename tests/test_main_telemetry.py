@@ -0,0 +1,151 @@
+import sys
+import threading
+import time
+import types
+import main
+import config
+
+
+def _fake_module(monkeypatch, name, body):
+    module = types.ModuleType(name)
+    module.main = body
+    monkeypatch.setitem(sys.modules, name, module)
+    return module
+
+
+def test_in_process_calls_main_with_empty_argv(monkeypatch):
+    calls = []
+    _fake_module(monkeypatch, "fake_tele", lambda argv: calls.append(argv))
+    monkeypatch.setattr(config, "load_telemetry_isolated", lambda: [])
+
+    def fail(*a, **k):
+        raise AssertionError("subprocess should not be used")
+
+    monkeypatch.setattr(main.subprocess, "run", fail)
+
+    assert main.run_telemetry_module("fake_tele") == 0
+    assert main.run_telemetry_module("fake_tele") == 0
+    assert calls == [[], []]
+
+
+def test_in_process_system_exit_code(monkeypatch):
+    def exit_with(argv):
+        sys.exit(3)
+
+    _fake_module(monkeypatch, "fake_exit", exit_with)
+    monkeypatch.setattr(config, "load_telemetry_isolated", lambda: [])
+    assert main.run_telemetry_module("fake_exit") == 3
+
+
+def test_in_process_failure_is_logged(monkeypatch):
+    def boom(argv):
+        raise RuntimeError("boom")
+
+    _fake_module(monkeypatch, "fake_boom", boom)
+    monkeypatch.setattr(config, "load_telemetry_isolated", lambda: [])
+    assert main.run_telemetry_module("fake_boom") is None
+
+
+def test_isolated_module_uses_subprocess(monkeypatch):
+    captured = {}
+
+    class Result:
+        returncode = 0
+        stdout = ""
+        stderr = ""
+
+    def fake_run(cmd, **kwargs):
+        captured["cmd"] = cmd
+        captured["env"] = kwargs["env"]
+        return Result()
+
+    monkeypatch.setattr(config, "load_telemetry_isolated", lambda: ["iso.mod"])
+    monkeypatch.setattr(main.subprocess, "run", fake_run)
+
+    assert main.run_telemetry_module("iso.mod") == 0
+    assert captured["cmd"] == [sys.executable, "-m", "iso.mod"]
+    assert captured["env"][config.ENV_VAR] == config.export()
+
+
+def test_pool_skips_module_still_in_flight(monkeypatch):
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow_run(name, timeout=None):
+        started.set()
+        release.wait(5)
+        return 0
+
+    monkeypatch.setattr(main, "run_telemetry_module", slow_run)
+    pool = main.TelemetryPool(2)
+    try:
+        assert pool.submit("slow", 5)
+        assert started.wait(5)
+        assert not pool.submit("slow", 5)
+        assert pool.stats["slow"]["skipped"] == 1
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_pool_runs_modules_concurrently(monkeypatch):
+    barrier = threading.Barrier(2, timeout=5)
+    done = []
+
+    def run(name, timeout=None):
+        barrier.wait()
+        done.append(name)
+        return 0
+
+    monkeypatch.setattr(main, "run_telemetry_module", run)
+    pool = main.TelemetryPool(2)
+    try:
+        pool.submit("a", 5)
+        pool.submit("b", 5)
+        deadline = time.monotonic() + 5
+        while len(done) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        pool.shutdown()
+    assert sorted(done) == ["a", "b"]
+
+
+def test_pool_counts_overrun_and_late(monkeypatch):
+    release = threading.Event()
+
+    def hung(name, timeout=None):
+        release.wait(5)
+        return 0
+
+    monkeypatch.setattr(main, "run_telemetry_module", hung)
+    pool = main.TelemetryPool(1)
+    try:
+        pool.submit("hung", 0.05, due=time.time() - 10)
+        deadline = time.monotonic() + 5
+        while not pool.stats["hung"]["runs"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert pool.stats["hung"]["overruns"] == 1
+        assert pool.stats["hung"]["late"] == 1
+        # the abandoned run still blocks new runs of the same module
+        assert not pool.submit("hung", 0.05)
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_isolated_module_gets_timeout(monkeypatch):
+    captured = {}
+
+    class Result:
+        returncode = 0
+        stdout = ""
+        stderr = ""
+
+    def fake_run(cmd, **kwargs):
+        captured.update(kwargs)
+        return Result()
+
+    monkeypatch.setattr(config, "load_telemetry_isolated", lambda: ["iso.mod"])
+    monkeypatch.setattr(main.subprocess, "run", fake_run)
+    main.run_telemetry_module("iso.mod", timeout=7)
+    assert captured["timeout"] == 7
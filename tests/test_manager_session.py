@@ -0,0 +1,115 @@
+import os
+import queue
+from multiprocessing.managers import SyncManager
+import pytest
+
+import utils
+
+
+class _ServerManager(SyncManager):
+    pass
+
+
+@pytest.fixture
+def frame_manager(monkeypatch):
+    frames = queue.Queue()
+    _ServerManager.register(
+        "get_frame_queue", callable=lambda: frames, exposed=utils._QUEUE_METHODS
+    )
+    authkey = os.urandom(16)
+    mgr = _ServerManager(address=("127.0.0.1", 0), authkey=authkey)
+    mgr.start()
+    host, port = mgr.address
+    monkeypatch.setenv("TEST_MANAGER_HOST", host)
+    monkeypatch.setenv("TEST_MANAGER_PORT", str(port))
+    monkeypatch.setenv("TEST_MANAGER_AUTHKEY", authkey.hex())
+    proxy_mgr = _ServerManager(address=(host, port), authkey=authkey)
+    proxy_mgr.connect()
+    try:
+        yield proxy_mgr.get_frame_queue()
+    finally:
+        mgr.shutdown()
+
+
+def test_session_reuses_connection(frame_manager):
+    session = utils.ManagerSession("TEST")
+    assert session.put(b"one")
+    assert session.put(b"two")
+    assert session.stats["connects"] == 1
+    assert session.stats["puts"] == 2
+    assert session.stats["put_time"] > 0
+    assert [frame_manager.get(timeout=1), frame_manager.get(timeout=1)] == [
+        b"one",
+        b"two",
+    ]
+
+
+def test_session_does_not_repeat_a_failed_put(frame_manager):
+    session = utils.ManagerSession("TEST")
+    assert session.put(b"one")
+    attempts = []
+
+    class Broken:
+        def put(self, item):
+            attempts.append(item)
+            raise EOFError
+
+    session._queue = Broken()
+    # the item may have been delivered, so it is not sent another way
+    assert session.put(b"two")
+    assert attempts == [b"two"]
+    assert session.stats["put_failures"] == 1
+    assert session.stats["connects"] == 1
+    assert session.put(b"three")
+    assert session.stats["connects"] == 2
+    assert frame_manager.get(timeout=1) == b"one"
+    assert frame_manager.get(timeout=1) == b"three"
+
+
+def test_session_without_manager(monkeypatch):
+    for key in ("HOST", "PORT", "AUTHKEY"):
+        monkeypatch.delenv(f"NONE_MANAGER_{key}", raising=False)
+    session = utils.ManagerSession("NONE")
+    assert not session.put(b"x")
+    assert session.stats["connects"] == 0
+
+
+def test_session_connect_failure(monkeypatch):
+    monkeypatch.setenv("DEAD_MANAGER_HOST", "127.0.0.1")
+    monkeypatch.setenv("DEAD_MANAGER_PORT", "1")
+    monkeypatch.setenv("DEAD_MANAGER_AUTHKEY", "00")
+    session = utils.ManagerSession("DEAD")
+    assert not session.put(b"x")
+    assert session.stats["connect_failures"] == 1
+
+
+def test_session_backs_off_while_manager_is_down(monkeypatch):
+    monkeypatch.setenv("DEAD_MANAGER_HOST", "127.0.0.1")
+    monkeypatch.setenv("DEAD_MANAGER_PORT", "1")
+    monkeypatch.setenv("DEAD_MANAGER_AUTHKEY", "00")
+    errors = []
+    monkeypatch.setattr(utils, "log_error", lambda *a, **k: errors.append(a))
+    now = [1000.0]
+    monkeypatch.setattr(utils.time, "monotonic", lambda: now[0])
+    session = utils.ManagerSession("DEAD")
+
+    assert not session.put(b"x")
+    assert not session.put(b"x")
+    assert session.stats["connect_failures"] == 1
+    assert session.stats["skipped"] == 1
+    now[0] += session.BACKOFF_INITIAL
+    assert not session.put(b"x")
+    now[0] += session.BACKOFF_INITIAL
+    assert not session.put(b"x")
+    assert session.stats["connect_failures"] == 2
+    assert len(errors) == 1
+
+    # a new address is tried at once
+    monkeypatch.setenv("DEAD_MANAGER_PORT", "2")
+    assert not session.put(b"x")
+    assert session.stats["connect_failures"] == 3
+
+
+def test_manager_session_is_shared():
+    assert utils.manager_session("KISS") is utils.manager_session("KISS")
+    assert "KISS" in utils.transport_stats()
@@ -0,0 +1,134 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+import config
+import main
+import metrics
+import daemons.aprsis_client as ac
+import daemons.kiss_client as kc
+import daemons.metrics_exporter as exporter
+from tests.test_ecowitt import load_module
+from tests.test_main_telemetry import _fake_module
+from tests.test_startup import _free_port
+
+
+def test_render_text_format():
+    registry = metrics.Registry()
+    runs = registry._get(metrics.Counter, "runs_total", "Runs", ("module",))
+    runs.labels("a").inc()
+    runs.labels('b"c').inc(2)
+    registry._get(metrics.Gauge, "depth", "Depth", ()).set(3)
+    assert registry.render().splitlines() == [
+        "# HELP depth Depth",
+        "# TYPE depth gauge",
+        "depth 3",
+        "# HELP runs_total Runs",
+        "# TYPE runs_total counter",
+        'runs_total{module="a"} 1',
+        'runs_total{module="b\\"c"} 2',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    h = metrics.Histogram("t_seconds", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        h.observe(value)
+    assert h.count == 4
+    assert list(h.samples()) == [
+        ("_bucket", (("le", "0.1"),), 2),
+        ("_bucket", (("le", "1.0"),), 3),
+        ("_bucket", (("le", "+Inf"),), 4),
+        ("_sum", (), 5.65),
+        ("_count", (), 4),
+    ]
+
+
+def test_same_name_returns_the_metric():
+    registry = metrics.Registry()
+    first = registry._get(metrics.Counter, "x_total", "", ())
+    assert registry._get(metrics.Counter, "x_total", "", ()) is first
+    with pytest.raises(ValueError):
+        registry._get(metrics.Gauge, "x_total", "", ())
+    with pytest.raises(ValueError):
+        registry._get(metrics.Counter, "y_total", "", ("a",)).labels("1", "2")
+
+
+def test_collectors_run_at_render():
+    registry = metrics.Registry()
+    stats = {"frames": 0, "send_time_max": 0.0}
+    registry.register_collector(
+        "mod", lambda: metrics.stats_families("wx_x", stats, "X", ("send_time_max",))
+    )
+    registry.register_collector("broken", lambda: 1 / 0)
+    stats["frames"] = 7
+    text = registry.render()
+    assert "# TYPE wx_x_frames_total counter\nwx_x_frames_total 7\n" in text
+    assert "# TYPE wx_x_send_time_max gauge\nwx_x_send_time_max 0.0\n" in text
+    assert "# collector broken failed: division by zero" in text
+    registry.unregister_collector("broken")
+    assert "broken" not in registry.render()
+
+
+def test_daemons_export_stats(monkeypatch):
+    monkeypatch.setitem(kc.stats, "frames", 5)
+    monkeypatch.setattr(kc, "state", "connected")
+    monkeypatch.setitem(ac.stats, "send_time", 0.5)
+    text = metrics.render()
+    assert "\nwx_kiss_frames_total 5\n" in text
+    assert "\nwx_kiss_connected 1\n" in text
+    assert "\nwx_aprsis_send_seconds_total 0.5\n" in text
+    assert "# TYPE wx_aprsis_send_seconds_max gauge\n" in text
+    assert "wx_aprsis_send_time" not in text
+
+
+def test_ecowitt_skips_and_conversion_time(monkeypatch):
+    mod = load_module()
+    sent = []
+    monkeypatch.setattr(mod.utils, "send_via_kiss", sent.append)
+    monkeypatch.setattr(mod, "APRS_IS_CFG", {"enabled": False})
+    params = {
+        "winddir": "0",
+        "windspeedmph": "0",
+        "windgustmph": "0",
+        "tempf": "50",
+        "humidity": "50",
+        "baromrelin": "30",
+    }
+    skipped, converted = mod.SKIPPED.value, mod.CONVERT_TIME.count
+    mod.log_params("client", params)
+    mod.log_params("client", params)
+    assert len(sent) == 1
+    assert mod.SKIPPED.value == skipped + 1
+    assert mod.CONVERT_TIME.count == converted + 1
+
+
+def test_telemetry_runs_are_timed(monkeypatch):
+    _fake_module(monkeypatch, "fake_timed", lambda argv: None)
+    monkeypatch.setattr(config, "load_telemetry_isolated", lambda: [])
+    assert main.run_telemetry_module("fake_timed") == 0
+    assert main.TELEMETRY_TIME.labels("fake_timed").count == 1
+    assert main.TELEMETRY_RUNS.labels("fake_timed", "0").value == 1
+    assert main.run_telemetry_module("missing.telemetry") is None
+    assert main.TELEMETRY_RUNS.labels("missing.telemetry", "none").value == 1
+
+
+def test_exporter_serves_metrics(monkeypatch):
+    monkeypatch.setattr(exporter, "ENABLED", True)
+    monkeypatch.setattr(exporter, "PORT", _free_port())
+    server, thread = exporter.start()
+    try:
+        assert exporter._on_reload in config._subscribers
+        host, port = exporter.address()
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as r:
+            assert r.headers["Content-Type"] == exporter.CONTENT_TYPE
+            assert b"# TYPE wx_kiss_frames_total counter" in r.read()
+        with pytest.raises(urllib.error.HTTPError) as err:
+            urllib.request.urlopen(f"http://{host}:{port}/", timeout=5)
+        assert err.value.code == 404
+    finally:
+        server.shutdown()
+    assert not thread.is_alive()
+    assert exporter.address() is None
+    assert exporter._on_reload not in config._subscribers
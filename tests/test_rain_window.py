@@ -0,0 +1,102 @@
+import random
+from collections import deque
+from datetime import datetime, timedelta
+
+import pytest
+
+from tests.test_ecowitt import load_module
+
+
+def legacy_rain(cache, post):
+    """The deque implementation ``RainWindow`` replaced.
+
+    The cutoff is 23 hours rather than the original 24: after a gap the old
+    code could count the reading from 24 hours earlier as well, giving a 25
+    hour total.
+    """
+    hour = datetime.strptime(post["dateutc"], "%Y-%m-%d %H:%M:%S").replace(minute=0, second=0)
+    hourly = float(post["hourlyrainin"])
+    if cache and cache[-1][0] == hour:
+        cache[-1] = (hour, hourly)
+    else:
+        cache.append((hour, hourly))
+    cutoff = hour - timedelta(hours=23)
+    while cache and cache[0][0] < cutoff:
+        cache.popleft()
+    return int(round(sum(r for _, r in cache) * 100))
+
+
+def model_rain(readings, hour):
+    """Sum of the latest reading per hour in the 24 hours ending at ``hour``."""
+    return sum(v for h, v in readings.items() if hour - 23 <= h <= hour)
+
+
+def _post(ts, amount):
+    return {"dateutc": ts.strftime("%Y-%m-%d %H:%M:%S"), "hourlyrainin": f"{amount:.2f}"}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_legacy_on_monotonic_uploads(seed):
+    rng = random.Random(seed)
+    mod = load_module()
+    cache = deque(maxlen=24)
+    ts = datetime(2023, 12, 31, 20, 0, 0)
+    for _ in range(3000):
+        step = rng.choice([60, 60, 300, 900, 3600, 4 * 3600, 30 * 3600])
+        ts += timedelta(seconds=step)
+        post = _post(ts, rng.randrange(0, 120) / 100)
+        assert mod.update_rain_24h(post) == legacy_rain(cache, post)
+        assert len(mod.RAIN_CACHE) == len(cache)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_out_of_order_uploads(seed):
+    rng = random.Random(seed)
+    mod = load_module()
+    readings = {}
+    newest = None
+    base = datetime(2024, 2, 28, 0, 0, 0)
+    hour0 = mod.dateutc_hour(base.strftime("%Y-%m-%d %H:%M:%S"))
+    offset = 0
+    for _ in range(2000):
+        offset = max(0, offset + rng.randint(-30, 6))
+        ts = base + timedelta(hours=offset, minutes=rng.randrange(60))
+        cents = rng.randrange(0, 80)
+        hour = hour0 + offset
+        if newest is None or hour > newest - 24:
+            readings[hour] = cents
+        newest = hour if newest is None else max(newest, hour)
+        assert mod.update_rain_24h(_post(ts, cents / 100)) == model_rain(readings, newest)
+
+
+def test_gap_longer_than_window_resets():
+    mod = load_module()
+    mod.RAIN_CACHE.clear()
+    assert mod.update_rain_24h({"dateutc": "2020-01-01 00:00:00", "hourlyrainin": "0.50"}) == 50
+    assert mod.update_rain_24h({"dateutc": "2020-01-01 23:59:59", "hourlyrainin": "0.10"}) == 60
+    assert mod.update_rain_24h({"dateutc": "2020-01-02 00:00:00", "hourlyrainin": "0.01"}) == 11
+    assert mod.update_rain_24h({"dateutc": "2020-01-05 00:00:00", "hourlyrainin": "0.02"}) == 2
+    assert len(mod.RAIN_CACHE) == 1
+
+
+def test_dateutc_hour_matches_strptime():
+    mod = load_module()
+    epoch = mod.dateutc_hour("1970-01-01 00:00:00")
+    ts = datetime(2024, 2, 29, 13, 45, 10)
+    expected = int((ts - datetime(1970, 1, 1)).total_seconds() // 3600)
+    assert mod.dateutc_hour("2024-02-29 13:45:10") - epoch == expected
+
+
+@pytest.mark.parametrize("text", [
+    "2023-02-29 00:00:00",
+    "2023-13-01 00:00:00",
+    "2023-01-01 24:00:00",
+    "2023-01-01 -1:00:00",
+    "2023-01-01T00:00:00",
+    "2023-01-01 00:00",
+    "now",
+])
+def test_dateutc_hour_rejects_bad_input(text):
+    mod = load_module()
+    with pytest.raises(ValueError):
+        mod.dateutc_hour(text)
@@ -0,0 +1,153 @@
+import threading
+import time
+
+import scheduler
+
+
+class FakeClock:
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+
+def run_until(sched, clock, calls, count):
+    """Drive ``sched`` with a fake clock until ``count`` calls were made."""
+
+    def fake_wait(timeout):
+        if len(calls) >= count or timeout is None:
+            sched.stop()
+            return
+        clock.now += timeout
+
+    sched._wait = fake_wait
+    sched.run()
+
+
+def test_interval_jobs_run_in_due_order():
+    clock = FakeClock()
+    sched = scheduler.Scheduler(clock)
+    calls = []
+    sched.add_interval("a", 10, lambda due: calls.append(("a", due)))
+    sched.add_interval("b", 15, lambda due: calls.append(("b", due)))
+    run_until(sched, clock, calls, 5)
+    assert calls == [("a", 10), ("b", 15), ("a", 20), ("b", 30), ("a", 30)]
+
+
+def test_cron_and_interval_share_one_heap():
+    clock = FakeClock()
+    sched = scheduler.Scheduler(clock)
+    calls = []
+    sched.add_cron("cron", "*/2 * * * *", lambda due: calls.append(("cron", due)))
+    sched.add_interval("int", 90, lambda due: calls.append(("int", due)))
+    run_until(sched, clock, calls, 4)
+    assert calls == [("int", 90), ("cron", 120), ("int", 180), ("cron", 240)]
+
+
+def test_cancelled_job_does_not_run():
+    clock = FakeClock()
+    sched = scheduler.Scheduler(clock)
+    calls = []
+    job = sched.add_interval("a", 10, lambda due: calls.append("a"))
+    sched.add_interval("b", 25, lambda due: calls.append("b"))
+    sched.cancel(job)
+    run_until(sched, clock, calls, 1)
+    assert calls == ["b"]
+    assert [j.name for j in sched.jobs()] == ["b"]
+
+
+def test_one_shot_job_runs_once():
+    clock = FakeClock()
+    sched = scheduler.Scheduler(clock)
+    calls = []
+    sched.add_once("once", lambda due: calls.append(("once", due)), delay=5)
+    sched.add_interval("int", 10, lambda due: calls.append(("int", due)))
+    run_until(sched, clock, calls, 3)
+    assert calls == [("once", 5), ("int", 10), ("int", 20)]
+    assert [j.name for j in sched.jobs()] == ["int"]
+
+
+def test_failing_job_keeps_scheduler_running():
+    clock = FakeClock()
+    sched = scheduler.Scheduler(clock)
+    calls = []
+
+    def boom(due):
+        calls.append("boom")
+        raise RuntimeError("boom")
+
+    sched.add_interval("boom", 10, boom)
+    run_until(sched, clock, calls, 2)
+    assert calls == ["boom", "boom"]
+
+
+def test_stop_wakes_sleeping_scheduler():
+    sched = scheduler.Scheduler()
+    sched.add_interval("never", 3600, lambda due: None)
+    thread = sched.start()
+    time.sleep(0.05)
+    started = time.monotonic()
+    sched.stop()
+    thread.join(2)
+    assert not thread.is_alive()
+    assert time.monotonic() - started < 0.5
+
+
+def test_stop_between_the_check_and_the_wait_is_not_missed():
+    sched = scheduler.Scheduler()
+    sched.add_interval("never", 3600, lambda due: None)
+    now = sched.now
+
+    def signalled_now():
+        # a signal handler calling stop() after the loop checked the flag
+        sched.stop()
+        return now()
+
+    sched.now = signalled_now
+    thread = sched.start()
+    thread.join(2)
+    assert not thread.is_alive()
+
+
+def test_new_job_wakes_sleeping_scheduler():
+    sched = scheduler.Scheduler()
+    sched.add_interval("never", 3600, lambda due: None)
+    fired = threading.Event()
+    thread = sched.start()
+    try:
+        time.sleep(0.05)
+        sched.add_interval("soon", 0.05, lambda due: fired.set())
+        assert fired.wait(1)
+    finally:
+        sched.stop()
+        thread.join(2)
+
+
+def test_background_scheduler_is_shared():
+    first = scheduler.background()
+    assert scheduler.background() is first
+    fired = threading.Event()
+    job = first.add_interval("bg", 0.01, lambda due: fired.set())
+    try:
+        assert fired.wait(1)
+    finally:
+        first.cancel(job)
+
+
+def test_cron_job_skips_missed_fire_times():
+    clock = FakeClock()
+    sched = scheduler.Scheduler(clock)
+    calls = []
+    sched.add_cron("cron", "* * * * *", lambda due: calls.append(due))
+
+    def slow_wait(timeout):
+        if len(calls) >= 2:
+            sched.stop()
+            return
+        # oversleep by several minutes
+        clock.now += timeout + 300
+
+    sched._wait = slow_wait
+    sched.run()
+    assert calls == [60, 420]
@@ -0,0 +1,238 @@
+import os
+import threading
+import time
+
+import pytest
+
+import config
+import spool
+import daemons.aprsis_client as ac
+import daemons.kiss_client as kc
+import kiss
+from tests.test_aprsis_client import FakeAprsIs, client, wait_for  # noqa: F401
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    settings = {
+        "enabled": True,
+        "directory": str(tmp_path / "spool"),
+        "max_bytes": 10 << 20,
+        "max_age": None,
+    }
+    monkeypatch.setattr(config, "load_spool_config", lambda: dict(settings))
+    monkeypatch.setattr(spool, "_spools", {})
+    yield tmp_path / "spool"
+    for sp in spool._spools.values():
+        sp.close()
+
+
+def drain(sp, limit=64):
+    frames, token = sp.peek(limit)
+    sp.commit(token, len(frames))
+    return frames
+
+
+def test_frames_are_replayed_in_order(tmp_path):
+    sp = spool.Spool(tmp_path / "a.spool")
+    sp.append([b"one", b"two"])
+    sp.append([b"three"])
+    frames, token = sp.peek(2)
+    assert frames == [b"one", b"two"]
+    # not committed: the same frames come back
+    assert sp.peek(2)[0] == frames
+    sp.commit(token, 2)
+    assert drain(sp) == [b"three"]
+    assert sp.pending() == 0
+    assert os.path.getsize(sp.path) == spool.HEADER_SIZE
+    assert sp.stats["appended"] == 3 and sp.stats["delivered"] == 3
+
+
+def test_spool_survives_reopen(tmp_path):
+    path = tmp_path / "a.spool"
+    sp = spool.Spool(path)
+    sp.append([b"one", b"two", b"three"])
+    frames, token = sp.peek(1)
+    sp.commit(token, 1)
+    sp.close()
+    assert drain(spool.Spool(path)) == [b"two", b"three"]
+
+
+def test_lone_append_is_synced_by_the_timer(tmp_path, monkeypatch):
+    monkeypatch.setattr(spool, "SYNC_INTERVAL", 0.05)
+    sp = spool.Spool(tmp_path / "a.spool")
+    sp.append([b"one"])
+    assert sp.stats["syncs"] == 0
+    for _ in range(100):
+        if sp.stats["syncs"]:
+            break
+        time.sleep(0.01)
+    assert sp.stats["syncs"] == 1
+    sp.close()
+    sp.close()
+
+
+def test_torn_tail_is_cut_off(tmp_path):
+    path = tmp_path / "a.spool"
+    sp = spool.Spool(path)
+    sp.append([b"one", b"two"])
+    sp.close()
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 1)
+    sp = spool.Spool(path)
+    assert sp.stats["torn"] == 1
+    assert drain(sp) == [b"one"]
+    sp.append([b"three"])
+    assert drain(sp) == [b"three"]
+
+
+def test_unreadable_file_is_replaced(tmp_path):
+    path = tmp_path / "a.spool"
+    path.write_bytes(b"garbage")
+    sp = spool.Spool(path)
+    assert len(sp) == 0
+    sp.append([b"one"])
+    assert drain(sp) == [b"one"]
+
+
+def test_oldest_frames_are_dropped_over_max_bytes(tmp_path):
+    record = spool._RECORD.size + 4
+    sp = spool.Spool(tmp_path / "a.spool", max_bytes=3 * record)
+    sp.append([b"%04d" % i for i in range(5)])
+    assert sp.stats["dropped"] == 2
+    assert drain(sp) == [b"0002", b"0003", b"0004"]
+
+
+def test_expired_frames_are_skipped(tmp_path):
+    sp = spool.Spool(tmp_path / "a.spool", max_age=60)
+    now = time.time()
+    sp.append([b"old"], stamp=now - 120)
+    sp.append([b"new"], stamp=now)
+    assert drain(sp) == [b"new"]
+    assert sp.stats["expired"] == 1
+    sp.append([b"stale"], stamp=now - 120)
+    # only expired records left: they are committed by peek itself
+    assert sp.peek()[0] == []
+    assert sp.pending() == 0
+
+
+def test_delivered_records_are_compacted(tmp_path, monkeypatch):
+    monkeypatch.setattr(spool, "COMPACT_AT", 64)
+    sp = spool.Spool(tmp_path / "a.spool")
+    sp.append([b"x" * 40] * 4)
+    inode = os.stat(sp.path).st_ino
+    frames, token = sp.peek(3)
+    sp.commit(token, 3)
+    assert os.stat(sp.path).st_ino != inode
+    assert os.path.getsize(sp.path) == spool.HEADER_SIZE + spool._RECORD.size + 40
+    assert drain(sp) == [b"x" * 40]
+
+
+def test_second_handle_follows_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(spool, "COMPACT_AT", 16)
+    path = tmp_path / "a.spool"
+    writer, reader = spool.Spool(path), spool.Spool(path)
+    writer.append([b"a" * 20, b"b" * 20, b"c" * 20])
+    frames, token = reader.peek(2)
+    reader.commit(token, 2)
+    writer.append([b"d"])
+    assert drain(reader) == [b"c" * 20, b"d"]
+
+
+def test_stale_commit_keeps_frames_appended_since(tmp_path):
+    path = tmp_path / "a.spool"
+    a, b = spool.Spool(path), spool.Spool(path)
+    a.append([b"one"])
+    frames_a, token_a = a.peek(8)
+    frames_b, token_b = b.peek(8)
+    assert frames_a == frames_b == [b"one"]
+    a.commit(token_a, 1)
+    a.append([b"two"])
+    b.commit(token_b, 1)
+    assert drain(a) == [b"two"]
+
+
+def test_for_sink_disabled_by_default(monkeypatch):
+    monkeypatch.setattr(config, "load_spool_config", lambda: {"enabled": False})
+    assert spool.for_sink("kiss") is None
+
+
+def test_for_sink_shares_one_spool(spool_dir):
+    sp = spool.for_sink("kiss")
+    assert sp is spool.for_sink("kiss")
+    assert sp.path == spool_dir / "kiss.spool"
+
+
+class FlakyTnc:
+    """KISS server stand-in that refuses connections until ``up`` is set."""
+
+    def __init__(self):
+        self.up = threading.Event()
+        self.data = b""
+        self.lock = threading.Lock()
+
+    def connect(self, address):
+        if not self.up.is_set():
+            raise ConnectionRefusedError("down")
+        tnc = self
+
+        class Sock:
+            def settimeout(self, t):
+                pass
+
+            def setsockopt(self, *args):
+                pass
+
+            def close(self):
+                pass
+
+            def sendall(self, data):
+                with tnc.lock:
+                    tnc.data += bytes(data)
+
+        return Sock()
+
+    def frames(self):
+        with self.lock:
+            return [frame.data for frame in kiss.Decoder().feed(self.data)]
+
+
+def test_kiss_client_spools_while_down(spool_dir, monkeypatch):
+    tnc = FlakyTnc()
+    monkeypatch.setattr(kc.socket, "create_connection", tnc.connect)
+    monkeypatch.setattr(kc, "_backoff", lambda attempt: 0.05)
+    monkeypatch.setattr(kc, "stats", dict.fromkeys(kc.stats, 0))
+    monkeypatch.setattr(kc, "FRAME_QUEUE", kc.queue.Queue())
+    kc._stop.clear()
+    kc._reconnect.clear()
+    thread = threading.Thread(target=kc._run, daemon=True)
+    monkeypatch.setattr(kc, "_thread", thread)
+    thread.start()
+    try:
+        for i in range(3):
+            kc.FRAME_QUEUE.put(b"frame%d" % i)
+        assert wait_for(lambda: kc.stats["spooled"] == 3)
+        assert kc.FRAME_QUEUE.empty()
+        tnc.up.set()
+        assert wait_for(lambda: kc.stats["replayed"] == 3)
+        kc.FRAME_QUEUE.put(b"frame3")
+        assert wait_for(lambda: len(tnc.frames()) == 4)
+        assert tnc.frames() == [b"frame%d" % i for i in range(4)]
+        assert spool.for_sink("kiss").pending() == 0
+    finally:
+        kc.FRAME_QUEUE.put(None)
+        thread.join(2)
+    assert not thread.is_alive()
+
+
+def test_aprsis_client_replays_spool(spool_dir, client):
+    spool.for_sink("aprsis").append([b"SRC>DEST:old"])
+    server = FakeAprsIs()
+    try:
+        client(server)
+        assert wait_for(lambda: server.frames == ["SRC>DEST:old"])
+        ac.FRAME_QUEUE.put("SRC>DEST:new")
+        assert wait_for(lambda: server.frames == ["SRC>DEST:old", "SRC>DEST:new"])
+        assert ac.stats["replayed"] == 1
+    finally:
+        server.close()
@@ -0,0 +1,137 @@
+"""Import-time and startup-latency budget.
+
+The modules each import must not load are always checked.  Wall-clock
+budgets depend on the machine and its load, so they are only asserted
+when ``WX_HELIOS_TIMING_TESTS=1`` is set.  They are a few times what a
+desktop needs so they only catch real regressions; set
+``WX_HELIOS_BUDGET_SCALE`` to stretch them on slow machines, for instance
+``4`` on a Raspberry Pi 3.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TIMED = os.environ.get("WX_HELIOS_TIMING_TESTS", "") not in ("", "0")
+SCALE = float(os.environ.get("WX_HELIOS_BUDGET_SCALE", "1"))
+
+# Module: (cumulative import milliseconds, modules it must not load).
+IMPORT_BUDGET = {
+    "utils": (
+        150,
+        {"multiprocessing.managers", "daemons.kiss_client", "journal", "spool"},
+    ),
+    "config": (250, {"multiprocessing.managers", "cron", "pickle", "base64"}),
+    "main": (
+        250,
+        {"multiprocessing.managers", "http.server", "direwolf_stats", "daemons.kiss_client"},
+    ),
+    "telemetry.hub_telemetry": (
+        400,
+        {"multiprocessing.managers", "daemons.kiss_client", "http.server", "cron"},
+    ),
+}
+
+# Seconds from interpreter start to every configured daemon being ready.
+READY_BUDGET = 1.0
+
+# Seconds the daemons may take to come up when the budget is not asserted.
+READY_TIMEOUT = 30.0
+
+
+def import_profile(module):
+    """Return ``{module: cumulative microseconds}`` from ``-X importtime``."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        profile[name.strip()] = int(cumulative)
+    return profile
+
+
+@pytest.mark.parametrize("module", sorted(IMPORT_BUDGET))
+def test_import_budget(module, record_property):
+    budget_ms, forbidden = IMPORT_BUDGET[module]
+    profile = import_profile(module)
+    elapsed_ms = profile[module] / 1000
+    record_property("import_ms", elapsed_ms)
+    assert not forbidden & profile.keys(), f"{module} loads {forbidden & profile.keys()}"
+    if TIMED:
+        assert elapsed_ms <= budget_ms * SCALE
+
+
+_STARTUP = """
+import json, sys, time
+start = time.perf_counter()
+from pathlib import Path
+import config
+config.CONFIG_PATH = Path(sys.argv[1])
+import main
+imported = time.perf_counter()
+main.start_daemon_modules()
+ready = main.wait_for_daemons(float(sys.argv[2]))
+done = time.perf_counter()
+print(json.dumps({
+    "import": imported - start,
+    "ready": done - start,
+    "daemons": sorted(main._daemons),
+    "waited": ready,
+}))
+for server, thread in main._daemons.values():
+    server.shutdown()
+    thread.join(5)
+"""
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_daemons_ready_within_budget(tmp_path, record_property):
+    tnc = socket.create_server(("127.0.0.1", 0))
+    path = tmp_path / "wx-helios.conf"
+    path.write_text(
+        "[DAEMONS]\n"
+        "modules = daemons.ecowitt_listener, daemons.kiss_client\n"
+        "[ECOWITT]\n"
+        f"port = {_free_port()}\n"
+        "[KISS_CLIENT]\n"
+        "enabled = yes\n"
+        "host = 127.0.0.1\n"
+        f"port = {tnc.getsockname()[1]}\n"
+    )
+    timeout = READY_BUDGET * SCALE if TIMED else READY_TIMEOUT
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c", _STARTUP, str(path), str(timeout)],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            timeout=60,
+        )
+    finally:
+        tnc.close()
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.splitlines()[-1])
+    record_property("startup_import_s", report["import"])
+    record_property("startup_ready_s", report["ready"])
+    assert report["daemons"] == ["daemons.ecowitt_listener", "daemons.kiss_client"]
+    assert report["waited"] == {"daemons.kiss_client": True}
+    if TIMED:
+        assert report["ready"] <= READY_BUDGET * SCALE
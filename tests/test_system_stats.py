@@ -0,0 +1,140 @@
+from collections import namedtuple
+
+import pytest
+
+pytest.importorskip("psutil")
+
+import config
+import main
+import system_stats
+import telemetry.hub_telemetry as hub
+
+Net = namedtuple("Net", "bytes_recv bytes_sent")
+Mem = namedtuple("Mem", "percent")
+
+
+class FakePsutil:
+    def __init__(self):
+        self.loads = iter([0.0, 10.0, 30.0, 50.0])
+        self.mem = iter([40.0, 95.0, 60.0])
+        self.net = iter(
+            [Net(0, 0), Net(1 << 20, 0), Net(3 << 20, 1 << 20), Net(3 << 20, 1 << 20)]
+        )
+
+    def cpu_percent(self, interval=None):
+        assert interval is None
+        return next(self.loads)
+
+    def virtual_memory(self):
+        return Mem(next(self.mem))
+
+    def net_io_counters(self):
+        return next(self.net)
+
+    def sensors_temperatures(self):
+        return {}
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    ps = FakePsutil()
+    monkeypatch.setattr(system_stats, "psutil", ps)
+    return ps
+
+
+def test_rolling_values(fake):
+    now = [0.0]
+    sampler = system_stats.Sampler(interval=3600, size=2, clock=lambda: now[0])
+    assert sampler.aggregates() == {}
+    for _ in range(3):
+        now[0] += 3600
+        sampler.sample()
+    rolling = sampler.aggregates()
+    # only the last two samples are kept
+    assert rolling["cpu_load"] == (30.0, 40.0, 50.0)
+    assert rolling["mem_percent"] == (60.0, 77.5, 95.0)
+    # MB per sample interval between polls, not cumulative totals
+    assert rolling["net_rx_mb"] == (0.0, 1.0, 2.0)
+    assert rolling["net_tx_mb"] == (0.0, 0.5, 1.0)
+
+
+def test_counter_reset_is_not_negative():
+    old, new = Net(5 << 20, 5 << 20), Net(1 << 20, 6 << 20)
+    assert system_stats.net_rate(old, new, 3600, 3600) == (0.0, 1.0)
+    # 3 MB in 2 s is 15 MB per 10 s interval
+    assert system_stats.net_rate(Net(0, 0), Net(3 << 20, 0), 2, 10) == (15.0, 0.0)
+
+
+def test_hub_reads_sampler_without_blocking(monkeypatch):
+    class Sampler:
+        def aggregates(self):
+            return {
+                "cpu_temp": (40.0, 45.0, 50.0),
+                "cpu_load": (5.0, 12.0, 30.0),
+                "mem_percent": (50.0, 60.0, 92.0),
+                "net_rx_mb": (0.0, 7.6, 20.0),
+                "net_tx_mb": (0.0, 2.2, 4.0),
+            }
+
+    def blocking(interval=None):
+        raise AssertionError("cpu_percent must not be called")
+
+    monkeypatch.setattr(system_stats, "_sampler", Sampler())
+    monkeypatch.setattr(hub.psutil, "cpu_percent", blocking)
+    monkeypatch.setattr(
+        config,
+        "load_hubtelemetry_config",
+        lambda: {"enabled": True, "sample_interval": 10.0, "samples": 60},
+    )
+    temp, load, _, mem, _, rx, tx = hub.get_laptop_telemetry()
+    # MB per 10 s on average, over the 600 s window
+    assert (temp, load, mem, rx, tx) == (45.0, 12.0, 92.0, 456, 132)
+
+
+def test_hub_limits_network_to_the_field(monkeypatch):
+    class Sampler:
+        def aggregates(self):
+            return {
+                "cpu_temp": (0.0, 0.0, 0.0),
+                "cpu_load": (0.0, 0.0, 0.0),
+                "mem_percent": (0.0, 0.0, 0.0),
+                "net_rx_mb": (0.0, 50.0, 90.0),
+                "net_tx_mb": (0.0, 0.004, 0.01),
+            }
+
+    monkeypatch.setattr(system_stats, "_sampler", Sampler())
+    monkeypatch.setattr(
+        config,
+        "load_hubtelemetry_config",
+        lambda: {"enabled": True, "sample_interval": 10.0, "samples": 360},
+    )
+    *_, rx, tx = hub.get_laptop_telemetry()
+    # under 4 kbit/s still shows up as 1 MB an hour
+    assert (rx, tx) == (999, 1)
+
+
+def test_sampler_thread_starts_and_stops(fake):
+    sampler = system_stats.start(interval=0.01, size=4)
+    try:
+        assert system_stats.current() is sampler
+    finally:
+        system_stats.stop()
+    assert system_stats.current() is None
+    assert not sampler._thread.is_alive()
+
+
+def test_launcher_skips_isolated_beacon(monkeypatch):
+    started = []
+    monkeypatch.setattr(system_stats, "start", lambda *a: started.append(a))
+    monkeypatch.setattr(
+        config,
+        "load_hubtelemetry_config",
+        lambda: {"enabled": True, "sample_interval": 5.0, "samples": 12},
+    )
+    monkeypatch.setattr(config, "load_telemetry_modules", lambda: [main.HUB_TELEMETRY])
+    monkeypatch.setattr(config, "load_telemetry_isolated", lambda: [main.HUB_TELEMETRY])
+    main.start_system_sampler()
+    assert started == []
+    monkeypatch.setattr(config, "load_telemetry_isolated", lambda: [])
+    main.start_system_sampler()
+    assert started == [(5.0, 12)]
@@ -0,0 +1,107 @@
+import pickle
+import time
+
+import config
+import kiss
+import tracing
+import utils
+import daemons.kiss_client as kc
+from tests.test_ecowitt import load_module
+from tests.test_kiss_client_daemon import ShortWriteSocket
+
+PARAMS = {
+    "winddir": "0",
+    "windspeedmph": "0",
+    "windgustmph": "0",
+    "tempf": "50",
+    "humidity": "50",
+    "baromrelin": "30",
+}
+
+
+def test_traced_frame_crosses_processes():
+    trace = tracing.Trace()
+    trace.mark("parse")
+    frame = pickle.loads(pickle.dumps(tracing.TracedFrame(b"\x01\xc0", trace)))
+    assert type(frame) is tracing.TracedFrame
+    assert frame == b"\x01\xc0"
+    assert frame.trace.marks == trace.marks
+    assert kiss.encode(frame) == kiss.encode(b"\x01\xc0")
+
+
+def test_upload_is_traced_to_the_socket(monkeypatch):
+    mod = load_module()
+    monkeypatch.setattr(mod, "APRS_IS_CFG", {"enabled": False})
+    monkeypatch.setattr(kc, "ENABLED", True)
+    monkeypatch.setattr(kc, "FRAME_QUEUE", kc.queue.Queue())
+    sock = ShortWriteSocket(limit=1 << 20)
+    monkeypatch.setattr(kc.socket, "create_connection", lambda a: sock)
+    written = tracing.TRACE_TIME.labels("daemon").count
+
+    trace = tracing.begin()
+    trace.mark("parse")
+    assert mod.enqueue_upload("client", PARAMS, trace)
+    mod.start_pipeline()
+    mod.INGEST_QUEUE.join()
+    mod.stop_pipeline()
+    kc.FRAME_QUEUE.put(None)
+    kc._stop.clear()
+    kc._run()
+
+    assert sock.data.startswith(b"\xc0\x00")
+    assert trace.path == "daemon"
+    assert [stage for stage, _ in trace.stages()] == [
+        "parse",
+        "ingest_queue",
+        "log",
+        "convert",
+        "route",
+        "kiss_queue",
+        "write",
+    ]
+    assert all(seconds >= 0 for _, seconds in trace.stages())
+    assert tracing.TRACE_TIME.labels("daemon").count == written + 1
+
+
+def test_socket_path_replaces_the_manager_attempt(monkeypatch):
+    sent = []
+
+    class DummySocket:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            pass
+
+        def sendall(self, data):
+            sent.append(data)
+
+    monkeypatch.setattr(kc, "ENABLED", False)
+    monkeypatch.setattr(utils.socket, "create_connection", lambda a: DummySocket())
+    trace = tracing.Trace()
+    token = tracing.current.set(trace)
+    try:
+        utils.send_via_kiss(b"\x01\x02")
+    finally:
+        tracing.current.reset(token)
+    assert sent == [kiss.encode(b"\x01\x02")]
+    assert trace.path == "socket"
+    assert [stage for stage, _ in trace.stages()] == ["route", "write"]
+
+
+def test_slow_traces_are_counted(monkeypatch):
+    monkeypatch.setattr(tracing, "_settings", lambda: (True, 0.5))
+    slow = tracing.SLOW.value
+    tracing.finish(tracing.Trace(), "write")
+    assert tracing.SLOW.value == slow
+    tracing.finish(tracing.Trace(start=time.monotonic() - 1), "write")
+    assert tracing.SLOW.value == slow + 1
+
+
+def test_tracing_can_be_disabled(tmp_path, monkeypatch):
+    path = tmp_path / "wx-helios.conf"
+    path.write_text("[TRACING]\nenabled = no\nslow_threshold = 2\n")
+    monkeypatch.setattr(config, "CONFIG_PATH", path)
+    monkeypatch.setattr(config, "_config", None)
+    assert config.load_tracing_config() == {"enabled": False, "slow_threshold": 2.0}
+    assert tracing.begin() is None
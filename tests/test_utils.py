@@ -1,3 +1,5 @@
+import pytest
+
 import utils
 
 
@@ -11,3 +13,39 @@ def test_build_tnc2_frame():
     frame = utils.build_tnc2_frame("DEST", "SRC", ["W1", "W2"], "HELLO")
     assert frame == "SRC>DEST,W1,W2:HELLO"
 
+
+
+def _legacy_ax25_frame(destination, source, path, info):
+    frame = bytearray()
+    for call in (destination, source, *path):
+        base, ssid = utils.parse_callsign(call)
+        frame += utils.encode_callsign(base, ssid)
+    frame[-1] |= 0x01
+    frame += b"\x03\xF0"
+    frame += info.encode("ascii")
+    return frame
+
+
+def test_ax25_encoder_matches_field_by_field_build():
+    encoder = utils.AX25Encoder("APZ001", "N0CALL-13", ["WIDE1-1", "WIDE2-2"])
+    info = "!3730.00N/12215.00W_"
+    assert encoder.encode(info) == _legacy_ax25_frame(
+        "APZ001", "N0CALL-13", ["WIDE1-1", "WIDE2-2"], info
+    )
+    assert utils.build_ax25_frame("APZ001", "N0CALL-13", [], info) == _legacy_ax25_frame(
+        "APZ001", "N0CALL-13", [], info
+    )
+
+
+def test_ax25_encoder_batch_and_sharing():
+    encoder = utils.ax25_encoder("DEST", "SRC-1", ["W"])
+    assert utils.ax25_encoder("DEST", "SRC-1", ("W",)) is encoder
+    infos = [":DEST     :PARM.a", ":DEST     :UNIT.b", ""]
+    assert encoder.encode_many(infos) == [encoder.encode(i) for i in infos]
+    assert encoder.encode_many([]) == []
+
+
+def test_ax25_encoder_rejects_non_ascii_info():
+    encoder = utils.ax25_encoder("DEST", "SRC")
+    with pytest.raises(UnicodeEncodeError):
+        encoder.encode("café")
@@ -0,0 +1,170 @@
+"""Latency traces of weather reports from upload to the TNC socket.
+
+:func:`begin` starts a :class:`Trace` when an Ecowitt upload arrives.  Every
+stage the report passes marks the trace with a ``time.monotonic()`` stamp;
+the stamps come from a clock shared by all processes on the host, so a
+trace stays valid when the frame crosses to the ``kiss_client`` daemon
+through the queue manager.  The stages are, in order:
+
+``parse``
+    reading and decoding the HTTP request;
+``ingest_queue``
+    waiting in the Ecowitt pipeline's queue;
+``log``
+    logging the upload's parameters;
+``convert``
+    ``ecowitt_to_aprs`` and AX.25 encoding;
+``route``
+    logging the report, journaling it and choosing the path in
+    ``utils.send_via_kiss``: the ``daemon`` queue, the queue ``manager`` of
+    another process or a ``socket`` of its own;
+``kiss_queue``
+    waiting in ``kiss_client``'s frame queue (not with the ``socket`` path);
+``write``
+    the write to the TNC socket.
+
+:func:`finish` records every stage in ``wx_trace_stage_seconds`` and the
+whole trace in ``wx_trace_seconds`` labelled with the path the frame took,
+and logs traces slower than ``slow_threshold`` from ``[TRACING]``.  Frames
+that end up in the spool, or uploads skipped because of ``MIN_INTERVAL``,
+are not recorded.
+"""
+import contextvars
+import threading
+import time
+from pathlib import Path
+
+import config
+import metrics
+from utils import log_info
+
+LOG_SOURCE = (
+    f"{__package__}.{Path(__file__).stem}" if __package__ else Path(__file__).stem
+)
+
+STAGE_TIME = metrics.histogram(
+    "wx_trace_stage_seconds", "Time weather reports spend in each stage", ("stage",)
+)
+TRACE_TIME = metrics.histogram(
+    "wx_trace_seconds",
+    "Time from Ecowitt upload to the write on the TNC socket",
+    ("path",),
+)
+SLOW = metrics.counter("wx_trace_slow_total", "Traces over slow_threshold")
+
+
+class Trace:
+    """Monotonic stamps of the stages one report has completed."""
+
+    __slots__ = ("start", "marks", "path")
+
+    def __init__(self, start=None):
+        self.start = time.monotonic() if start is None else start
+        self.marks = []
+        self.path = None
+
+    def mark(self, stage):
+        """Record that ``stage`` ended now."""
+        self.marks.append((stage, time.monotonic()))
+
+    def stages(self):
+        """Return ``[(stage, seconds), ...]`` in the order they were marked."""
+        result = []
+        previous = self.start
+        for stage, stamp in self.marks:
+            result.append((stage, stamp - previous))
+            previous = stamp
+        return result
+
+    def elapsed(self):
+        return (self.marks[-1][1] if self.marks else self.start) - self.start
+
+    def __getstate__(self):
+        return self.start, self.marks, self.path
+
+    def __setstate__(self, state):
+        self.start, self.marks, self.path = state
+
+
+class TracedFrame(bytes):
+    """AX.25 frame carrying the :class:`Trace` of the report it encodes.
+
+    It is queued like any other frame; consumers unaware of tracing see
+    plain ``bytes``.
+    """
+
+    def __new__(cls, frame, trace):
+        self = super().__new__(cls, frame)
+        self.trace = trace
+        return self
+
+    def __reduce__(self):
+        return TracedFrame, (bytes(self), self.trace)
+
+
+# Trace of the report the current thread is working on; set by the Ecowitt
+# pipeline around ``log_params`` and read by ``utils.send_via_kiss``.
+current = contextvars.ContextVar("trace", default=None)
+
+_enabled = True
+_slow = None
+_section = None
+_settings_lock = threading.Lock()
+
+
+def _settings():
+    global _enabled, _slow, _section
+    snap = config.snapshot()
+    if snap.tracing is not _section:
+        with _settings_lock:
+            cfg = config.load_tracing_config()
+            _enabled, _slow = cfg["enabled"], cfg["slow_threshold"]
+            _section = snap.tracing
+    return _enabled, _slow
+
+
+def begin():
+    """Return a new :class:`Trace`, or ``None`` if tracing is disabled."""
+    if not _settings()[0]:
+        return None
+    return Trace()
+
+
+def route(frame, trace, path):
+    """Mark the end of ``route`` via ``path`` and return the frame to send.
+
+    A path tried earlier for the same frame is replaced.
+    """
+    if trace.marks and trace.marks[-1][0] == "route":
+        trace.marks.pop()
+    trace.path = path
+    trace.mark("route")
+    return TracedFrame(frame, trace)
+
+
+def traces(frames, stage):
+    """Mark ``stage`` on the traces of ``frames`` and return those traces."""
+    found = [frame.trace for frame in frames if type(frame) is TracedFrame]
+    for trace in found:
+        trace.mark(stage)
+    return found
+
+
+def finish(trace, stage):
+    """Mark the final ``stage`` and record ``trace``."""
+    trace.mark(stage)
+    stages = trace.stages()
+    for name, seconds in stages:
+        STAGE_TIME.labels(name).observe(seconds)
+    total = trace.elapsed()
+    TRACE_TIME.labels(trace.path or "unknown").observe(total)
+    slow = _settings()[1]
+    if slow is not None and total >= slow:
+        SLOW.inc()
+        log_info(
+            "Slow report: %.3fs via %s (%s)",
+            total,
+            trace.path or "unknown",
+            ", ".join(f"{name} {seconds * 1000:.1f}ms" for name, seconds in stages),
+            source=LOG_SOURCE,
+        )
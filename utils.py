@@ -3,10 +3,13 @@ import socket
 import logging
 import time
 import os
-from multiprocessing.managers import SyncManager
+import sys
+import threading
+from functools import lru_cache
 from datetime import datetime, timezone
 from pathlib import Path
 
+import kiss
 
 def setup_logging(level=logging.INFO, use_utc=False):
     """Configure global logging settings.
@@ -123,22 +126,55 @@ def encode_callsign(callsign: str, ssid: int) -> bytearray:
     return encoded
 
 
+class AX25Encoder:
+    """Build UI frames for a fixed destination, source and digipeater path.
+
+    The address, control and PID fields are encoded once when the encoder
+    is created, so building a frame only appends the info field to the
+    stored header.  Use :func:`ax25_encoder` to share encoders.
+    """
+
+    __slots__ = ("destination", "source", "path", "header")
+
+    def __init__(self, destination: str, source: str, path=()):
+        self.destination = destination
+        self.source = source
+        self.path = tuple(path)
+        header = bytearray()
+        for call in (destination, source, *self.path):
+            header += encode_callsign(*parse_callsign(call))
+        header[-1] |= 0x01  # End-of-address flag
+        header += b"\x03"  # Control field (UI)
+        header += b"\xF0"  # PID (no layer 3)
+        self.header = bytes(header)
+
+    def __repr__(self):
+        return f"AX25Encoder({self.destination!r}, {self.source!r}, {list(self.path)!r})"
+
+    def encode(self, info: str) -> bytes:
+        """Return the frame carrying ``info``."""
+        return self.header + info.encode("ascii")
+
+    def encode_many(self, infos) -> list[bytes]:
+        """Return one frame per info field in ``infos``."""
+        header = self.header
+        return [header + info.encode("ascii") for info in infos]
+
+
+@lru_cache(maxsize=64)
+def _cached_encoder(destination, source, path):
+    return AX25Encoder(destination, source, path)
+
+
+def ax25_encoder(destination: str, source: str, path=()) -> AX25Encoder:
+    """Return a shared :class:`AX25Encoder` for the given addresses."""
+    return _cached_encoder(destination, source, tuple(path))
+
+
 def build_ax25_frame(destination: str, source: str, path: list[str], info: str) -> bytearray:
     """Construct a UI frame according to the AX.25 protocol."""
 
-    frame = bytearray()
-    dest_call, dest_ssid = parse_callsign(destination)
-    src_call, src_ssid = parse_callsign(source)
-    frame += encode_callsign(dest_call, dest_ssid)
-    frame += encode_callsign(src_call, src_ssid)
-    for hop in path:
-        path_call, path_ssid = parse_callsign(hop)
-        frame += encode_callsign(path_call, path_ssid)
-    frame[-1] |= 0x01  # End-of-address flag
-    frame += b"\x03"  # Control field (UI)
-    frame += b"\xF0"  # PID (no layer 3)
-    frame += info.encode("ascii")
-    return frame
+    return bytearray(ax25_encoder(destination, source, path).encode(info))
 
 
 def decimal_to_aprs(lat: float, lon: float, symbol_table: str, symbol: str) -> str:
@@ -190,11 +226,219 @@ def build_aprs_telemetry(seq: int, analog=None, digital=None, comment: str | Non
 
 
 
+# ---------------------------------------------------------------------------
+# Daemon queue transport
+# ---------------------------------------------------------------------------
+
+_QUEUE_METHODS = (
+    "empty",
+    "full",
+    "get",
+    "get_nowait",
+    "join",
+    "put",
+    "put_nowait",
+    "qsize",
+    "task_done",
+)
+
+
+@lru_cache(maxsize=None)
+def _queue_manager():
+    """Return the manager class for daemon queues, importing it on first use.
+
+    ``multiprocessing.managers`` is only loaded by processes that actually
+    talk to a daemon.
+    """
+    from multiprocessing.managers import SyncManager
+
+    class _QueueManager(SyncManager):
+        pass
+
+    _QueueManager.register("get_frame_queue", exposed=_QUEUE_METHODS)
+    return _QueueManager
+
+
+class ManagerSession:
+    """Persistent connection to a daemon's frame queue manager.
+
+    The daemons publish their manager address in ``<PREFIX>_MANAGER_HOST``,
+    ``<PREFIX>_MANAGER_PORT`` and ``<PREFIX>_MANAGER_AUTHKEY``.  The session
+    connects on first use and keeps the queue proxy for later calls.  A
+    ``put`` that fails once the item was handed to the proxy drops the
+    connection but is neither repeated nor reported as failed, since the item
+    may have reached the daemon already; it is left in the journal.  The
+    next call connects again.
+
+    While the manager cannot be reached, connection attempts are spaced out
+    from :attr:`BACKOFF_INITIAL` up to :attr:`BACKOFF_MAX` seconds; calls in
+    between fail at once.  Only the first failure of an outage is logged.
+
+    ``stats`` counts ``connects``, ``connect_failures``, ``put_failures``,
+    ``skipped`` calls during the backoff and ``puts`` and accumulates
+    ``connect_time`` and ``put_time`` in seconds.
+    """
+
+    BACKOFF_INITIAL = 1.0
+    BACKOFF_MAX = 60.0
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._queue = None
+        self._key = None
+        self._failures = 0      # connection attempts failed in a row
+        self._failed_key = None  # address of those attempts
+        self._retry_at = 0.0    # time.monotonic() of the next attempt
+        self.stats = {
+            "connects": 0,
+            "connect_failures": 0,
+            "put_failures": 0,
+            "skipped": 0,
+            "puts": 0,
+            "connect_time": 0.0,
+            "put_time": 0.0,
+        }
+
+    def _address(self):
+        host = os.environ.get(f"{self.prefix}_MANAGER_HOST")
+        port = os.environ.get(f"{self.prefix}_MANAGER_PORT")
+        auth = os.environ.get(f"{self.prefix}_MANAGER_AUTHKEY")
+        if host and port and auth:
+            # a forked child must not reuse the parent's connection
+            return host, int(port), auth, os.getpid()
+        return None
+
+    def _connect(self, key):
+        host, port, auth, _ = key
+        start = time.perf_counter()
+        try:
+            mgr = _queue_manager()(address=(host, port), authkey=bytes.fromhex(auth))
+            mgr.connect()
+            self._queue = mgr.get_frame_queue()
+        except Exception as exc:
+            self._queue = None
+            self._key = None
+            self.stats["connect_failures"] += 1
+            if not self._failures:
+                log_error(
+                    "Cannot reach %s queue manager at %s:%s: %s",
+                    self.prefix,
+                    host,
+                    port,
+                    exc,
+                    source=__name__,
+                )
+            delay = min(self.BACKOFF_MAX, self.BACKOFF_INITIAL * 2**self._failures)
+            self._failures += 1
+            self._failed_key = key
+            self._retry_at = time.monotonic() + delay
+            return False
+        if self._failures:
+            log_info(
+                "Reached %s queue manager after %d failed attempts",
+                self.prefix,
+                self._failures,
+                source=__name__,
+            )
+            self._failures = 0
+        self._key = key
+        self.stats["connects"] += 1
+        self.stats["connect_time"] += time.perf_counter() - start
+        return True
+
+    def put(self, item) -> bool:
+        """Queue ``item`` on the daemon.
+
+        Return ``False`` if the item was certainly not queued and has to be
+        sent another way.
+        """
+        key = self._address()
+        if key is None:
+            return False
+        with self._lock:
+            if self._queue is None or self._key != key:
+                if self._failed_key != key:
+                    # a new address, e.g. the daemon restarted elsewhere
+                    self._failures = 0
+                if self._failures and time.monotonic() < self._retry_at:
+                    self.stats["skipped"] += 1
+                    return False
+                if not self._connect(key):
+                    return False
+            start = time.perf_counter()
+            try:
+                self._queue.put(item)
+            except Exception as exc:
+                self._queue = None
+                self.stats["put_failures"] += 1
+                log_error(
+                    "Lost %s queue manager connection, frame may not be sent: %s",
+                    self.prefix,
+                    exc,
+                    source=__name__,
+                )
+                return True
+            self.stats["puts"] += 1
+            self.stats["put_time"] += time.perf_counter() - start
+            return True
+
+    def close(self):
+        """Forget the current connection and any backoff."""
+        with self._lock:
+            self._queue = None
+            self._key = None
+            self._failures = 0
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def manager_session(prefix: str) -> ManagerSession:
+    """Return the process-wide :class:`ManagerSession` for ``prefix``."""
+    with _sessions_lock:
+        session = _sessions.get(prefix)
+        if session is None:
+            session = _sessions[prefix] = ManagerSession(prefix)
+        return session
+
+
+def transport_stats():
+    """Return a copy of the counters of every manager session."""
+    with _sessions_lock:
+        return {prefix: dict(s.stats) for prefix, s in _sessions.items()}
+
+
+def replay_spool(sp, write, encode):
+    """Deliver the frames of spool ``sp`` through ``write``, oldest first.
+
+    Each batch is committed only after ``write`` returned, so frames are
+    kept if it raises.
+    """
+    while True:
+        frames, token = sp.peek()
+        if not frames:
+            return
+        write(b"".join(encode(frame) for frame in frames))
+        sp.commit(token, len(frames))
+
+
+def _caller_module(depth=2):
+    """Return the name of the module ``depth`` frames up the stack."""
+    namespace = sys._getframe(depth).f_globals
+    spec = namespace.get("__spec__")
+    # modules run with ``python -m`` are __main__ but keep their spec name
+    return spec.name if spec is not None else namespace.get("__name__", "")
+
+
 def send_via_kiss(ax25_frame):
     """Send a frame via a KISS TCP connection on localhost.
 
     If the ``kiss_client`` daemon is active, the frame is queued for that
-    persistent connection instead of opening a new socket each time.
+    persistent connection instead of opening a new socket each time.  Other
+    processes reach the daemon's queue through a cached
+    :class:`ManagerSession`.
 
     Parameters
     ----------
@@ -206,62 +450,53 @@ def send_via_kiss(ax25_frame):
     None
         This function sends data over the network and does not return anything.
     """
+    import journal
+
+    journal.record("kiss", ax25_frame, _caller_module())
+    # only set while the Ecowitt pipeline sends a traced report
+    tracing = sys.modules.get("tracing")
+    trace = tracing.current.get() if tracing else None
+    # a daemon this process never imported cannot be running in it
+    kiss_client = sys.modules.get("daemons.kiss_client")
     try:
-        from daemons import kiss_client
         if getattr(kiss_client, "ENABLED", False) and hasattr(
             kiss_client, "FRAME_QUEUE"
         ):
+            if trace is not None:
+                ax25_frame = tracing.route(ax25_frame, trace, "daemon")
             kiss_client.FRAME_QUEUE.put(ax25_frame)
             return
     except Exception:
         pass
 
-    host = os.environ.get("KISS_MANAGER_HOST")
-    port = os.environ.get("KISS_MANAGER_PORT")
-    auth = os.environ.get("KISS_MANAGER_AUTHKEY")
-    if host and port and auth:
-        try:
-            authkey = bytes.fromhex(auth)
-            class _QueueManager(SyncManager):
-                pass
-
-            _QUEUE_METHODS = (
-                "empty",
-                "full",
-                "get",
-                "get_nowait",
-                "join",
-                "put",
-                "put_nowait",
-                "qsize",
-                "task_done",
-            )
-
-            _QueueManager.register("get_frame_queue", exposed=_QUEUE_METHODS)
-            mgr = _QueueManager(address=(host, int(port)), authkey=authkey)
-            mgr.connect()
-            q = mgr.get_frame_queue()
-            q.put(ax25_frame)
-            return
-        except Exception:
-            pass
-
-    escaped = bytearray()
-    for b in ax25_frame:
-        if b == 0xC0:
-            escaped += b"\xDB\xDC"
-        elif b == 0xDB:
-            escaped += b"\xDB\xDD"
-        else:
-            escaped.append(b)
+    if trace is not None:
+        ax25_frame = tracing.route(ax25_frame, trace, "manager")
+    if manager_session("KISS").put(ax25_frame):
+        return
 
-    kiss_frame = b"\xC0\x00" + bytes(escaped) + b"\xC0"
+    if trace is not None:
+        tracing.route(ax25_frame, trace, "socket")
+    kiss_frame = kiss.encode(ax25_frame)
     from config import load_kiss_client_config
+    import spool
     cfg = load_kiss_client_config()
     host = cfg.get("host", "127.0.0.1")
     port = cfg.get("port", 8001)
-    with socket.create_connection((host, port)) as s:
-        s.send(kiss_frame)
+    sp = spool.for_sink("kiss")
+    if sp is None:
+        with socket.create_connection((host, port)) as s:
+            s.sendall(kiss_frame)
+    else:
+        try:
+            with socket.create_connection((host, port)) as s:
+                replay_spool(sp, s.sendall, kiss.encode)
+                s.sendall(kiss_frame)
+        except OSError as exc:
+            sp.append([ax25_frame])
+            log_error("KISS send to %s:%s failed, frame spooled: %s", host, port, exc, source=__name__)
+            return
+    if trace is not None:
+        tracing.finish(trace, "write")
 
 
 def build_tnc2_frame(destination: str, source: str, path: list[str], info: str) -> str:
@@ -276,9 +511,11 @@ def build_tnc2_frame(destination: str, source: str, path: list[str], info: str)
 def send_via_aprsis(tnc2_frame):
     """Send a TNC2 frame to APRS-IS if configured."""
     from config import load_aprsis_config
+    import journal
 
+    journal.record("aprsis", tnc2_frame.encode(), _caller_module())
+    aprsis_client = sys.modules.get("daemons.aprsis_client")
     try:
-        from daemons import aprsis_client
         if getattr(aprsis_client, "ENABLED", False) and hasattr(
             aprsis_client, "FRAME_QUEUE"
         ):
@@ -287,57 +524,45 @@ def send_via_aprsis(tnc2_frame):
     except Exception:
         pass
 
-    host = os.environ.get("APRSIS_MANAGER_HOST")
-    port = os.environ.get("APRSIS_MANAGER_PORT")
-    auth = os.environ.get("APRSIS_MANAGER_AUTHKEY")
-    if host and port and auth:
-        try:
-            authkey = bytes.fromhex(auth)
-
-            class _QueueManager(SyncManager):
-                pass
-
-            _QUEUE_METHODS = (
-                "empty",
-                "full",
-                "get",
-                "get_nowait",
-                "join",
-                "put",
-                "put_nowait",
-                "qsize",
-                "task_done",
-            )
-
-            _QueueManager.register("get_frame_queue", exposed=_QUEUE_METHODS)
-            mgr = _QueueManager(address=(host, int(port)), authkey=authkey)
-            mgr.connect()
-            q = mgr.get_frame_queue()
-            q.put(tnc2_frame)
-            return
-        except Exception:
-            pass
+    if manager_session("APRSIS").put(tnc2_frame):
+        return
 
     cfg = load_aprsis_config()
     if not cfg.get("enabled"):
         return
 
-    host = cfg.get("server")
-    port = cfg.get("port")
+    import aprsis_pool
+    import spool
+    from daemons.aprsis_client import LoginError, Session
+
+    servers = cfg.get("servers") or ((cfg.get("server"), cfg.get("port")),)
     callsign = cfg.get("callsign")
     passcode = cfg.get("passcode")
     timeout = cfg.get("timeout", 10)
 
-    login = f"user {callsign} pass {passcode} vers wx-helios 0\r\n".encode()
     payload = (tnc2_frame + "\r\n").encode()
 
-    log_info("Connecting to APRS-IS %s:%s", host, port, source=__name__)
+    sp = spool.for_sink("aprsis")
     try:
-        with socket.create_connection((host, port), timeout=timeout) as s:
-            s.sendall(login)
+        pool = aprsis_pool.pool_for(servers, timeout)
+        conn = pool.connect()
+        log_info("Connected to APRS-IS %s:%s", *conn.address, source=__name__)
+        with conn.sock as s:
+            try:
+                # the spool is only touched once the server took the login
+                Session(s, conn.address, conn.greeting).login(callsign, passcode, timeout)
+            except LoginError:
+                pool.mark_failed(conn.address)
+                raise
+            if sp is not None:
+                replay_spool(sp, s.sendall, lambda frame: frame + b"\r\n")
             s.sendall(payload)
         log_info("APRS-IS send complete", source=__name__)
     except Exception as exc:
-        log_exception("APRS-IS send failed: %s", exc, source=__name__)
+        if sp is None:
+            log_exception("APRS-IS send failed: %s", exc, source=__name__)
+        else:
+            sp.append([tnc2_frame.encode()])
+            log_error("APRS-IS send failed, frame spooled: %s", exc, source=__name__)
 
 